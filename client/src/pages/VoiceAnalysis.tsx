@@ -29,6 +29,9 @@ const VoiceAnalysis = () => {
   const mediaRecorderRef = useRef<MediaRecorder | null>(null);
   const audioChunksRef = useRef<Blob[]>([]);
   const statusCheckInterval = useRef<NodeJS.Timeout | null>(null);
+  // Recording session on the backend, so status checks see this client's recording
+  const sessionIdRef = useRef<string | null>(null);
+  const sessionHeaders = () => (sessionIdRef.current ? { 'X-Session-Id': sessionIdRef.current } : {});
 
   useEffect(() => {
     // Check microphone permission status on component mount
@@ -78,7 +81,7 @@ const VoiceAnalysis = () => {
 
   const checkRecordingStatus = async () => {
     try {
-      const response = await axios.get(`${API_BASE_URL}/recording-status`);
+      const response = await axios.get(`${API_BASE_URL}/recording-status`, { headers: sessionHeaders() });
       if (response.data.is_recording) {
         setRemainingTime(Math.floor(response.data.remaining_time));
         if (response.data.remaining_time <= 0) {
@@ -103,7 +106,8 @@ const VoiceAnalysis = () => {
 
       console.log('Starting backend recording...');
       // Start recording on the backend
-      const backendResponse = await axios.post(`${API_BASE_URL}/start-recording`);
+      const backendResponse = await axios.post(`${API_BASE_URL}/start-recording`, null, { headers: sessionHeaders() });
+      sessionIdRef.current = backendResponse.data.session_id ?? sessionIdRef.current;
       console.log('Backend recording started:', backendResponse.data);
       
       console.log('Requesting microphone access...');
@@ -222,7 +226,7 @@ const VoiceAnalysis = () => {
       }
 
       try {
-        await axios.post(`${API_BASE_URL}/stop-recording`);
+        await axios.post(`${API_BASE_URL}/stop-recording`, null, { headers: sessionHeaders() });
       } catch (error) {
         console.error('Error stopping recording:', error);
         setError('Failed to stop recording');
@@ -6,32 +6,32 @@ import soundfile as sf
 import os
 import tempfile
 import json
-from datetime import datetime
+
+from modules.sessions import RecordingSessions, new_session_id, open_store
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "http://localhost:5175"}})  # Enable CORS for specific origin
 
-# Global variables for recording state
-recording_start_time = None
+# Recording state per client session, shared with every worker (see modules/sessions.py)
 MAX_RECORDING_DURATION = 20  # seconds
+recordings = RecordingSessions(open_store(), MAX_RECORDING_DURATION)
+
+def session_id_of():
+    return (request.headers.get("X-Session-Id") or request.args.get("session_id")
+            or request.cookies.get("session_id"))
 
 @app.route('/start-recording', methods=['POST'])
 def start_recording():
-    global recording_start_time
-    recording_start_time = datetime.now()
-    return jsonify({"status": "recording started"})
+    session_id = session_id_of() or new_session_id()
+    recordings.start(session_id, restart=True)
+    response = jsonify({"status": "recording started", "session_id": session_id})
+    response.set_cookie("session_id", session_id, httponly=True, samesite="Lax")
+    return response
 
 @app.route('/recording-status', methods=['GET'])
 def recording_status():
-    if recording_start_time is None:
-        return jsonify({"is_recording": False, "remaining_time": 0})
-    
-    elapsed = (datetime.now() - recording_start_time).total_seconds()
-    remaining = max(0, MAX_RECORDING_DURATION - elapsed)
-    return jsonify({
-        "is_recording": True,
-        "remaining_time": remaining
-    })
+    status = recordings.status(session_id_of())
+    return jsonify({"is_recording": status["is_recording"], "remaining_time": status["remaining_time"]})
 
 @app.route('/analyze-voice', methods=['POST'])
 def analyze_voice():
@@ -0,0 +1,194 @@
+"""
+Non-interactive batch analysis of recorded audio.
+
+    python batch.py resources/ --out results.jsonl
+    python batch.py "archive/**/*.mp3" --out results.csv --workers 8
+
+Files are analyzed across a process pool and every result is appended to the
+output as soon as it finishes, so an interrupted run picks up where it left off
+when restarted with the same output file.
+"""
+import argparse
+import contextlib
+import csv
+import glob
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".ogg", ".flac", ".webm", ".m4a", ".mp4")
+RESULT_COLUMNS = ("file", "status", "error", "seconds", "decode_seconds", "confidence_level", "confidence_score",
+                  "pitch_mean", "pitch_std", "energy_mean", "energy_std", "pause_count",
+                  "filler_count", "suggestions")
+
+
+def find_audio_files(inputs):
+    files = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            for root, _, names in os.walk(pattern):
+                files.extend(os.path.join(root, name) for name in names
+                             if name.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            files.extend(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+    return sorted({os.path.abspath(path) for path in files})
+
+
+_verbose = False
+
+
+def _init_worker(verbose):
+    # One process per core; keep numeric libraries from spawning threads on top
+    for name in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMBA_NUM_THREADS"):
+        os.environ.setdefault(name, "1")
+    global _verbose
+    _verbose = verbose
+    import main  # noqa: F401  heavy imports happen once per worker
+
+
+def analyze_file(path):
+    from main import process_audio_file
+
+    start = time.perf_counter()
+    row = {"file": path}
+    try:
+        timings = {}
+        with contextlib.redirect_stdout(sys.stdout if _verbose else io.StringIO()):
+            results, _ = process_audio_file(path, timings=timings)
+        row.update(results.as_dict())
+        if "decode" in timings:
+            row["decode_seconds"] = round(timings["decode"], 3)
+        row["status"] = "ok"
+    except Exception as e:
+        row["status"] = "error"
+        row["error"] = str(e)
+    row["seconds"] = round(time.perf_counter() - start, 3)
+    return row
+
+
+class ResultWriter:
+    """
+    Appends result rows to a JSONL or CSV file and remembers which files it holds
+    """
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self.done = self._read_existing() if os.path.exists(path) else {}
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, "a", newline="")
+        self._csv = csv.DictWriter(self._file, fieldnames=RESULT_COLUMNS, extrasaction="ignore") if fmt == "csv" else None
+        if self._csv and not exists:
+            self._csv.writeheader()
+
+    def _read_existing(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        # An interrupted run can leave a partial last row; cut it off, so the
+        # next row starts on a line of its own and that file is analyzed again
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            print(f"⚠️ Dropping the incomplete last row of {self.path}", file=sys.stderr)
+            with open(self.path, "r+b") as f:
+                f.truncate(complete)
+        text = data[:complete].decode("utf-8", errors="replace")
+
+        done = {}
+        if self.fmt == "csv":
+            rows = csv.DictReader(io.StringIO(text, newline=""))
+        else:
+            rows = self._json_rows(text.splitlines())
+        for row in rows:
+            # A CSV row cut short has missing columns
+            if not isinstance(row, dict) or not row.get("file") or (self.fmt == "csv" and None in row.values()):
+                print(f"⚠️ Skipping a malformed row of {self.path}", file=sys.stderr)
+                continue
+            done[row["file"]] = row.get("status")
+        return done
+
+    def _json_rows(self, lines):
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"⚠️ Skipping a malformed row of {self.path}", file=sys.stderr)
+
+    def write(self, row):
+        if self._csv:
+            row = dict(row, suggestions=" | ".join(row.get("suggestions") or []))
+            self._csv.writerow(row)
+        else:
+            self._file.write(json.dumps(row, default=float) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze a directory or glob of recordings")
+    parser.add_argument("inputs", nargs="+", help="directories or glob patterns")
+    parser.add_argument("--out", required=True, help="output file (.jsonl or .csv)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="output format (default: from --out)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--retry-errors", action="store_true", help="re-run files that failed last time")
+    parser.add_argument("--verbose", action="store_true", help="show per-file analysis output")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.out.lower().endswith(".csv") else "jsonl")
+    files = find_audio_files(args.inputs)
+    writer = ResultWriter(args.out, fmt)
+    pending = [path for path in files
+               if path not in writer.done or (args.retry_errors and writer.done[path] != "ok")]
+    skipped = len(files) - len(pending)
+    print(f"🔍 {len(files)} files found, {skipped} already in {args.out}, {len(pending)} to analyze "
+          f"with {args.workers} workers.", file=sys.stderr)
+    if not pending:
+        writer.close()
+        return
+
+    start = time.perf_counter()
+    completed = failed = 0
+    queue = iter(pending)
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(args.verbose,)) as pool:
+        # Keep a bounded number of files in flight so results stream out in order of completion
+        in_flight = set()
+        for path in queue:
+            in_flight.add(pool.submit(analyze_file, path))
+            if len(in_flight) >= args.workers * 2:
+                break
+        try:
+            while in_flight:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    row = future.result()
+                    writer.write(row)
+                    completed += 1
+                    failed += row["status"] != "ok"
+                    next_path = next(queue, None)
+                    if next_path:
+                        in_flight.add(pool.submit(analyze_file, next_path))
+                elapsed = time.perf_counter() - start
+                print(f"\r{completed}/{len(pending)} files, {completed / elapsed:.2f} files/s, "
+                      f"{failed} failed", end="", file=sys.stderr)
+        except KeyboardInterrupt:
+            print("\n⏹️ Interrupted; rerun the same command to resume.", file=sys.stderr)
+            for future in in_flight:
+                future.cancel()
+            raise
+        finally:
+            writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ Analyzed {completed} files in {elapsed:.1f}s ({completed / elapsed:.2f} files/s), "
+          f"{failed} failed. Results in {args.out}.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
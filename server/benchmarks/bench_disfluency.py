@@ -0,0 +1,81 @@
+"""
+Throughput of the filler detectors against the original convolution heuristic.
+
+Run from the server directory:
+    python -m benchmarks.bench_disfluency [--minutes 5] [files ...]
+
+Each recording is also tiled up to --minutes to show how the cost scales.
+"spectral" is timed on a context whose spectrogram and pitch are already
+computed, as in analyze_voice; "spectral+stft" includes computing them.
+"envelope" is the default filler_count; the spectral detector locates
+fillers for the timeline and extended metrics (see modules/disfluency.py).
+"""
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+import librosa
+from scipy.signal import find_peaks
+
+from modules.disfluency import detect_fillers, envelope_filler_count, FILLER_PITCH_ENGINE
+from modules.features import VoiceFeatures
+
+RATE = 22050
+RESOURCES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources")
+
+
+def convolution_filler_count(y):
+    smoothed = np.convolve(np.abs(y), np.ones(1000) / 1000, mode='valid')
+    peaks, _ = find_peaks(smoothed, height=0.01, distance=1000)
+    return len(peaks) // 30
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run(label, y, sr):
+    duration = len(y) / sr
+    shared = VoiceFeatures(y, sr)
+    shared.magnitude
+    shared.pitch(FILLER_PITCH_ENGINE)
+
+    cases = [
+        ("convolution", lambda: convolution_filler_count(y)),
+        ("envelope", lambda: envelope_filler_count(y)),
+        ("spectral", lambda: len(detect_fillers(shared))),
+        ("spectral+stft", lambda: len(detect_fillers(VoiceFeatures(y, sr)))),
+    ]
+    for name, fn in cases:
+        elapsed, count = timed(fn)
+        print(f"{label:<28}{duration:>8.0f}{name:>15}{elapsed * 1000:>10.1f}{duration / elapsed:>12.0f}{count:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filler detector throughput benchmark")
+    parser.add_argument("files", nargs="*", help="audio files (defaults to resources/*.mp3)")
+    parser.add_argument("--minutes", type=float, default=5, help="length of the tiled long-form case")
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(RESOURCES_DIR, "*.mp3")))
+    warmup = np.random.default_rng(0).standard_normal(RATE).astype(np.float32) * 0.1
+    detect_fillers(VoiceFeatures(warmup, RATE))
+
+    header = f"{'file':<28}{'seconds':>8}{'detector':>15}{'ms':>10}{'x realtime':>12}{'count':>8}"
+    print(header)
+    print("-" * len(header))
+    for path in files:
+        y, sr = librosa.load(path, sr=RATE)
+        y = librosa.util.normalize(y)
+        name = os.path.basename(path)
+        run(name, y, sr)
+        repeats = int(np.ceil(args.minutes * 60 * sr / len(y)))
+        run(f"{name} (tiled)", np.tile(y, repeats), sr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+End-to-end timing of the voice pipeline on synthetic speech.
+
+Run from the server directory:
+    python -m benchmarks.bench_pipeline [--durations 5,30,120,600,3600] [--out baseline.json]
+    python -m benchmarks.bench_pipeline --compare benchmarks/baselines/pipeline_1a2b3c4.json
+
+For every duration a SyntheticSpeech WAV is written once, then each case runs
+in a fresh process so its peak RSS is its own:
+  process_audio_file  decode + analysis as the API runs it (streaming above
+                      main.STREAMING_MIN_SECONDS)
+  analyze_voice       analysis of samples already in memory
+Per-stage seconds come from the pipeline's StageTimer. Each process warms up
+on a short clip first, so numba compilation is not counted. Transcription is
+skipped unless --transcribe is given.
+
+Results are written as JSON (by default benchmarks/baselines/pipeline_<commit>.json).
+--compare prints the change against an earlier file and exits with status 1
+when a case got slower by more than --tolerance.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+from benchmarks.synth import SyntheticSpeech
+from main import RATE
+
+CASES = ("process_audio_file", "analyze_voice")
+DEFAULT_DURATIONS = "5,30,120,600,3600"
+BASELINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def run_case(case, path, duration, repeat, transcribe):
+    """
+    One case in its own process; returns the result row
+    """
+    import numpy as np
+    import main
+    from modules.decode import decode_file
+    from modules.metrics import StageTimer
+
+    row = {"case": case, "duration": duration, "status": "ok"}
+    with contextlib.redirect_stdout(io.StringIO()):
+        warmup = SyntheticSpeech(2, main.RATE, seed=99).render()
+        main.analyze_voice(warmup, main.RATE, transcribe=transcribe)
+        if case == "analyze_voice":
+            y = decode_file(path, main.RATE)
+    row["baseline_rss_mb"] = round(peak_rss_mb(), 1)
+
+    totals, stage_runs = [], []
+    try:
+        for _ in range(repeat):
+            timings = {}
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                if case == "process_audio_file":
+                    results, _ = main.process_audio_file(path, timings=timings, transcribe=transcribe)
+                else:
+                    results = main.analyze_voice(y, main.RATE, transcribe=transcribe,
+                                                 timer=StageTimer("bench", timings))
+            totals.append(time.perf_counter() - start)
+            stage_runs.append(timings)
+    except Exception as e:
+        row.update(status="error", error=str(e))
+        return row
+
+    # Medians over the repeats
+    row["seconds"] = round(float(np.median(totals)), 4)
+    row["real_time_factor"] = round(row["seconds"] / duration, 5)
+    row["stages"] = {name: round(float(np.median([run.get(name, 0.0) for run in stage_runs])), 4)
+                     for name in stage_runs[0]}
+    row["mode"] = "streaming" if "streaming_analysis" in row["stages"] else "whole"
+    row["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    row["result"] = {"confidence_score": results.confidence_score, "pause_count": results.pause_count,
+                     "filler_count": results.filler_count}
+    row["settings"] = main.analysis_params()
+    return row
+
+
+def run_in_process(case, path, duration, repeat, transcribe):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        try:
+            return pool.submit(run_case, case, path, duration, repeat, transcribe).result()
+        except Exception as e:
+            # The worker died, most likely killed for running out of memory
+            return {"case": case, "duration": duration, "status": "error", "error": repr(e)}
+
+
+def compare(rows, baseline_path, tolerance):
+    """
+    Print the change against a baseline file; True if any case regressed
+    """
+    with open(baseline_path) as f:
+        baseline = {(row["case"], row["duration"]): row for row in json.load(f)["runs"] if row["status"] == "ok"}
+
+    print(f"\nAgainst {baseline_path}:")
+    header = f"{'case':<20}{'seconds':>9}{'before':>10}{'after':>10}{'change':>9}{'rss before':>12}{'rss after':>11}"
+    print(header)
+    print("-" * len(header))
+    regressed = False
+    for row in rows:
+        before = baseline.get((row["case"], row["duration"]))
+        if before is None or row["status"] != "ok":
+            continue
+        change = row["seconds"] / before["seconds"] - 1
+        flag = ""
+        if change > tolerance:
+            flag = "  ⚠️ slower"
+            regressed = True
+        print(f"{row['case']:<20}{row['duration']:>9g}{before['seconds']:>10.3f}{row['seconds']:>10.3f}"
+              f"{change:>+9.0%}{before['peak_rss_mb']:>12.0f}{row['peak_rss_mb']:>11.0f}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voice pipeline benchmark on synthetic speech")
+    parser.add_argument("--durations", default=DEFAULT_DURATIONS, help="comma-separated clip lengths in seconds")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"comma-separated subset of {','.join(CASES)}")
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per case; medians are kept")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic speech")
+    parser.add_argument("--transcribe", action="store_true", help="include transcription in the timings")
+    parser.add_argument("--out", help="result file (default benchmarks/baselines/pipeline_<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    durations = [float(value) for value in args.durations.split(",")]
+    cases = [case.strip() for case in args.cases.split(",")]
+    for case in cases:
+        if case not in CASES:
+            parser.error(f"unknown case '{case}'")
+
+    commit = git_commit()
+    rows = []
+    header = f"{'case':<20}{'seconds':>9}{'mode':>11}{'total s':>10}{'x realtime':>12}{'peak MB':>10}  stages"
+    print(header)
+    print("-" * len(header))
+    with tempfile.TemporaryDirectory() as workdir:
+        for duration in durations:
+            speech = SyntheticSpeech(duration, RATE, seed=args.seed)
+            path = os.path.join(workdir, f"speech_{duration:g}s.wav")
+            speech.write(path)
+            for case in cases:
+                row = run_in_process(case, path, duration, args.repeat, args.transcribe)
+                row["layout"] = {"pause_count": speech.pause_count, "filler_count": speech.filler_count}
+                rows.append(row)
+                if row["status"] != "ok":
+                    print(f"{case:<20}{duration:>9g}  ❌ {row['error']}")
+                    continue
+                stages = ", ".join(f"{name} {seconds:.2f}" for name, seconds in row["stages"].items())
+                print(f"{case:<20}{duration:>9g}{row['mode']:>11}{row['seconds']:>10.2f}"
+                      f"{1 / row['real_time_factor']:>12.0f}{row['peak_rss_mb']:>10.0f}  {stages}")
+            os.remove(path)
+
+    settings = next((row.pop("settings") for row in rows if "settings" in row), {})
+    for row in rows:
+        row.pop("settings", None)
+    report = {
+        "benchmark": "pipeline",
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "transcribe": args.transcribe,
+        "settings": settings,
+        "runs": rows,
+    }
+    out = args.out or os.path.join(BASELINES_DIR, f"pipeline_{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results saved to {out}")
+
+    if args.compare and compare(rows, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Compare the pitch engines on the recordings in resources/.
+
+Run from the server directory:
+    python -m benchmarks.bench_pitch [--repeat 3] [files ...]
+
+"cents" is the median disagreement with the first engine on frames both call voiced.
+"""
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+import librosa
+
+from modules.features import VoiceFeatures
+from modules.pitch import PITCH_ENGINES, track_pitch, pitch_stats, VOICED_MIN_HZ
+
+RATE = 22050
+RESOURCES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources")
+
+
+def best_time(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def cents_error(f0, reference):
+    both = (f0 > VOICED_MIN_HZ) & (reference > VOICED_MIN_HZ)
+    if not both.any():
+        return float("nan")
+    return float(np.median(np.abs(1200 * np.log2(f0[both] / reference[both]))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pitch engine micro-benchmark")
+    parser.add_argument("files", nargs="*", help="audio files (defaults to resources/*.mp3)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per engine, best is kept")
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(RESOURCES_DIR, "*.mp3")))
+    if not files:
+        print("❌ No audio files found.")
+        return
+
+    # The first call of each engine pays for numba compilation and lazy imports
+    warmup = np.random.default_rng(0).standard_normal(RATE).astype(np.float32) * 0.1
+    for engine in PITCH_ENGINES:
+        track_pitch(VoiceFeatures(warmup, RATE), engine=engine)
+
+    header = f"{'file':<28}{'engine':<10}{'ms':>10}{'x realtime':>12}{'mean Hz':>10}{'std Hz':>9}{'voiced':>8}{'cents':>8}"
+    print(header)
+    print("-" * len(header))
+    for path in files:
+        y, sr = librosa.load(path, sr=RATE)
+        y = y / (np.max(np.abs(y)) + 1e-5)
+        duration = len(y) / sr
+
+        reference = None
+        for engine in PITCH_ENGINES:
+            # A fresh context per run so the spectrogram cost is charged to the engine
+            elapsed, f0 = best_time(lambda: track_pitch(VoiceFeatures(y, sr), engine=engine), args.repeat)
+            if reference is None:
+                reference = f0
+            pitch_mean, pitch_std = pitch_stats(f0)
+            voiced = float(np.mean(f0 > VOICED_MIN_HZ))
+            print(f"{os.path.basename(path):<28}{engine:<10}{elapsed * 1000:>10.1f}{duration / elapsed:>12.0f}"
+                  f"{pitch_mean:>10.1f}{pitch_std:>9.2f}{voiced:>8.0%}{cents_error(f0, reference):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Throughput of the sign video pipeline under different tracking settings.
+
+Run from the server directory:
+    python -m benchmarks.bench_sign [--repeat 3] [videos ...]
+
+Each video (test.mp4 by default) is analyzed with every setting in SETTINGS;
+the best of --repeat runs is kept. "fps" is video frames consumed per second,
+"analyzed fps" frames run through the hand model per second, "detections" the
+full-frame palm detections, and "hands" the share of analyzed frames in which
+a hand was found, to check that a faster setting still sees the hands.
+"""
+import argparse
+import os
+
+from modules.sign_language import STATIC_SETTINGS, TrackingSettings
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SETTINGS = {
+    "static, full size": STATIC_SETTINGS,
+    "static, 640px": STATIC_SETTINGS._replace(max_side=640),
+    "tracking, every frame": TrackingSettings(target_fps=0, stride=1, max_side=640),
+    "tracking, 15 fps": TrackingSettings(target_fps=15, stride=0, max_side=640),
+    "tracking, 10 fps, 480px": TrackingSettings(target_fps=10, stride=0, max_side=480),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sign pipeline throughput benchmark")
+    parser.add_argument("files", nargs="*", help="videos (defaults to test.mp4)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per setting, best is kept")
+    args = parser.parse_args()
+
+    files = args.files or [os.path.join(SERVER_DIR, "test.mp4")]
+    files = [path for path in files if os.path.exists(path)]
+    if not files:
+        print("❌ No videos found.")
+        return
+
+    try:
+        from modules.sign_language import SignLanguageProcessor
+        processor = SignLanguageProcessor()
+    except ImportError as e:
+        print(f"❌ The sign pipeline needs OpenCV and MediaPipe: {e}")
+        return
+    # Loads the models, so the first setting is not charged for it
+    processor.warm_up()
+
+    header = f"{'file':<20}{'setting':<26}{'frames':>8}{'analyzed':>10}{'detections':>12}{'fps':>9}{'analyzed fps':>14}{'hands':>8}"
+    print(header)
+    print("-" * len(header))
+    for path in files:
+        for name, settings in SETTINGS.items():
+            runs = [processor._analyze_video(path, settings=settings)["throughput"] for _ in range(args.repeat)]
+            best = max(runs, key=lambda run: run["fps"])
+            hands = best["hand_frames"] / best["analyzed_frames"] if best["analyzed_frames"] else 0.0
+            print(f"{os.path.basename(path):<20}{name:<26}{best['frames']:>8}{best['analyzed_frames']:>10}"
+                  f"{best['detections']:>12}{best['fps']:>9.1f}{best['analyzed_fps']:>14.1f}{hands:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,20 @@
-from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException
+from fastapi import FastAPI, Request, BackgroundTasks, HTTPException, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, PlainTextResponse
 import uvicorn
-from main import process_audio_file, record_and_process
-from modules.sign_language import SignLanguageProcessor
-import os
-import tempfile
+from modules import jobs, sessions, uploads, warmup
+from modules.result_cache import ResultCache, cache_key
+from modules.report import ReportRenderer
+from modules.tiles import TileStore
+from modules.history import HistoryStore
+from modules.metrics import StageTimer, record_profile, registry as metrics_registry
 import asyncio
-from datetime import datetime
+import threading
+import time
 import traceback
-app.use(cors());
-# app = FastAPI()
+from typing import Optional
+app = FastAPI()
 
 # Configure CORS - more permissive for development
 app.add_middleware(
@@ -22,130 +26,458 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
-# Initialize processors
-sign_processor = SignLanguageProcessor()
+# Heavy processors load lazily for the enabled capabilities (VOICE_CAPABILITIES)
+result_cache = ResultCache()
+report_renderer = ReportRenderer()
+tile_store = TileStore()
+history_store = HistoryStore()
+# Voice and sign analyses run on per-modality worker pools
+job_manager = jobs.JobManager(warmup.CAPABILITIES, store=jobs.open_job_store())
+# Quick analyses run here rather than on the pool, a bounded number at a time
+quick_slots = jobs.InlineSlots("quick", jobs.QUICK_CONCURRENCY)
 
-# Global variable to track recording state
-is_recording = False
-recording_start_time = None
+# Set once the startup warm-up has run
+warmed_up = threading.Event()
+
+@app.on_event("startup")
+async def start_warm_up():
+    # Warm up off the event loop; /ready reports when it is done
+    def run():
+        # Analyses run in the job workers; this process keeps live analysis and reports
+        warmup.warm_up(in_server=True)
+        warmup.startup_timings.update(job_manager.start())
+        warmed_up.set()
+    threading.Thread(target=run, name="warm-up", daemon=True).start()
+
+@app.on_event("shutdown")
+async def stop_jobs():
+    job_manager.shutdown()
+
+@app.get("/ready")
+async def ready():
+    body = {
+        "capabilities": list(warmup.CAPABILITIES),
+        "startup_timings": warmup.startup_timings,
+        "startup_errors": warmup.startup_errors,
+    }
+    if not warmed_up.is_set():
+        return JSONResponse(status_code=503, content=dict(body, status="warming_up"))
+    return dict(body, status="ready")
+
+def require(capability):
+    if not warmup.enabled(capability):
+        raise HTTPException(status_code=503, detail=f"The {capability} capability is not enabled on this server")
+
+def upload_form(field):
+    # Uploads are parsed from the request stream, so describe the form for the API docs by hand
+    schema = {"type": "object", "required": [field], "properties": {field: {"type": "string", "format": "binary"}}}
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": schema}}}}
+
+async def receive_upload(request, modality, field, decode_rate=None):
+    """
+    Stream an upload to disk (see modules/uploads.py), answering 413/415/400 as soon as it breaks a limit
+    """
+    try:
+        return await uploads.receive_upload(request, modality, field, decode_rate)
+    except uploads.UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+# Live analysis: seconds of audio between updates, and ffmpeg demuxers by stream format
+LIVE_UPDATE_SECONDS = 0.5
+LIVE_CONTAINERS = {"webm": "webm", "ogg": "ogg"}
+
+# Recording state per client session, shared by every worker process (see modules/sessions.py)
+recordings = sessions.RecordingSessions(sessions.open_store())
+
+def session_id_of(request):
+    """
+    The client's session id, from the X-Session-Id header, the session_id query parameter or cookie
+    """
+    return (request.headers.get("x-session-id") or request.query_params.get("session_id")
+            or request.cookies.get("session_id"))
 
 @app.post("/start-recording")
-async def start_recording():
-    global is_recording, recording_start_time
-    if not is_recording:
-        is_recording = True
-        recording_start_time = datetime.now()
-        return {"status": "recording_started"}
-    return {"status": "already_recording"}
+async def start_recording(request: Request, response: Response):
+    session_id = session_id_of(request) or sessions.new_session_id()
+    response.set_cookie("session_id", session_id, httponly=True, samesite="lax")
+    started = recordings.start(session_id)
+    return {"status": "recording_started" if started else "already_recording", "session_id": session_id}
 
 @app.post("/stop-recording")
-async def stop_recording():
-    global is_recording, recording_start_time
-    if is_recording:
-        is_recording = False
-        recording_start_time = None
+async def stop_recording(request: Request):
+    session_id = session_id_of(request)
+    if session_id and recordings.stop(session_id):
         return {"status": "recording_stopped"}
     return {"status": "not_recording"}
 
 @app.get("/recording-status")
-async def get_recording_status():
-    global is_recording, recording_start_time
-    if is_recording:
-        elapsed = (datetime.now() - recording_start_time).total_seconds()
-        return {
-            "is_recording": True,
-            "elapsed_time": elapsed,
-            "remaining_time": max(0, 20 - elapsed)
-        }
-    return {"is_recording": False}
-
-@app.post("/analyze-voice")
-async def analyze_voice(file: UploadFile = File(...)):
-    if not file:
-        raise HTTPException(status_code=400, detail="No file uploaded")
-
-    # Get file extension from content type
-    content_type = file.content_type
-    if content_type == "audio/webm":
-        extension = ".webm"
-    elif content_type == "audio/ogg":
-        extension = ".ogg"
-    elif content_type == "audio/mp4":
-        extension = ".mp4"
-    else:
-        extension = ".wav"  # Default to wav
-
-    temp_file_path = None
+async def get_recording_status(request: Request):
+    return recordings.status(session_id_of(request))
+
+@app.post("/analyze-voice", openapi_extra=upload_form("file"))
+async def analyze_voice(request: Request, report: bool = False,
+                        contours: Optional[str] = None, precision: int = 16, user_id: str = "anonymous",
+                        timeline: bool = False, timeline_window: float = Query(10.0, gt=0),
+                        timeline_hop: float = Query(1.0, gt=0), wait: bool = True, profile: str = "standard",
+                        tiles: bool = False):
+    """
+    Analyze an uploaded recording and record it in user_id's history.
+    profile=quick|standard|full picks how much of the analysis runs, within
+    a latency budget each (see modules/profiles.py): quick is a preview
+    computed at once and not recorded in the history; full adds extended
+    metrics and the timeline.
+    report=true also renders a PDF report;
+    contours=msgpack|base64 adds per-frame pitch, RMS and voiced/pause masks
+    (see modules/contours.py), with msgpack switching the whole response to
+    application/msgpack. timeline=true adds the confidence score and its inputs
+    per timeline_window seconds, every timeline_hop seconds (see modules/timeline.py).
+    tiles=true keeps zoomable waveform and spectrogram views, served from
+    /tiles/{analysis_id} (see modules/tiles.py).
+    Standard and full analyses run as jobs on the voice worker pool; wait=false
+    returns the job id at once (202) instead of the result. Recordings over
+    main.STREAMING_MIN_SECONDS are analyzed block by block: they answer with
+    streamed=true, and report, contours, timeline, tiles and the full profile
+    are refused (422).
+    """
+    require("voice")
+    from main import (analysis_params, quick_analysis, voice_response, whole_signal_error, whole_signal_outputs,
+                      RATE, STREAMING_MIN_SECONDS)
+    from modules import profiles
+    from modules.contours import CONTOUR_ENCODINGS, CONTOUR_PRECISIONS
     try:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=extension) as temp_file:
-            content = await file.read()
-            if not content:
-                raise HTTPException(status_code=400, detail="Empty audio file")
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-
-        # Process the audio file
+        analysis_profile = profiles.get_profile(profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if contours is not None and (contours not in CONTOUR_ENCODINGS or precision not in CONTOUR_PRECISIONS):
+        raise HTTPException(status_code=400, detail=f"contours must be one of {list(CONTOUR_ENCODINGS)} "
+                                                    f"and precision one of {sorted(CONTOUR_PRECISIONS)}")
+    quick = analysis_profile.name == "quick"
+    if quick and (report or contours or timeline or tiles):
+        raise HTTPException(status_code=400, detail="The quick profile has no report, contours, timeline or tiles")
+    timeline = timeline or analysis_profile.extended
+
+    # Spooled and decoded to the analysis rate while it arrives
+    upload = await receive_upload(request, "voice", "file", decode_rate=RATE)
+    # Budgets start once the upload is in; its decoding overlaps the transfer
+    started = time.perf_counter()
+    outputs = whole_signal_outputs(report, contours, timeline, analysis_profile.extended, tiles)
+    if outputs and not quick and (upload.seconds or 0) > STREAMING_MIN_SECONDS:
+        upload.discard()
+        raise HTTPException(status_code=422, detail=whole_signal_error(outputs, upload.seconds))
+    if quick and (upload.seconds or 0) > STREAMING_MIN_SECONDS:
+        # The quick profile decodes the whole recording in this process
+        upload.discard()
+        raise HTTPException(status_code=422, detail=f"The quick profile takes recordings of up to "
+                                                    f"{STREAMING_MIN_SECONDS}s, this one is {upload.seconds:.0f}s; "
+                                                    f"use the standard profile")
+
+    def within_budget(response):
+        # Latency against the profile's budget for this recording length
+        elapsed = time.perf_counter() - started
+        budget_ms = analysis_profile.budget_for(upload.seconds)
+        record_profile(analysis_profile.name, elapsed, budget_ms / 1000)
+        return dict(response, profile={"name": analysis_profile.name, "budget_ms": round(budget_ms),
+                                       "elapsed_ms": round(elapsed * 1000, 1)})
+
+    # Re-uploads and client retries of the same take are served from the cache
+    key = cache_key(upload.digest, analysis_params(analysis_profile.name))
+    # Reports, contours, timelines and tiles need the decoded audio, so they always run the analysis
+    # SQLite reads and writes block, so they run on the threadpool like the upload writes
+    cached = None if report or contours or timeline or tiles else await run_in_threadpool(result_cache.get, key)
+    if cached is not None:
+        upload.discard()
+        # The analysis id is only useful while its tiles are still held
+        if tile_store.get(key) is not None:
+            cached = dict(cached, analysis_id=key)
+        if not quick:
+            # The take's existing session, unless this user has not analyzed it before
+            session_id = await run_in_threadpool(history_store.record, user_id, cached, analysis_id=key)
+            cached = dict(cached, session_id=session_id)
+        return JSONResponse(content=within_budget(cached), headers={"X-Cache": "hit"})
+
+    if quick:
+        # Cheap enough to run right here, ahead of anything queued for the workers
         try:
-            (confidence_level, confidence_score, suggestions, 
-             pitch_mean, pitch_std, energy_mean, energy_std, 
-             pause_count, filler_count), y, sr = process_audio_file(temp_file_path)
+            acquired = quick_slots.acquire()
+        except jobs.QueueFull as e:
+            upload.discard()
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        timings = {}
+        try:
+            results = await run_in_threadpool(quick_analysis, upload.analysis_path, timings,
+                                              analysis_profile.transcribe)
         except Exception as e:
-            print(f"Error in process_audio_file: {str(e)}")
-            print(traceback.format_exc())
+            print(f"Error in quick voice analysis: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error processing audio: {str(e)}")
-        
-        return {
-            "confidence_level": confidence_level,
-            "confidence_score": confidence_score,
-            "suggestions": suggestions,
-            "pitch_mean": pitch_mean,
-            "pitch_std": pitch_std,
-            "energy_mean": energy_mean,
-            "energy_std": energy_std,
-            "pause_count": pause_count,
-            "filler_count": filler_count,
-            "volume": int(energy_mean * 100),  # Convert to percentage
-            "clarity": int(100 - (filler_count * 10)),  # Convert to percentage
-            "pace": int(100 - (pause_count * 15))  # Convert to percentage
-        }
-    except HTTPException:
-        raise
+        finally:
+            quick_slots.release(acquired)
+            upload.discard()
+        response = voice_response(results)
+        await run_in_threadpool(result_cache.put, key, response)
+        return JSONResponse(content=within_budget(dict(response, timings=timings)), headers={"X-Cache": "miss"})
+
+    def finish(out):
+        # Runs in the server process, off the event loop, once the worker is done
+        results = out["results"]
+        response = voice_response(results)
+        result_cache.put(key, response)
+        response = dict(response, session_id=history_store.record(user_id, response, analysis_id=key))
+        # Per-stage seconds of this run; not part of the cached result
+        response = dict(response, timings=out["timings"])
+        if "tiles" in out:
+            # Zoomable views for the client, served from /tiles/{analysis_id}
+            tile_store.put(key, out["tiles"])
+            response = dict(response, analysis_id=key)
+        if "report" in out:
+            # Rendered on the report pool; fetch it from /reports/{report_id}
+            response = dict(response, report_id=report_renderer.submit_data(out["report"]))
+        for name in ("timeline", "contours", "extended", "streamed"):
+            if name in out:
+                response = dict(response, **{name: out[name]})
+        return within_budget(response)
+
+    job = submit_job("voice", jobs.voice_job,
+                     (upload.analysis_path, report, contours, precision, timeline, timeline_window, timeline_hop,
+                      analysis_profile.extended, analysis_profile.transcribe, tiles),
+                     finish, upload, meta={"msgpack": contours == "msgpack"})
+    if not wait:
+        return JSONResponse(status_code=202, content=job_manager.describe(job))
+    try:
+        response = await asyncio.wrap_future(job.outcome)
+    except Exception as e:
+        print(f"Error in voice analysis job {job.id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing audio: {str(e)}")
+    return job_response(job.meta, response, {"X-Cache": "miss"})
+
+def submit_job(modality, fn, args, finish, upload, meta=None):
+    """
+    Queue an analysis of an upload, answering 429 when the modality's queue is full
+    """
+    try:
+        job = job_manager.submit(modality, fn, args, finish, meta)
+    except jobs.QueueFull as e:
+        upload.discard()
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    # The upload's files are removed however the job ends
+    job.outcome.add_done_callback(lambda _: upload.discard())
+    return job
+
+def job_response(meta, result, headers=None):
+    if meta.get("msgpack"):
+        import msgpack
+        return Response(content=msgpack.packb(result, use_bin_type=True),
+                        media_type="application/msgpack", headers=headers)
+    return JSONResponse(content=result, headers=headers)
+
+@app.get("/jobs")
+async def get_job_stats():
+    return dict(job_manager.stats(), quick=quick_slots.stats())
+
+async def stored_job(job_id):
+    """
+    (description, result) of a job submitted by another server worker, from the job store
+    """
+    stored = await run_in_threadpool(job_manager.stored, job_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    description, result = stored
+    return dict(description, queue_position=None), result
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        description, _ = await stored_job(job_id)
+        description.pop("meta", None)
+        return description
+    return job_manager.describe(job)
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        description, result = await stored_job(job_id)
+        meta = description.pop("meta", {})
+        if description["status"] == "error":
+            raise HTTPException(status_code=500, detail=f"Job failed: {description['error']}")
+        if description["status"] != "done" or result is None:
+            return JSONResponse(status_code=202, content=description)
+        return job_response(meta, result)
+    if not job.outcome.done():
+        return JSONResponse(status_code=202, content=job_manager.describe(job))
+    if job.outcome.exception() is not None:
+        raise HTTPException(status_code=500, detail=f"Job failed: {job.error}")
+    return job_response(job.meta, job.outcome.result())
+
+@app.get("/reports/{report_id}")
+async def get_report(report_id: str):
+    future = report_renderer.get(report_id)
+    if future is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired report")
+    if not future.done():
+        return JSONResponse(status_code=202, content={"status": "pending"})
+    try:
+        pdf = future.result()
+    except Exception as e:
+        print(f"Error rendering report {report_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error rendering report: {str(e)}")
+    return Response(content=pdf, media_type="application/pdf",
+                    headers={"Content-Disposition": f'attachment; filename="vocaledge-ai_report_{report_id}.pdf"'})
+
+@app.get("/tiles/{analysis_id}")
+async def get_tile_levels(analysis_id: str):
+    pyramid = tile_store.get(analysis_id)
+    if pyramid is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired analysis")
+    return pyramid.describe()
+
+@app.get("/tiles/{analysis_id}/{kind}")
+async def get_tiles(analysis_id: str, kind: str, start: float = 0.0, end: Optional[float] = None,
+                    level: Optional[int] = None, width: int = Query(1024, ge=1)):
+    """
+    Columns of a waveform or spectrogram view covering [start, end) seconds,
+    at the given zoom level or the finest level that fits in `width` columns
+    """
+    pyramid = tile_store.get(analysis_id)
+    if pyramid is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired analysis")
+    end = pyramid.duration if end is None else min(end, pyramid.duration)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be greater than start")
+    try:
+        if level is None:
+            level = pyramid.level_for(kind, start, end, width)
+        return pyramid.view(kind, level, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.websocket("/ws/analyze-voice")
+async def analyze_voice_live(websocket: WebSocket, format: str = "pcm16", rate: int = 48000):
+    """
+    Live analysis while the user speaks. The client sends binary audio chunks:
+    raw little-endian PCM ("pcm16" or "f32", mono at `rate`) or a MediaRecorder
+    stream ("webm" or "ogg" Opus). The server pushes {"type": "update", ...}
+    statistics as audio arrives; after the client sends "stop" it replies with
+    {"type": "result", ...} in the /analyze-voice response format and closes.
+    """
+    await websocket.accept()
+    if not warmup.enabled("voice"):
+        await websocket.close(code=1013, reason="The voice capability is not enabled on this server")
+        return
+    from main import RATE, PITCH_ENGINE, FILLER_METHOD, voice_response
+    from modules.decode import PcmDecoder, StreamDecoder, PCM_FORMATS
+    from modules.streaming import StreamingVoiceAnalyzer
+
+    try:
+        if format in PCM_FORMATS:
+            decoder = PcmDecoder(RATE, rate, format)
+        elif format in LIVE_CONTAINERS:
+            decoder = StreamDecoder(RATE, LIVE_CONTAINERS[format])
+        else:
+            raise ValueError(f"Unknown stream format '{format}', expected one of "
+                             f"{sorted(PCM_FORMATS) + sorted(LIVE_CONTAINERS)}")
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        await websocket.send_json({"type": "error", "message": str(e)})
+        await websocket.close(code=1003)
+        return
+
+    analyzer = StreamingVoiceAnalyzer(RATE, pitch_engine=PITCH_ENGINE, filler_method=FILLER_METHOD)
+    timer = StageTimer("live")
+    last_update = 0.0
+
+    def decode(data):
+        with timer.stage("decode"):
+            return decoder.write(data)
+
+    def feed(samples):
+        with timer.stage("analysis"):
+            analyzer.feed(samples)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes"):
+                # Decoding and analysis run off the event loop
+                samples = await asyncio.to_thread(decode, message["bytes"])
+                await asyncio.to_thread(feed, samples)
+                if analyzer.samples / RATE - last_update >= LIVE_UPDATE_SECONDS:
+                    last_update = analyzer.samples / RATE
+                    await websocket.send_json(dict(analyzer.snapshot(), type="update"))
+            elif message.get("text") == "stop":
+                await asyncio.to_thread(feed, await asyncio.to_thread(decoder.close))
+                results = await asyncio.to_thread(analyzer.finalize)
+                timer.finish(analyzer.frames, analyzer.samples / RATE)
+                await websocket.send_json(dict(voice_response(results), type="result",
+                                               seconds=analyzer.samples / RATE))
+                await websocket.close()
+                return
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Error in live voice analysis: {str(e)}")
         print(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+        await websocket.send_json({"type": "error", "message": str(e)})
+        await websocket.close(code=1011)
     finally:
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-            except:
-                pass
-
-@app.post("/analyze-sign-language")
-async def analyze_sign_language(video: UploadFile = File(...)):
-    """
-    Analyze sign language video and return detected gestures
-    """
-    if not video:
-        raise HTTPException(status_code=400, detail="No video file uploaded")
-        
-    # Accept common video formats
-    allowed_types = ['video/mp4', 'video/mpeg', 'video/x-msvideo', 'video/quicktime', 'application/octet-stream']
-    if video.content_type not in allowed_types:
-        print(f"Content type: {video.content_type}")
-        # Try to determine if it's a video by the file extension
-        if not video.filename.lower().endswith(('.mp4', '.avi', '.mov', '.mpeg', '.mpg')):
-            raise HTTPException(status_code=400, detail="File must be a video")
-        
+        if isinstance(decoder, StreamDecoder):
+            decoder.kill()
+
+@app.get("/history")
+async def get_history(user_id: str = "anonymous", limit: int = Query(20, ge=1, le=100),
+                      cursor: Optional[str] = None):
+    """
+    A page of the user's analyses, newest first; pass next_cursor as cursor for the next page
+    """
+    try:
+        return await run_in_threadpool(history_store.history, user_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/trends")
+async def get_trends(user_id: str = "anonymous", period: str = "day", limit: int = Query(30, ge=1, le=100)):
+    """
+    Per-day or per-week means of the user's confidence score, pauses and fillers
+    """
     try:
-        result = await sign_processor.process_video(video)
-        if result["status"] == "error":
-            raise HTTPException(status_code=500, detail=result["message"])
-        return result
+        return await run_in_threadpool(history_store.trends, user_id, period, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache-stats")
+async def cache_stats():
+    return await run_in_threadpool(result_cache.stats)
+
+@app.post("/analyze-sign-language", openapi_extra=upload_form("video"))
+async def analyze_sign_language(request: Request, wait: bool = True, tracking: Optional[bool] = None,
+                                target_fps: Optional[float] = None, stride: Optional[int] = None,
+                                max_side: Optional[int] = None):
+    """
+    Analyze sign language video and return detected gestures. Runs as a job
+    on the sign worker pool; wait=false returns its job id at once (202).
+    tracking, target_fps, stride and max_side override the worker's SIGN_*
+    settings; the result reports the throughput they gave.
+    """
+    require("sign")
+    settings = {name: value for name, value in (("tracking", tracking), ("target_fps", target_fps),
+                                                ("stride", stride), ("max_side", max_side)) if value is not None}
+    if (target_fps or 0) < 0 or (stride or 0) < 0 or (max_side or 0) < 0:
+        raise HTTPException(status_code=400, detail="target_fps, stride and max_side cannot be negative")
+    # MP4, QuickTime, AVI, MPEG or WebM, recognized from the file's own bytes
+    upload = await receive_upload(request, "sign", "video")
+
+    job = submit_job("sign", jobs.sign_job, (upload.path, settings), None, upload)
+    if not wait:
+        return JSONResponse(status_code=202, content=job_manager.describe(job))
+    try:
+        return await asyncio.wrap_future(job.outcome)
     except Exception as e:
         print(f"Error processing sign language video: {str(e)}")
-        print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error processing video: {str(e)}")
 
 if __name__ == "__main__":
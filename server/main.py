@@ -4,45 +4,52 @@ np.complex = complex  # Fix for librosa compatibility
 import librosa
 import time
 import os
-import speech_recognition as sr
-from scipy.signal import find_peaks
-from scipy.ndimage import median_filter
-import soundfile as sf
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
 from datetime import datetime
-import matplotlib.pyplot as plt
-from reportlab.lib.utils import ImageReader
 import traceback
+from modules.pitch import pitch_stats, FRAME_LENGTH, HOP_LENGTH
+from modules.features import VoiceFeatures
+from modules.vad import VoiceActivity, VAD_ENABLED
+from modules.scoring import score_voice
+from modules.disfluency import envelope_filler_count, FILLER_METHOD
+from modules.streaming import analyze_file_streaming, file_duration
+from modules.audio import PCM16_MAX
+from modules.decode import decode_file, resample, RESAMPLE_QUALITY
+from modules.report import report_data, render_pdf
+from modules.result import VoiceAnalysisResult
+from modules.metrics import StageTimer
+from modules.use_cases import detect_use_case, suggestions_for, rules_version
+from modules.transcription import transcribe as transcribe_audio, ASR_BACKEND, ASR_TIER
+from modules.profiles import QUICK_DECIMATION
 
 # Audio stream config
-RATE = 22050
+# Analysis rate; 16000 also works (pitch stays below 600 Hz) and is cheaper,
+# but changes the frame duration and so shifts results slightly
+RATE = int(os.environ.get("VOICE_ANALYSIS_RATE", 22050))
 RECORD_SECONDS = 20
-
-# NLP Use-Case Detection
-USE_CASE_KEYWORDS = {
-    "interview": ["interview", "introduction", "self intro", "tell me about yourself"],
-    "singing": ["song", "singing", "practice singing"],
-    "public_speaking": ["speech", "presentation", "talk"]
-}
-
-USE_CASE_SUGGESTIONS = {
-    "interview": [
-        "Practice using a timer to simulate interview pressure.",
-        "Use STAR format (Situation, Task, Action, Result) in responses.",
-        "Keep answers concise and confident."
-    ],
-    "singing": [
-        "Avoid dairy or cold items like ice cream before singing.",
-        "Warm up your voice with humming or lip trills.",
-        "Stay hydrated and avoid yelling before sessions."
-    ],
-    "public_speaking": [
-        "Practice in front of a mirror or record yourself.",
-        "Work on intonation and pace to maintain engagement.",
-        "Use pauses strategically for emphasis."
-    ]
-}
+# Pitch engine used by analyze_voice: "piptrack" or the cheaper "yin"
+PITCH_ENGINE = "piptrack"
+# Files longer than this are analyzed block by block with bounded memory
+STREAMING_MIN_SECONDS = 600
+
+def analysis_params(profile="standard"):
+    # Everything besides the audio itself that changes an analysis result;
+    # standard and full give the same result, quick analyzes a decimated signal
+    params = {"rate": RATE, "resample_quality": RESAMPLE_QUALITY, "pitch_engine": PITCH_ENGINE,
+              "filler_method": FILLER_METHOD, "asr_backend": ASR_BACKEND, "asr_tier": ASR_TIER,
+              "vad": VAD_ENABLED, "use_case_rules": rules_version()}
+    if profile == "quick":
+        params["profile"] = profile
+    return params
+
+def whole_signal_outputs(report=False, contours=None, timeline=False, extended=False, tiles=False):
+    # Requested outputs derived from the whole signal's features, which the
+    # streamed analysis of files over STREAMING_MIN_SECONDS does not keep
+    return [name for name, wanted in (("report", report), ("contours", contours), ("timeline", timeline),
+                                      ("extended metrics", extended), ("tiles", tiles)) if wanted]
+
+def whole_signal_error(outputs, seconds):
+    return (f"{', '.join(outputs)} are only available for recordings up to {STREAMING_MIN_SECONDS}s, "
+            f"which are analyzed whole; this one is {seconds:.0f}s")
 
 def check_initial_silence(y, sr, threshold=0.01, duration_sec=5):
     check_samples = int(sr * duration_sec)
@@ -57,51 +64,48 @@ def check_audio_presence(y):
     return True
 
 def detect_use_case_from_text(transcribed_text):
-    transcribed_text = transcribed_text.lower()
-    for use_case, keywords in USE_CASE_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in transcribed_text:
-                return use_case
-    return None
+    # Best-scoring use case of the rule file (data/use_cases.json), if any
+    return detect_use_case(transcribed_text)
 
 def get_custom_suggestions(use_case):
-    return USE_CASE_SUGGESTIONS.get(use_case, [])
-
-def analyze_voice(y, rate):
-    y = y / (np.max(np.abs(y)) + 1e-5)
+    return suggestions_for(use_case)
+
+def analyze_voice(y, rate, pitch_engine=PITCH_ENGINE, transcribe=True, features=None, timer=None):
+    # timer is the StageTimer of an enclosing run; standalone calls record their own
+    standalone = timer is None
+    if standalone:
+        timer = StageTimer("voice")
+    if features is None:
+        features = VoiceFeatures(y / (np.max(np.abs(y)) + 1e-5), rate)
+    y = features.y
     check_initial_silence(y, rate)
     if not check_audio_presence(y):
-        return ("No Voice", 0, ["Please speak clearly and close to the mic."], 0, 0, 0, 0, 0, 0)
-
-    pitches, magnitudes = librosa.piptrack(y=y, sr=rate, fmin=80, fmax=600)
-    pitch_values = []
-    for t in range(magnitudes.shape[1]):
-        index = np.argmax(magnitudes[:, t])
-        pitch = pitches[index, t]
-        if pitch > 50:
-            pitch_values.append(pitch)
-
-    if len(pitch_values) > 5:
-        pitch_values = median_filter(pitch_values, size=5)
-    pitch_std = np.std(pitch_values)
-    pitch_mean = np.mean(pitch_values)
-
-    energy = librosa.feature.rms(y=y)[0]
-    energy_mean = np.mean(energy)
-    energy_std = np.std(energy)
-
-    non_silent = librosa.effects.split(y, top_db=30)
-    total_silence_duration = 0
-    pause_count = 0
-    for i in range(1, len(non_silent)):
-        gap = (non_silent[i][0] - non_silent[i - 1][1]) / rate
-        if gap > 0.25:
-            pause_count += 1
-            total_silence_duration += gap
-
-    smoothed = np.convolve(np.abs(y), np.ones(1000)/1000, mode='valid')
-    peaks, _ = find_peaks(smoothed, height=0.01, distance=1000)
-    filler_count = len(peaks) // 30
+        if standalone:
+            timer.finish(features.n_frames, features.duration)
+        return VoiceAnalysisResult.no_voice()
+
+    # Speech intervals first; the later stages only look at speech
+    with timer.stage("vad"):
+        activity = VoiceActivity(features)
+        if VAD_ENABLED:
+            features.gate(activity.active)
+
+    with timer.stage("pitch"):
+        pitch_mean, pitch_std = pitch_stats(features.pitch(pitch_engine))
+
+    with timer.stage("energy"):
+        energy = features.rms
+        energy_mean = float(np.mean(energy))
+        energy_std = float(np.std(energy))
+
+    pause_count = activity.pause_count
+    total_silence_duration = activity.total_silence
+
+    with timer.stage("fillers"):
+        if FILLER_METHOD == "envelope":
+            filler_count = envelope_filler_count(activity.active_audio(y) if VAD_ENABLED else y)
+        else:
+            filler_count = len(features.fillers())
 
     print("\n[DEBUG INFO]")
     print(f"Pitch Mean: {pitch_mean:.1f} Hz, STD: {pitch_std:.2f}")
@@ -109,137 +113,125 @@ def analyze_voice(y, rate):
     print(f"Pauses: {pause_count}, Total Silence: {total_silence_duration:.2f}s")
     print(f"Filler Count: {filler_count}")
 
-    normalized_pitch_std = np.clip(pitch_std / 50.0, 0, 1)
-    normalized_energy = np.clip(energy_mean * 50, 0, 1)
-    normalized_fillers = np.clip(filler_count / 10, 0, 1)
-    normalized_pauses = np.clip(pause_count / 5, 0, 1)
-
-    confidence_score = 100
-    confidence_score -= normalized_pitch_std * 20
-    confidence_score -= (1 - normalized_energy) * 25
-    confidence_score -= normalized_fillers * 30
-    confidence_score -= normalized_pauses * 25
-    confidence_score = max(confidence_score, 0)
-
-    if confidence_score >= 75:
-        confidence_level = "Confident"
-    elif confidence_score >= 50:
-        confidence_level = "Moderate"
-    else:
-        confidence_level = "Needs Improvement"
-
-    suggestions = []
-    if pitch_std < 20:
-        suggestions.append("Increase pitch variation to sound more engaging.")
-    if energy_mean < 0.02:
-        suggestions.append("Speak with more volume and energy.")
-    if filler_count >= 3:
-        suggestions.append("Practice reducing filler words like 'um' and 'uh'.")
-    if pause_count >= 3:
-        suggestions.append("Minimize long pauses for smoother delivery.")
-
-    try:
-        r = sr.Recognizer()
-        with sr.AudioFile("temp.wav") as source:
-            audio = r.record(source)
-        transcribed_text = r.recognize_google(audio)
-        use_case = detect_use_case_from_text(transcribed_text)
-        suggestions += get_custom_suggestions(use_case)
-    except Exception:
-        pass
-
-    return (confidence_level, confidence_score, suggestions, 
-            pitch_mean, pitch_std, energy_mean, energy_std, pause_count, filler_count)
-
-def generate_spectrogram(y, sr):
-    plt.figure(figsize=(12, 6))
-
-    # Waveform (top)
-    plt.subplot(2, 1, 1)
-    librosa.display.waveshow(y, sr=sr, alpha=0.7, color='mediumpurple')
-    plt.title("Waveform")
-    plt.ylabel("Amplitude")
-    plt.xlabel("")
-
-    # Spectrogram (bottom)
-    plt.subplot(2, 1, 2)
-    S = librosa.stft(y)
-    S_db = librosa.amplitude_to_db(np.abs(S), ref=np.max)
-    librosa.display.specshow(S_db, sr=sr, x_axis='time', y_axis='log', cmap='magma')
-    plt.colorbar(format='%+2.0f dB')
-    plt.title("Spectrogram (Log Frequency Scale)")
-    plt.ylabel("Frequency (Hz)")
-    plt.xlabel("Time (s)")
-
-    plt.tight_layout()
-    plt.savefig("spectrogram.png")
-    plt.close()
-    return "spectrogram.png"
-
-def process_audio_file(file_path):
+    with timer.stage("scoring"):
+        confidence_level, confidence_score, suggestions = score_voice(
+            pitch_std, energy_mean, pause_count, filler_count)
+
+    if transcribe:
+        with timer.stage("transcription"):
+            transcribed_text = transcribe_audio(activity.speech_audio(y) if VAD_ENABLED else y, rate)
+            if transcribed_text:
+                use_case = detect_use_case_from_text(transcribed_text)
+                suggestions += get_custom_suggestions(use_case)
+
+    if standalone:
+        timer.finish(features.n_frames, features.duration)
+    return VoiceAnalysisResult(confidence_level, confidence_score, suggestions,
+                               pitch_mean, pitch_std, energy_mean, energy_std, pause_count, filler_count)
+
+def process_audio_file(file_path, streaming=None, timings=None, transcribe=True):
+    # timings, if given, receives the seconds spent in each stage
+    timer = StageTimer("voice", timings)
     try:
-        # Try to load the audio file with librosa, which supports various formats
-        y, sr = librosa.load(file_path, sr=RATE)
-        
-        # Convert to mono if stereo
-        if len(y.shape) > 1:
-            y = librosa.to_mono(y)
+        duration = file_duration(file_path) or 0
+        if streaming is None:
+            streaming = duration > STREAMING_MIN_SECONDS
+        if streaming:
+            # No whole-signal feature context exists in streaming mode; decoding
+            # is interleaved with the analysis
+            with timer.stage("streaming_analysis"):
+                results = analyze_file_streaming(file_path, RATE, pitch_engine=PITCH_ENGINE,
+                                                 filler_method=FILLER_METHOD)
+            timer.finish(int(duration * RATE) // HOP_LENGTH + 1, duration)
+            return results, None
+
+        # One pass from any container to mono float32 at the analysis rate
+        with timer.stage("decode"):
+            y = decode_file(file_path, RATE)
+        print(f"⏱️ Decoded {len(y) / RATE:.1f}s of audio in {timer.timings['decode']:.2f}s")
+        sr = RATE
         
         # Normalize audio
         y = librosa.util.normalize(y)
         
-        # Save as WAV for speech recognition
-        temp_wav_path = "temp.wav"
-        sf.write(temp_wav_path, y, sr)
-        
-        # Analyze the voice
-        analysis_results = analyze_voice(y, sr)
-        
-        # Clean up temporary file
-        if os.path.exists(temp_wav_path):
-            os.remove(temp_wav_path)
+        # Analyze the voice; every feature and the report spectrogram share one framing
+        with timer.stage("analysis"):
+            features = VoiceFeatures(y, sr)
+            analysis_results = analyze_voice(y, sr, transcribe=transcribe, features=features, timer=timer)
+        timer.finish(features.n_frames, features.duration)
             
-        return analysis_results, y, sr
+        return analysis_results, features
     except Exception as e:
         print(f"Error processing audio file: {str(e)}")
         print(traceback.format_exc())
         raise Exception(f"Failed to process audio file: {str(e)}")
 
+def quick_analysis(file_path, timings=None, transcribe=False):
+    # The quick profile (modules/profiles.py): the analysis at 1/QUICK_DECIMATION of the
+    # rate, frames spanning the same time; the profile does not transcribe
+    timer = StageTimer("voice_quick", timings)
+    rate = RATE // QUICK_DECIMATION
+    with timer.stage("decode"):
+        # Normalized at the full rate, so energy keeps the scale of the standard analysis
+        y = librosa.util.normalize(decode_file(file_path, RATE))
+        y = resample(y, RATE, rate, "fast")
+    with timer.stage("analysis"):
+        features = VoiceFeatures(y, rate, frame_length=FRAME_LENGTH // QUICK_DECIMATION,
+                                 hop_length=HOP_LENGTH // QUICK_DECIMATION)
+        results = analyze_voice(y, rate, transcribe=transcribe, features=features, timer=timer)
+    timer.finish(features.n_frames, features.duration)
+    return results
+
+def voice_response(results):
+    return dict(
+        results.as_dict(),
+        volume=int(results.energy_mean * 100),  # Convert to percentage
+        clarity=int(100 - (results.filler_count * 10)),  # Convert to percentage
+        pace=int(100 - (results.pause_count * 15))  # Convert to percentage
+    )
+
 def record_and_process():
+    import speech_recognition as sr
     print("\n🎙️ Speak now... (Recording for 20 seconds)")
     r = sr.Recognizer()
     with sr.Microphone() as source:
         audio = r.listen(source)
     print("🔍 Processing your voice...")
+    y = np.frombuffer(audio.get_raw_data(), dtype=np.int16) / PCM16_MAX
+    features = VoiceFeatures(y / (np.max(np.abs(y)) + 1e-5), audio.sample_rate)
     try:
-        transcribed_text = r.recognize_google(audio)
+        transcribed_text = transcribe_audio(y, audio.sample_rate)
+        if not transcribed_text:
+            raise ValueError("No speech recognized")
         use_case = detect_use_case_from_text(transcribed_text)
-        result = analyze_voice(audio.get_array_of_samples(), audio.sample_rate)
-        result = (result[0], result[1], result[2], result[3], result[4], result[5], result[6], result[7], result[8])
+        result = analyze_voice(y, audio.sample_rate, transcribe=False, features=features)
         if use_case:
-            result[2] += get_custom_suggestions(use_case)
-        return result, audio.get_array_of_samples(), audio.sample_rate
+            result.suggestions.extend(get_custom_suggestions(use_case))
+        return result, features
     except Exception:
-        return ("No Voice", 0, ["Please speak clearly and close to the mic."], 0, 0, 0, 0, 0, 0), audio.get_array_of_samples(), audio.sample_rate
+        return VoiceAnalysisResult.no_voice(), features
 
-def print_report(level, score, suggestions, pitch_mean, pitch_std, energy_mean, energy_std, pause_count, filler_count):
+def format_report(result):
     report = "\n🧠 Voice Health Report\n"
-    report += f"Confidence Level: {level} ({score:.1f}%)\n"
-    report += f"Pitch Mean: {pitch_mean:.1f} Hz, Pitch STD: {pitch_std:.2f}\n"
-    report += f"Energy Mean: {energy_mean:.5f}, Energy STD: {energy_std:.5f}\n"
-    report += f"Pauses Detected: {pause_count}, Fillers Estimated: {filler_count}\n"
+    report += f"Confidence Level: {result.confidence_level} ({result.confidence_score:.1f}%)\n"
+    report += f"Pitch Mean: {result.pitch_mean:.1f} Hz, Pitch STD: {result.pitch_std:.2f}\n"
+    report += f"Energy Mean: {result.energy_mean:.5f}, Energy STD: {result.energy_std:.5f}\n"
+    report += f"Pauses Detected: {result.pause_count}, Fillers Estimated: {result.filler_count}\n"
     
-    if suggestions:
+    if result.suggestions:
         report += "\nSuggestions to Improve:\n"
-        for s in suggestions:
+        for s in result.suggestions:
             report += f"- {s}\n"
     else:
         report += "✅ Your voice sounds confident and fluent!\n"
-    
+    return report
+
+def print_report(result):
+    report = format_report(result)
     print(report)
     return report
 
-def save_report(report_str, confidence_score, pitch_mean, energy_mean, pause_count, filler_count, y, sr):
+def save_report(report_str, confidence_score, pitch_mean, energy_mean, pause_count, filler_count, features):
     save_choice = input("Do you want to save the report as PDF? (y/n): ")
     if save_choice.lower() == 'y':
         reports_dir = os.path.join(os.getcwd(), "reports")
@@ -250,32 +242,10 @@ def save_report(report_str, confidence_score, pitch_mean, energy_mean, pause_cou
         filepath = os.path.join(reports_dir, filename)
 
         try:
-            graph_path = generate_spectrogram(y, sr)
-
-            c = canvas.Canvas(filepath, pagesize=A4)
-            width, height = A4
-            x_margin, y_margin = 50, 800
-
-            c.setFont("Helvetica-Bold", 18)
-            c.drawString(x_margin, y_margin, "🧠 VocalEdge AI - Voice Health Report")
-            c.setFont("Helvetica", 12)
-            y_margin -= 30
-
-            for line in report_str.split('\n'):
-                c.drawString(x_margin, y_margin, line)
-                y_margin -= 15
-                if y_margin < 100:
-                    c.showPage()
-                    y_margin = 800
-
-            c.showPage()
-            c.setFont("Helvetica-Bold", 14)
-            c.drawString(50, 800, "📊 Spectrogram Visualization")
-            c.drawImage(ImageReader(graph_path), 50, 300, width=500, height=400)
-            c.save()
-
+            # Figures are rendered in memory and embedded without temporary files
+            with open(filepath, "wb") as f:
+                f.write(render_pdf(report_data(report_str, features)))
             print(f"✅ Report saved as {filename} in 'reports/' folder.")
-            os.remove(graph_path)
         except Exception as e:
             print(f"❌ Failed to save PDF report: {e}")
     else:
@@ -290,13 +260,13 @@ def main():
         choice = input("Enter choice (1, 2 or 3): ")
 
         if choice == '1':
-            (result, y, sr) = record_and_process()
+            (result, features) = record_and_process()
         elif choice == '2':
             file_path = input("Enter path to audio file (.wav or .mp3): ")
             if not os.path.exists(file_path):
                 print("❌ File not found.")
                 continue
-            (result, y, sr) = process_audio_file(file_path)
+            (result, features) = process_audio_file(file_path)
         elif choice == '3':
             print("👋 Exiting... Stay vocal!")
             break
@@ -304,8 +274,9 @@ def main():
             print("❌ Invalid choice.")
             continue
 
-        report_str = print_report(*result)
-        save_report(report_str, result[1], result[3], result[5], result[7], result[8], y, sr)
+        report_str = print_report(result)
+        save_report(report_str, result.confidence_score, result.pitch_mean, result.energy_mean,
+                    result.pause_count, result.filler_count, features)
         print("\n🔁 Analysis complete. Returning to menu...")
 
 if __name__ == '__main__':
@@ -0,0 +1,24 @@
+import numpy as np
+from typing import Optional
+
+PCM16_MAX = 32767
+
+
+def to_pcm16(y: np.ndarray) -> np.ndarray:
+    """
+    Convert a float signal in [-1, 1] to int16 PCM samples
+    """
+    pcm = np.clip(y, -1.0, 1.0) * PCM16_MAX
+    return pcm.astype(np.int16)
+
+
+def to_audio_data(y: np.ndarray, rate: int, pcm: Optional[np.ndarray] = None) -> "sr.AudioData":
+    """
+    Wrap a float signal as in-memory PCM for speech_recognition, no WAV file needed.
+    Pass pcm when the int16 samples have already been built.
+    """
+    # Imported here: decode.py and the server only need PCM16_MAX from this module
+    import speech_recognition as sr
+    if pcm is None:
+        pcm = to_pcm16(y)
+    return sr.AudioData(pcm.tobytes(), int(rate), 2)
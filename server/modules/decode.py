@@ -0,0 +1,310 @@
+"""
+Audio decoding straight to mono float32 at the analysis rate.
+
+decode_file handles whole files in one pass. Formats libsndfile reads (WAV,
+FLAC, Ogg Vorbis, MP3) are read with soundfile and resampled with soxr.
+Everything else, including the WebM/Ogg Opus and MP4 uploads from browsers, is
+demuxed, decoded, downmixed and resampled by a single ffmpeg process (the
+imageio-ffmpeg binary). This avoids librosa's slow audioread fallback and its
+separate resampling pass. stream_ffmpeg reads the same ffmpeg output in
+blocks, for files too long to hold whole.
+
+For audio arriving in chunks, PcmDecoder handles raw little-endian PCM and
+StreamDecoder pipes any container ffmpeg understands through an ffmpeg process.
+Both return whatever samples are ready after each write, so analysis can keep
+pace with a recording (or decoding with an upload).
+
+Configuration (environment):
+    VOICE_RESAMPLE_QUALITY  fast | balanced | high (default; matches librosa.load)
+"""
+import os
+import re
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from typing import Iterator, List, Optional
+
+import numpy as np
+import soundfile as sf
+import soxr
+
+from modules.audio import PCM16_MAX
+
+PCM_FORMATS = {"pcm16": np.int16, "f32": np.float32}
+
+# Resampler settings per quality: python-soxr quality, ffmpeg aresample options.
+# "high" is soxr's HQ (20-bit) setting, the one librosa.load uses by default.
+RESAMPLE_QUALITIES = {
+    "fast": ("LQ", "resampler=swr"),
+    "balanced": ("MQ", "resampler=soxr:precision=16"),
+    "high": ("HQ", "resampler=soxr:precision=20"),
+}
+RESAMPLE_QUALITY = os.environ.get("VOICE_RESAMPLE_QUALITY", "high")
+
+# ffmpeg's error output kept for the error message; a corrupt stream can log
+# far more than that
+STDERR_TAIL_BYTES = 8192
+
+_DURATION = re.compile(rb"Duration: (\d+):(\d\d):(\d\d(?:\.\d+)?)")
+
+
+def ffmpeg_exe() -> str:
+    """
+    The ffmpeg binary bundled with imageio-ffmpeg (or IMAGEIO_FFMPEG_EXE)
+    """
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def _check_quality(quality: str) -> None:
+    if quality not in RESAMPLE_QUALITIES:
+        raise ValueError(f"Unknown resample quality '{quality}', expected one of {sorted(RESAMPLE_QUALITIES)}")
+
+
+def resample(y: np.ndarray, rate: int, new_rate: int, quality: str = RESAMPLE_QUALITY) -> np.ndarray:
+    """
+    Mono float32 samples at rate resampled to new_rate
+    """
+    _check_quality(quality)
+    if rate == new_rate:
+        return np.ascontiguousarray(y, dtype=np.float32)
+    return np.ascontiguousarray(soxr.resample(y, rate, new_rate, quality=RESAMPLE_QUALITIES[quality][0]),
+                                dtype=np.float32)
+
+
+def _read_soundfile(file_path: str, rate: int, quality: str) -> np.ndarray:
+    y, file_rate = sf.read(file_path, dtype="float32", always_2d=True)
+    y = y.mean(axis=1)
+    if file_rate != rate:
+        y = soxr.resample(y, file_rate, rate, quality=RESAMPLE_QUALITIES[quality][0])
+    return np.ascontiguousarray(y, dtype=np.float32)
+
+
+def _ffmpeg_command(file_path: str, rate: int, quality: str) -> List[str]:
+    # ffmpeg downmixes stereo as (L + R) / sqrt(2) rather than the mean; the
+    # analysis normalizes to the peak, so only the level differs
+    return [ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-nostdin", "-i", file_path,
+            "-vn", "-af", f"aresample={RESAMPLE_QUALITIES[quality][1]}",
+            "-f", "f32le", "-ac", "1", "-ar", str(rate), "pipe:1"]
+
+
+def _read_ffmpeg(file_path: str, rate: int, quality: str) -> np.ndarray:
+    command = _ffmpeg_command(file_path, rate, quality)
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if process.returncode != 0:
+        errors = process.stderr.decode(errors="replace").strip()
+        raise RuntimeError(f"ffmpeg failed to decode {file_path}: {errors or 'unknown error'}")
+    return np.frombuffer(process.stdout, dtype="<f4").copy()
+
+
+def stream_ffmpeg(file_path: str, rate: int, block_samples: int,
+                  quality: str = RESAMPLE_QUALITY) -> Iterator[np.ndarray]:
+    """
+    Mono float32 blocks of block_samples samples (the last one shorter) of
+    any file ffmpeg can open, at rate
+    """
+    _check_quality(quality)
+    # A temp file takes ffmpeg's errors, so a chatty stream cannot fill a pipe nobody reads
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(_ffmpeg_command(file_path, rate, quality),
+                                   stdout=subprocess.PIPE, stderr=errors)
+        try:
+            while True:
+                data = process.stdout.read(block_samples * 4)
+                if not data:
+                    break
+                yield np.frombuffer(data[:len(data) - len(data) % 4], dtype="<f4").copy()
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+        if process.returncode != 0:
+            errors.seek(max(errors.seek(0, os.SEEK_END) - STDERR_TAIL_BYTES, 0))
+            message = errors.read().decode(errors="replace").strip()
+            raise RuntimeError(f"ffmpeg failed to decode {file_path}: {message or 'unknown error'}")
+
+
+def probe_duration(file_path: str) -> Optional[float]:
+    """
+    Duration in seconds of any audio or video file ffmpeg can open, from its
+    header, or None if ffmpeg cannot tell
+    """
+    # Without an output ffmpeg only prints the input's header and exits
+    process = subprocess.run([ffmpeg_exe(), "-hide_banner", "-nostdin", "-i", file_path],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    match = _DURATION.search(process.stderr)
+    if match is None:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def decode_file(file_path: str, rate: int, quality: str = RESAMPLE_QUALITY) -> np.ndarray:
+    """
+    Mono float32 samples of a file at rate
+    """
+    _check_quality(quality)
+    try:
+        sf.info(file_path)
+    except Exception:
+        return _read_ffmpeg(file_path, rate, quality)
+    return _read_soundfile(file_path, rate, quality)
+
+
+class PcmDecoder:
+    """
+    Raw PCM chunks at input_rate to float32 at rate
+    """
+
+    def __init__(self, rate: int, input_rate: int, sample_format: str = "pcm16",
+                 quality: str = RESAMPLE_QUALITY):
+        _check_quality(quality)
+        if sample_format not in PCM_FORMATS:
+            raise ValueError(f"Unknown PCM format '{sample_format}', expected one of {sorted(PCM_FORMATS)}")
+        self.dtype = np.dtype(PCM_FORMATS[sample_format]).newbyteorder("<")
+        self._carry = b""
+        self._resampler = None
+        if input_rate != rate:
+            self._resampler = soxr.ResampleStream(input_rate, rate, 1, dtype="float32",
+                                                  quality=RESAMPLE_QUALITIES[quality][0])
+
+    def write(self, data: bytes) -> np.ndarray:
+        data = self._carry + data
+        usable = len(data) - len(data) % self.dtype.itemsize
+        self._carry = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=self.dtype).astype(np.float32)
+        if self.dtype.kind == "i":
+            samples /= PCM16_MAX
+        return self._resampler.resample_chunk(samples) if self._resampler else samples
+
+    def close(self) -> np.ndarray:
+        if self._resampler is None:
+            return np.empty(0, dtype=np.float32)
+        return self._resampler.resample_chunk(np.empty(0, dtype=np.float32), last=True)
+
+
+class StreamDecoder:
+    """
+    Container/codec byte stream to float32 at rate through an ffmpeg pipe.
+    Reader threads drain ffmpeg's output and its error log (keeping the last
+    STDERR_TAIL_BYTES), so neither pipe can fill up and block ffmpeg. A write
+    or close that ffmpeg does not accept within its timeout kills ffmpeg and
+    raises TimeoutError.
+    """
+
+    def __init__(self, rate: int, input_format: str = None, quality: str = RESAMPLE_QUALITY,
+                 low_latency: bool = True):
+        _check_quality(quality)
+        command = [ffmpeg_exe(), "-hide_banner", "-loglevel", "error"]
+        if low_latency:
+            # Minimal probing and no input buffering, so samples come out as soon as
+            # their packets arrive rather than after ffmpeg has read ahead
+            command += ["-fflags", "nobuffer", "-probesize", "32", "-analyzeduration", "0"]
+        if input_format:
+            command += ["-f", input_format]
+        command += ["-i", "pipe:0", "-vn", "-af", f"aresample={RESAMPLE_QUALITIES[quality][1]}", "-f", "f32le", "-ac", "1", "-ar", str(rate), "pipe:1"]
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=subprocess.PIPE)
+        self._chunks: List[bytes] = []
+        self._carry = b""
+        self._errors = deque()
+        self._error_bytes = 0
+        self._timed_out = False
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+        self._error_reader = threading.Thread(target=self._read_errors, daemon=True)
+        self._error_reader.start()
+
+    def _read(self) -> None:
+        for chunk in iter(lambda: self._process.stdout.read1(65536), b""):
+            with self._lock:
+                self._chunks.append(chunk)
+
+    def _read_errors(self) -> None:
+        for chunk in iter(lambda: self._process.stderr.read1(65536), b""):
+            with self._lock:
+                self._errors.append(chunk)
+                self._error_bytes += len(chunk)
+                while self._error_bytes - len(self._errors[0]) >= STDERR_TAIL_BYTES:
+                    self._error_bytes -= len(self._errors.popleft())
+
+    @property
+    def errors(self) -> str:
+        """
+        The end of ffmpeg's error output so far
+        """
+        with self._lock:
+            tail = b"".join(self._errors)[-STDERR_TAIL_BYTES:]
+        return tail.decode(errors="replace").strip()
+
+    def _time_out(self) -> None:
+        self._timed_out = True
+        self.kill()
+
+    def _watchdog(self, timeout: Optional[float]) -> Optional[threading.Timer]:
+        if timeout is None:
+            return None
+        watchdog = threading.Timer(timeout, self._time_out)
+        watchdog.daemon = True
+        watchdog.start()
+        return watchdog
+
+    def _drain(self) -> np.ndarray:
+        with self._lock:
+            data = self._carry + b"".join(self._chunks)
+            self._chunks = []
+        usable = len(data) - len(data) % 4
+        self._carry = data[usable:]
+        return np.frombuffer(data[:usable], dtype="<f4").copy()
+
+    def write(self, data: bytes, timeout: Optional[float] = None) -> np.ndarray:
+        """
+        Feed data and return the samples decoded so far; raises TimeoutError if
+        ffmpeg has not taken the data within timeout seconds
+        """
+        watchdog = self._watchdog(timeout)
+        try:
+            self._process.stdin.write(data)
+            self._process.stdin.flush()
+        except OSError:
+            if self._timed_out:
+                raise TimeoutError(f"ffmpeg took no input for {timeout:g}s: {self.errors or 'no error output'}")
+            raise
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+        return self._drain()
+
+    def close(self, timeout: Optional[float] = None) -> np.ndarray:
+        """
+        Flush the decoder and return the remaining samples; raises RuntimeError
+        if ffmpeg fails, and TimeoutError if it has not finished within timeout
+        seconds
+        """
+        watchdog = self._watchdog(timeout)
+        try:
+            if not self._process.stdin.closed:
+                try:
+                    self._process.stdin.close()
+                except OSError:
+                    # ffmpeg exited before reading everything; its status says why
+                    pass
+            self._reader.join()
+            self._error_reader.join()
+            returncode = self._process.wait()
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+        if self._timed_out:
+            raise TimeoutError(f"ffmpeg did not finish within {timeout:g}s: {self.errors or 'no error output'}")
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to decode the stream: {self.errors or 'unknown error'}")
+        return self._drain()
+
+    def kill(self) -> None:
+        if self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
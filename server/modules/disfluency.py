@@ -0,0 +1,210 @@
+"""
+Filler ("um", "uh") detection.
+
+Two detectors, for two jobs:
+
+- filler_count, which feeds the confidence score, is the original
+  amplitude-envelope heuristic: peaks of a 1000-sample moving average of |y|,
+  divided by 30. envelope_filler_count computes it in O(N) with cumulative
+  sums instead of a 1000-tap convolution, and EnvelopeFillerTracker for audio
+  fed in blocks.
+- detect_fillers locates filler segments, for the timeline and the extended
+  metrics. Fillers are sustained, voiced, steady-timbre sounds: frames qualify
+  when the pitch is present and stable, the spectrum barely changes from the
+  previous frame (low spectral flux) and the frame is not silence; runs of
+  such frames lasting FILLER_MIN_SECONDS to FILLER_MAX_SECONDS are fillers.
+  All features come from the shared VoiceFeatures frames, so detection is a
+  few vectorized passes over per-frame arrays.
+
+The spectral detector does not replace the envelope count. It counts on a
+different scale (4 instead of 10 fillers in kushal.mp3, which would move its
+score from 50 to 68), the score's filler weighting was set for the envelope
+count, and no labeled recordings exist to calibrate either against.
+VOICE_FILLER_METHOD=spectral makes filler_count the number of detected
+segments, for comparing the two.
+
+Configuration (environment):
+    VOICE_FILLER_METHOD  envelope (default) | spectral, the detector behind filler_count
+"""
+import os
+
+import numpy as np
+from scipy.signal import find_peaks
+from typing import List, Tuple
+
+from modules.pitch import BLOCK_FRAMES, VOICED_MIN_HZ
+
+# Normalized positive spectral flux at or below which a frame is "steady"
+FLUX_MAX = 0.25
+# Largest frame-to-frame pitch change, in semitones, for a "stable" pitch
+PITCH_JUMP_MAX = 1.0
+# Pitch continuity needs a clean track; piptrack hops between harmonics
+FILLER_PITCH_ENGINE = "yin"
+# Frames quieter than this far below the loudest frame are silence
+ENERGY_TOP_DB = 30
+FILLER_MIN_SECONDS = 0.2
+FILLER_MAX_SECONDS = 1.2
+
+ENVELOPE_WINDOW = 1000
+ENVELOPE_PEAKS_PER_FILLER = 30
+# Envelope windows around a peak the streaming count looks at to space it
+ENVELOPE_CONTEXT = 4
+
+FILLER_METHOD = os.environ.get("VOICE_FILLER_METHOD", "envelope")
+
+
+def moving_average(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Equal to np.convolve(x, np.ones(window) / window, mode='valid') in O(N)
+    """
+    if len(x) < window:
+        return np.empty(0)
+    cumsum = np.concatenate([[0.0], np.cumsum(x, dtype=np.float64)])
+    return (cumsum[window:] - cumsum[:-window]) / window
+
+
+def envelope_filler_count(y: np.ndarray, window: int = ENVELOPE_WINDOW) -> int:
+    """
+    The original amplitude-envelope estimate of the filler count
+    """
+    smoothed = moving_average(np.abs(y), window)
+    if len(smoothed) < 3:
+        return 0
+    peaks, _ = find_peaks(smoothed, height=0.01, distance=window)
+    return len(peaks) // ENVELOPE_PEAKS_PER_FILLER
+
+
+class EnvelopeFillerTracker:
+    """
+    envelope_filler_count of audio fed in consecutive blocks. The moving
+    average is continuous across blocks; peaks are decided once
+    ENVELOPE_CONTEXT windows of the envelope follow them, with as many before
+    them kept for the spacing rule. find_peaks spaces peaks greedily by height
+    over the whole signal, so the count can still differ slightly for short
+    blocks. The height threshold follows the loudest sample so far, given as
+    peak, where the whole-file count sees the signal normalized to a peak of 1.
+    """
+
+    def __init__(self, window: int = ENVELOPE_WINDOW):
+        self.window = window
+        self.peaks = 0
+        self._abs_tail = np.empty(0, dtype=np.float32)
+        # Envelope from _offset on; peaks before _decided are counted
+        self._tail = np.empty(0, dtype=np.float64)
+        self._offset = 0
+        self._decided = 0
+
+    @property
+    def count(self) -> int:
+        return self.peaks // ENVELOPE_PEAKS_PER_FILLER
+
+    def update(self, block: np.ndarray, peak: float, last: bool = False) -> None:
+        window = self.window
+        samples = np.concatenate([self._abs_tail, np.abs(block)])
+        self._abs_tail = samples[max(len(samples) - window + 1, 0):]
+        series = np.concatenate([self._tail, moving_average(samples, window)])
+
+        context = ENVELOPE_CONTEXT * window
+        decided = self._offset + (len(series) if last else len(series) - context - 1)
+        if decided > self._decided:
+            peaks, _ = find_peaks(series, height=0.01 * peak, distance=window)
+            peaks += self._offset
+            self.peaks += int(np.count_nonzero((peaks >= self._decided) & (peaks < decided)))
+            self._decided = decided
+        start = max(self._decided - context - self._offset, 0)
+        self._offset += start
+        self._tail = series[start:]
+
+    def finalize(self, peak: float) -> int:
+        self.update(np.empty(0, dtype=np.float32), peak, last=True)
+        return self.count
+
+
+class FillerTracker:
+    """
+    Frame-level filler detector that accepts frames in consecutive slices.
+    Flux, pitch continuity and open runs are carried between slices, so
+    feeding a recording in pieces gives the same segments as feeding it whole.
+    """
+
+    def __init__(self, sr: int, hop_length: int):
+        self.min_frames = int(np.ceil(FILLER_MIN_SECONDS * sr / hop_length))
+        self.max_frames = int(np.floor(FILLER_MAX_SECONDS * sr / hop_length))
+        self.frames = 0
+        self.segments: List[Tuple[int, int]] = []
+        self._last_column = None
+        self._last_f0 = 0.0
+        self._run_start = None
+
+    def update(self, S: np.ndarray, f0: np.ndarray, rms: np.ndarray, ref_rms: float) -> None:
+        """
+        Add frames given their magnitude spectra, pitch and RMS energy; ref_rms
+        is the loudest frame energy used as the silence reference
+        """
+        for start in range(0, S.shape[1], BLOCK_FRAMES):
+            stop = start + BLOCK_FRAMES
+            self._update(S[:, start:stop], f0[start:stop], rms[start:stop], ref_rms)
+
+    def _update(self, S, f0, rms, ref_rms) -> None:
+        n = S.shape[1]
+        if n == 0:
+            return
+
+        previous = np.empty_like(S)
+        previous[:, 1:] = S[:, :-1]
+        previous[:, 0] = self._last_column if self._last_column is not None else S[:, 0]
+        flux = np.maximum(S - previous, 0).sum(axis=0) / (S.sum(axis=0) + 1e-10)
+        if self._last_column is None:
+            flux[0] = np.inf
+
+        prev_f0 = np.concatenate([[self._last_f0], f0[:-1]])
+        voiced = (f0 > VOICED_MIN_HZ) & (prev_f0 > VOICED_MIN_HZ)
+        jump = np.abs(12 * np.log2(np.where(voiced, f0, 1) / np.where(voiced, prev_f0, 1)))
+
+        loud = rms > ref_rms * 10 ** (-ENERGY_TOP_DB / 20)
+        candidate = voiced & (jump <= PITCH_JUMP_MAX) & (flux <= FLUX_MAX) & loud
+
+        in_run = self._run_start is not None
+        before = np.concatenate([[in_run], candidate[:-1]])
+        starts = list(np.flatnonzero(candidate & ~before) + self.frames)
+        ends = np.flatnonzero(~candidate & before) + self.frames
+        if in_run:
+            starts.insert(0, self._run_start)
+        for run_start, run_end in zip(starts, ends):
+            self._close_run(int(run_start), int(run_end))
+        self._run_start = int(starts[-1]) if len(starts) > len(ends) else None
+
+        self.frames += n
+        self._last_column = S[:, -1].copy()
+        self._last_f0 = float(f0[-1])
+
+    def _close_run(self, start: int, end: int) -> None:
+        if self.min_frames <= end - start <= self.max_frames:
+            self.segments.append((start, end))
+
+    def finalize(self) -> List[Tuple[int, int]]:
+        """
+        (start_frame, end_frame) of every detected filler
+        """
+        if self._run_start is not None:
+            self._close_run(self._run_start, self.frames)
+            self._run_start = None
+        return self.segments
+
+
+def detect_fillers(features, pitch_engine: str = FILLER_PITCH_ENGINE) -> List[Tuple[int, int]]:
+    """
+    Filler segments, as (start_frame, end_frame), of a whole VoiceFeatures context
+    """
+    tracker = FillerTracker(features.sr, features.hop_length)
+    rms = features.rms
+    f0 = features.pitch(pitch_engine)
+    columns = features.active_frames
+    if columns is None:
+        tracker.update(features.magnitude, f0, rms, float(rms.max(initial=0)))
+        return tracker.finalize()
+
+    # Gated: only the analyzed frames are fed. Runs never cross a gap, because
+    # the gate keeps at least one silent frame either side of the speech
+    tracker.update(features.active_magnitude, f0[columns], rms[columns], float(rms.max(initial=0)))
+    return [(int(columns[start]), int(columns[end - 1]) + 1) for start, end in tracker.finalize()]
@@ -0,0 +1,175 @@
+import numpy as np
+import librosa
+from functools import cached_property
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from modules.pitch import FRAME_LENGTH, HOP_LENGTH, BLOCK_FRAMES, track_pitch
+from modules.disfluency import detect_fillers, FILLER_PITCH_ENGINE
+
+
+class VoiceFeatures:
+    """
+    Frames a signal once and derives every per-frame feature from that framing.
+    Features are computed on first access and memoized, so pitch, energy, silence
+    detection and the report spectrogram share a single STFT.
+    """
+
+    def __init__(self, y: np.ndarray, sr: int, frame_length: int = FRAME_LENGTH,
+                 hop_length: int = HOP_LENGTH, center: bool = True):
+        self.y = np.asarray(y, dtype=np.float32)
+        self.sr = sr
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        # Uncentered contexts frame the raw samples as-is, which lets a stream
+        # of blocks line up with the frames of the whole signal
+        self.center = center
+        self._pitch: Dict[str, np.ndarray] = {}
+        self._intervals: Dict[float, np.ndarray] = {}
+        self._fillers: Dict[str, List[Tuple[int, int]]] = {}
+        # Frames pitch and filler analysis are restricted to (see gate)
+        self.active: Optional[np.ndarray] = None
+
+    @property
+    def duration(self) -> float:
+        return len(self.y) / self.sr
+
+    @cached_property
+    def frames(self) -> np.ndarray:
+        """
+        (frame_length, T) strided view of the signal, zero padded when centered
+        """
+        padded = np.pad(self.y, self.frame_length // 2) if self.center else self.y
+        if len(padded) < self.frame_length:
+            return np.empty((self.frame_length, 0), dtype=np.float32)
+        return librosa.util.frame(padded, frame_length=self.frame_length, hop_length=self.hop_length)
+
+    @property
+    def n_frames(self) -> int:
+        return self.frames.shape[1]
+
+    def _stft(self, frames: np.ndarray) -> np.ndarray:
+        window = librosa.filters.get_window("hann", self.frame_length, fftbins=True).astype(np.float32)
+        return np.abs(np.fft.rfft(frames * window[:, None], axis=0))
+
+    @cached_property
+    def magnitude(self) -> np.ndarray:
+        """
+        (1 + frame_length / 2, T) magnitude spectrogram, equal to abs(librosa.stft(y))
+        """
+        S = np.empty((1 + self.frame_length // 2, self.n_frames), dtype=np.float32)
+        for start in range(0, self.n_frames, BLOCK_FRAMES):
+            block = self.frames[:, start:start + BLOCK_FRAMES]
+            S[:, start:start + block.shape[1]] = self._stft(block)
+        return S
+
+    def gate(self, active: np.ndarray) -> None:
+        """
+        Restrict pitch and filler analysis to the frames of a boolean mask;
+        the other frames are reported unvoiced
+        """
+        self.active = np.asarray(active, dtype=bool)
+        self._pitch.clear()
+        self._fillers.clear()
+        self.__dict__.pop("active_magnitude", None)
+
+    @property
+    def active_frames(self) -> Optional[np.ndarray]:
+        """
+        Indices of the gated frames, or None when every frame is analyzed
+        """
+        return None if self.active is None else np.flatnonzero(self.active)
+
+    def frame_blocks(self) -> Iterator[Union[slice, np.ndarray]]:
+        """
+        Column indices of the analyzed frames, at most BLOCK_FRAMES at a time
+        """
+        columns = self.active_frames
+        if columns is None:
+            for start in range(0, self.n_frames, BLOCK_FRAMES):
+                yield slice(start, min(start + BLOCK_FRAMES, self.n_frames))
+        else:
+            for start in range(0, len(columns), BLOCK_FRAMES):
+                yield columns[start:start + BLOCK_FRAMES]
+
+    @cached_property
+    def active_magnitude(self) -> np.ndarray:
+        """
+        Magnitude spectra of the analyzed frames only; silence is never transformed
+        unless the full spectrogram was needed anyway
+        """
+        columns = self.active_frames
+        if columns is None:
+            return self.magnitude
+        if "magnitude" in self.__dict__:
+            return self.magnitude[:, columns]
+        S = np.empty((1 + self.frame_length // 2, len(columns)), dtype=np.float32)
+        for start in range(0, len(columns), BLOCK_FRAMES):
+            block = columns[start:start + BLOCK_FRAMES]
+            S[:, start:start + len(block)] = self._stft(self.frames[:, block])
+        return S
+
+    def expand(self, values: np.ndarray) -> np.ndarray:
+        """
+        Per-frame array from values of the analyzed frames, zero elsewhere
+        """
+        if self.active is None:
+            return values
+        out = np.zeros(self.n_frames, dtype=values.dtype)
+        out[self.active] = values
+        return out
+
+    @cached_property
+    def rms(self) -> np.ndarray:
+        """
+        Per-frame RMS energy, equal to librosa.feature.rms(y=y)[0]
+        """
+        out = np.empty(self.n_frames, dtype=np.float32)
+        for start in range(0, self.n_frames, BLOCK_FRAMES):
+            block = self.frames[:, start:start + BLOCK_FRAMES]
+            out[start:start + block.shape[1]] = np.sqrt(np.mean(np.square(block), axis=0))
+        return out
+
+    @cached_property
+    def spectrogram_db(self) -> np.ndarray:
+        """
+        Log-amplitude spectrogram used by the report
+        """
+        return librosa.amplitude_to_db(self.magnitude, ref=np.max)
+
+    def pitch(self, engine: str = "piptrack") -> np.ndarray:
+        """
+        Per-frame f0 from the named pitch engine (0 when unvoiced)
+        """
+        if engine not in self._pitch:
+            self._pitch[engine] = track_pitch(self, engine=engine)
+        return self._pitch[engine]
+
+    def fillers(self, pitch_engine: str = FILLER_PITCH_ENGINE) -> List[Tuple[int, int]]:
+        """
+        Filler segments as (start_frame, end_frame), see modules.disfluency
+        """
+        if pitch_engine not in self._fillers:
+            self._fillers[pitch_engine] = detect_fillers(self, pitch_engine)
+        return self._fillers[pitch_engine]
+
+    def nonsilent_frames(self, top_db: float = 30) -> np.ndarray:
+        """
+        Boolean mask of frames within top_db of the loudest frame
+        """
+        db = librosa.amplitude_to_db(self.rms, ref=np.max, top_db=None)
+        return db > -top_db
+
+    def nonsilent_intervals(self, top_db: float = 30) -> np.ndarray:
+        """
+        (n, 2) sample intervals of non-silent audio, equal to librosa.effects.split(y, top_db)
+        """
+        if top_db not in self._intervals:
+            non_silent = self.nonsilent_frames(top_db)
+            edges = [np.flatnonzero(np.diff(non_silent.astype(int))) + 1]
+            if non_silent[0]:
+                edges.insert(0, [0])
+            if non_silent[-1]:
+                edges.append([len(non_silent)])
+            edges = librosa.frames_to_samples(np.concatenate(edges), hop_length=self.hop_length)
+            self._intervals[top_db] = np.minimum(edges, len(self.y)).reshape((-1, 2))
+        return self._intervals[top_db]
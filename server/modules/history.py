@@ -0,0 +1,168 @@
+"""
+Per-user history of voice analyses with precomputed trends.
+
+Every analysis is stored as a session row in SQLite (WAL mode, so every
+worker on the machine can write while others read), indexed by user and
+time. A session is recorded once per user and analysis id: cache hits, client
+retries and re-uploads of the same take return the existing session instead
+of counting it again. The same transaction folds the session into daily and weekly rollups
+(count, sums and best score per user and period), so a trend query reads one
+row per day or week shown rather than scanning sessions. Days and ISO weeks
+are in UTC.
+
+History pages are keyset-paginated: next_cursor from one page is passed as
+cursor to get the next, older one.
+
+Configuration (environment):
+    VOICE_HISTORY_PATH  SQLite file (default: history/sessions.db)
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+HISTORY_PATH = os.environ.get("VOICE_HISTORY_PATH", os.path.join("history", "sessions.db"))
+PERIODS = {"day": "%Y-%m-%d", "week": "%G-W%V"}
+MAX_PAGE = 100
+
+# Result fields stored as columns, so they can be rolled up
+SESSION_COLUMNS = ("confidence_level", "confidence_score", "pitch_mean", "pitch_std", "energy_mean",
+                   "energy_std", "pause_count", "filler_count")
+
+
+def bucket(timestamp: float, period: str) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(PERIODS[period])
+
+
+def _encode_cursor(created: float, session_id: int) -> str:
+    return f"{created!r}:{session_id}"
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        created, session_id = cursor.split(":")
+        return float(created), int(session_id)
+    except ValueError:
+        raise ValueError(f"Invalid history cursor '{cursor}'")
+
+
+class HistoryStore:
+    """
+    Sessions and their day/week rollups in one SQLite file
+    """
+
+    def __init__(self, path: str = HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, created REAL NOT NULL, "
+                "analysis_id TEXT, confidence_level TEXT, confidence_score REAL, pitch_mean REAL, pitch_std REAL, "
+                "energy_mean REAL, energy_std REAL, pause_count INTEGER, filler_count INTEGER, result TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS sessions_user_created ON sessions (user_id, created, id)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS sessions_user_analysis ON sessions (user_id, analysis_id)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS rollups ("
+                "user_id TEXT NOT NULL, period TEXT NOT NULL, bucket TEXT NOT NULL, sessions INTEGER NOT NULL, "
+                "score_sum REAL NOT NULL, score_best REAL NOT NULL, pitch_std_sum REAL NOT NULL, "
+                "energy_sum REAL NOT NULL, pause_sum INTEGER NOT NULL, filler_sum INTEGER NOT NULL, "
+                "first REAL NOT NULL, last REAL NOT NULL, PRIMARY KEY (user_id, period, bucket)) WITHOUT ROWID"
+            )
+            self._db.commit()
+        return self._db
+
+    def record(self, user_id: str, result: Dict, analysis_id: Optional[str] = None,
+               created: Optional[float] = None) -> int:
+        """
+        Store one analysis result and fold it into the rollups; returns the
+        session id, which is that of the user's existing session if the
+        analysis_id was recorded before
+        """
+        created = time.time() if created is None else created
+        values = [result.get(name) for name in SESSION_COLUMNS]
+        score = float(result.get("confidence_score") or 0)
+        with self._lock:
+            db = self._connect()
+            with db:
+                if analysis_id is not None:
+                    # Takes the write lock up front, so two workers cannot both insert
+                    db.execute("BEGIN IMMEDIATE")
+                    row = db.execute("SELECT id FROM sessions WHERE user_id = ? AND analysis_id = ? LIMIT 1",
+                                     (user_id, analysis_id)).fetchone()
+                    if row is not None:
+                        return row[0]
+                session_id = db.execute(
+                    f"INSERT INTO sessions (user_id, created, analysis_id, {', '.join(SESSION_COLUMNS)}, result) "
+                    f"VALUES (?, ?, ?, {', '.join('?' * len(SESSION_COLUMNS))}, ?)",
+                    [user_id, created, analysis_id, *values, json.dumps(result)]).lastrowid
+                db.executemany(
+                    "INSERT INTO rollups VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (user_id, period, bucket) DO UPDATE SET "
+                    "sessions = sessions + 1, score_sum = score_sum + excluded.score_sum, "
+                    "score_best = MAX(score_best, excluded.score_best), "
+                    "pitch_std_sum = pitch_std_sum + excluded.pitch_std_sum, "
+                    "energy_sum = energy_sum + excluded.energy_sum, pause_sum = pause_sum + excluded.pause_sum, "
+                    "filler_sum = filler_sum + excluded.filler_sum, "
+                    "first = MIN(first, excluded.first), last = MAX(last, excluded.last)",
+                    [(user_id, period, bucket(created, period), score, score,
+                      float(result.get("pitch_std") or 0), float(result.get("energy_mean") or 0),
+                      int(result.get("pause_count") or 0), int(result.get("filler_count") or 0), created, created)
+                     for period in PERIODS])
+            return session_id
+
+    def history(self, user_id: str, limit: int = 20, cursor: Optional[str] = None) -> Dict:
+        """
+        A page of a user's sessions, newest first
+        """
+        limit = max(1, min(limit, MAX_PAGE))
+        query = "SELECT id, created, analysis_id, result FROM sessions WHERE user_id = ?"
+        params: List = [user_id]
+        if cursor:
+            query += " AND (created, id) < (?, ?)"
+            params += _decode_cursor(cursor)
+        query += " ORDER BY created DESC, id DESC LIMIT ?"
+        with self._lock:
+            rows = self._connect().execute(query, params + [limit + 1]).fetchall()
+        sessions = [dict(json.loads(result), session_id=session_id, analysis_id=analysis_id,
+                         created=datetime.fromtimestamp(created, timezone.utc).isoformat(timespec="seconds"))
+                    for session_id, created, analysis_id, result in rows[:limit]]
+        next_cursor = _encode_cursor(rows[limit - 1][1], rows[limit - 1][0]) if len(rows) > limit else None
+        return {"sessions": sessions, "next_cursor": next_cursor}
+
+    def trends(self, user_id: str, period: str = "day", limit: int = 30) -> Dict:
+        """
+        Per-day or per-week means for a user's most recent periods, oldest first
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Unknown trend period '{period}', expected one of {list(PERIODS)}")
+        limit = max(1, min(limit, MAX_PAGE))
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT bucket, sessions, score_sum, score_best, pitch_std_sum, energy_sum, pause_sum, filler_sum "
+                "FROM rollups WHERE user_id = ? AND period = ? ORDER BY bucket DESC LIMIT ?",
+                (user_id, period, limit)).fetchall()
+        points = [{"period": name, "sessions": sessions, "mean_confidence_score": score_sum / sessions,
+                   "best_confidence_score": score_best, "mean_pitch_std": pitch_std_sum / sessions,
+                   "mean_energy": energy_sum / sessions, "mean_pause_count": pause_sum / sessions,
+                   "mean_filler_count": filler_sum / sessions}
+                  for name, sessions, score_sum, score_best, pitch_std_sum, energy_sum, pause_sum, filler_sum
+                  in reversed(rows)]
+        change = None
+        if len(points) > 1:
+            change = {name: points[-1][name] - points[-2][name]
+                      for name in ("mean_confidence_score", "mean_pause_count", "mean_filler_count")}
+        return {"period": period, "points": points, "change": change}
@@ -0,0 +1,482 @@
+"""
+Background analysis jobs on per-modality process pools.
+
+Voice files and sign videos are analyzed in worker processes, one pool per
+modality, so a long upload never blocks the event loop or the other
+modality's queue. A pool accepts as many jobs as it has workers plus its
+queue limit; past that, submit raises QueueFull with a Retry-After estimate
+from recent job durations, and the server answers 429.
+
+Workers are spawned (not forked from the threaded server) and warm up their
+capability in the pool initializer. They report job start, progress and
+their StageTimer runs and stage errors over an event queue; a listener
+thread applies those to the job records and to the server's metrics
+registry. A job's finish callback runs on a thread of its pool's own, so a
+slow one never holds up the collection of other jobs' results. The newest JOB_KEEP jobs are kept for the status and result
+endpoints.
+
+Analyses run inline in the server process instead (the quick profile) take
+one of QUICK_CONCURRENCY InlineSlots, and answer 429 the same way when none is
+free.
+
+With more than one server worker process, a job's status and result are
+asked for from whichever worker the request lands on. Each JobManager
+publishes its jobs' descriptions, and their results once finished, to a
+JobStore (a SQLite file shared by the workers on the machine, like the
+session store), so any worker can answer for any job for JOB_TTL seconds.
+Queue positions are only known to the worker that submitted the job. The
+memory backend keeps jobs in the submitting process only, for a single
+server worker.
+
+Configuration (environment):
+    VOICE_JOB_WORKERS  voice analysis processes (default: 2)
+    VOICE_JOB_QUEUE    voice jobs allowed to wait for a worker (default: 8)
+    SIGN_JOB_WORKERS   sign analysis processes (default: 1)
+    SIGN_JOB_QUEUE     sign jobs allowed to wait for a worker (default: 4)
+    VOICE_JOB_KEEP     jobs kept for status and result queries (default: 256)
+    VOICE_JOB_STORE    sqlite (default) | memory
+    VOICE_JOB_PATH     SQLite file of the job store (default: state/jobs.db)
+    VOICE_JOB_TTL      seconds a finished job stays in the store (default: 3600)
+    VOICE_QUICK_CONCURRENCY  quick analyses run at once per server worker (default: 2)
+"""
+import json
+import math
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import Callable, Dict, Optional, Tuple
+
+POOL_SIZES = {
+    "voice": (int(os.environ.get("VOICE_JOB_WORKERS", 2)), int(os.environ.get("VOICE_JOB_QUEUE", 8))),
+    "sign": (int(os.environ.get("SIGN_JOB_WORKERS", 1)), int(os.environ.get("SIGN_JOB_QUEUE", 4))),
+}
+JOB_KEEP = int(os.environ.get("VOICE_JOB_KEEP", 256))
+JOB_STORE = os.environ.get("VOICE_JOB_STORE", "sqlite")
+JOB_PATH = os.environ.get("VOICE_JOB_PATH", os.path.join("state", "jobs.db"))
+JOB_TTL = float(os.environ.get("VOICE_JOB_TTL", 3600))
+QUICK_CONCURRENCY = int(os.environ.get("VOICE_QUICK_CONCURRENCY", 2))
+# Assumed job duration until a pool has finished one
+DEFAULT_JOB_SECONDS = 5.0
+
+
+class QueueFull(Exception):
+    def __init__(self, modality: str, retry_after: int):
+        super().__init__(f"The {modality} queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Job:
+    """
+    One submitted analysis. outcome resolves once the worker's value has been
+    finished in the server process.
+    """
+
+    def __init__(self, modality: str, meta: Optional[Dict] = None):
+        self.id = uuid.uuid4().hex
+        self.modality = modality
+        self.meta = meta or {}
+        self.status = "queued"
+        self.progress = 0.0
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.error: Optional[str] = None
+        self.outcome: Future = Future()
+
+    def describe(self) -> Dict:
+        now = time.time()
+        return {
+            "job_id": self.id,
+            "modality": self.modality,
+            "status": self.status,
+            "progress": round(self.progress, 3),
+            "queued_seconds": round((self.started or self.finished or now) - self.submitted, 3),
+            "run_seconds": round((self.finished or now) - self.started, 3) if self.started else None,
+            "error": self.error,
+        }
+
+
+class JobStore:
+    """
+    Job descriptions and finished results in a SQLite file shared by the
+    server workers on one machine
+    """
+
+    def __init__(self, path: str = JOB_PATH, ttl: float = JOB_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS jobs "
+                             "(id TEXT PRIMARY KEY, state TEXT NOT NULL, result BLOB, expires REAL NOT NULL) "
+                             "WITHOUT ROWID")
+            self._db.commit()
+        return self._db
+
+    def put(self, job_id: str, state: Dict, result=None) -> None:
+        """
+        Store a job's description, and its result once it has one
+        """
+        now = time.time()
+        # Results are the server's own response dicts, which may hold bytes (msgpack contours)
+        blob = pickle.dumps(result) if result is not None else None
+        with self._lock:
+            db = self._connect()
+            with db:
+                db.execute("INSERT INTO jobs VALUES (?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                           "state = excluded.state, result = COALESCE(excluded.result, jobs.result), "
+                           "expires = excluded.expires", (job_id, json.dumps(state), blob, now + self.ttl))
+                db.execute("DELETE FROM jobs WHERE expires <= ?", (now,))
+
+    def get(self, job_id: str) -> Optional[Tuple[Dict, object]]:
+        """
+        (description, result or None) of a job, or None if unknown or expired
+        """
+        with self._lock:
+            row = self._connect().execute("SELECT state, result FROM jobs WHERE id = ? AND expires > ?",
+                                          (job_id, time.time())).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), pickle.loads(row[1]) if row[1] is not None else None
+
+
+def open_job_store(backend: str = JOB_STORE) -> Optional[JobStore]:
+    if backend == "memory":
+        return None
+    if backend == "sqlite":
+        return JobStore()
+    raise ValueError(f"Unknown job store '{backend}', expected memory or sqlite")
+
+
+class JobPool:
+    """
+    Process pool of one modality with a bounded number of outstanding jobs
+    """
+
+    def __init__(self, modality: str, workers: int, queue_size: int, events):
+        self.modality = modality
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, queue_size)
+        self._events = events
+        self._pool = self._new_pool()
+        self._outstanding: "OrderedDict[str, Job]" = OrderedDict()
+        self._mean_seconds = DEFAULT_JOB_SECONDS
+        self._lock = threading.Lock()
+        # finish callbacks (caching, history, report submission) run here, not
+        # on the executor's thread that collects every other job's result
+        self._finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{modality}-finish")
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"),
+                                   initializer=_init_worker, initargs=(self.modality, self._events))
+
+    def warm_up(self) -> Dict[str, float]:
+        """
+        Start every worker (each warms up in its initializer) and return the
+        first one's warm-up timings
+        """
+        pings = [self._pool.submit(_ping) for _ in range(self.workers)]
+        return [ping.result() for ping in pings][0]
+
+    def retry_after(self) -> int:
+        waiting = len(self._outstanding) - self.workers + 1
+        return max(1, math.ceil(self._mean_seconds * max(waiting, 1) / self.workers))
+
+    def submit(self, job: Job, fn: Callable, args: tuple, finish: Optional[Callable] = None) -> Job:
+        with self._lock:
+            if len(self._outstanding) >= self.capacity:
+                raise QueueFull(self.modality, self.retry_after())
+            try:
+                future = self._pool.submit(_run, job.id, fn, args)
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory); start over with a fresh pool
+                print(f"⚠️ The {self.modality} worker pool broke, restarting it")
+                self._pool = self._new_pool()
+                future = self._pool.submit(_run, job.id, fn, args)
+            self._outstanding[job.id] = job
+        future.add_done_callback(lambda done: self._hand_off(job, done, finish))
+        return job
+
+    def _hand_off(self, job: Job, done: Future, finish: Optional[Callable]) -> None:
+        try:
+            self._finisher.submit(self._complete, job, done, finish)
+        except RuntimeError:
+            # Shutting down; settle the job here
+            self._complete(job, done, finish)
+
+    def _complete(self, job: Job, done: Future, finish: Optional[Callable]) -> None:
+        try:
+            started, value = done.result()
+            # The start event may still be on its way from the worker
+            job.started = job.started or started
+            result = finish(value) if finish else value
+        except Exception as e:
+            job.status, job.error = "error", str(e) or type(e).__name__
+            job.finished = time.time()
+            job.outcome.set_exception(e)
+        else:
+            job.status, job.progress = "done", 1.0
+            job.finished = time.time()
+            job.outcome.set_result(result)
+        with self._lock:
+            self._outstanding.pop(job.id, None)
+            if job.started and job.status == "done":
+                # Exponentially weighted, so the estimate follows the current load
+                self._mean_seconds = 0.8 * self._mean_seconds + 0.2 * (job.finished - job.started)
+
+    def queue_position(self, job: Job) -> Optional[int]:
+        if job.status != "queued":
+            return None
+        with self._lock:
+            queued = [other for other in self._outstanding.values() if other.status == "queued"]
+        return next((index for index, other in enumerate(queued) if other is job), None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            running = sum(job.status == "running" for job in self._outstanding.values())
+            return {"workers": self.workers, "capacity": self.capacity, "outstanding": len(self._outstanding),
+                    "running": running, "mean_job_seconds": round(self._mean_seconds, 3)}
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._finisher.shutdown(wait=False)
+
+
+class InlineSlots:
+    """
+    Bounded admission for analyses run inline in the server process: acquire()
+    raises QueueFull once limit of them are running
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.running = 0
+        self._mean_seconds = DEFAULT_JOB_SECONDS
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        with self._lock:
+            if self.running >= self.limit:
+                raise QueueFull(self.name, max(1, math.ceil(self._mean_seconds / self.limit)))
+            self.running += 1
+        return time.perf_counter()
+
+    def release(self, acquired: float) -> None:
+        with self._lock:
+            self.running -= 1
+            self._mean_seconds = 0.8 * self._mean_seconds + 0.2 * (time.perf_counter() - acquired)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"limit": self.limit, "running": self.running, "mean_seconds": round(self._mean_seconds, 3)}
+
+
+class JobManager:
+    """
+    The pools of the enabled modalities and every recent job, by id
+    """
+
+    def __init__(self, modalities, keep: int = JOB_KEEP, store: Optional[JobStore] = None):
+        self.keep = keep
+        self.store = store
+        self._events = get_context("spawn").Queue()
+        self.pools = {modality: JobPool(modality, *POOL_SIZES[modality], self._events)
+                      for modality in modalities if modality in POOL_SIZES}
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._listener = threading.Thread(target=self._listen, name="job-events", daemon=True)
+
+    def _listen(self) -> None:
+        from modules.metrics import record
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            kind, payload = event[0], event[1:]
+            if kind == "metrics":
+                # Runs and stage errors of the workers' StageTimers
+                record(*payload)
+                continue
+            job = self.get(payload[0])
+            if job is None:
+                continue
+            if kind == "started" and job.status == "queued":
+                job.status, job.started = "running", time.time()
+            elif kind == "progress" and job.status == "running":
+                job.progress = payload[1]
+            self._publish(job)
+
+    def _publish(self, job: Job) -> None:
+        # Store writes happen here on the listener thread, never on the event loop
+        if self.store is None:
+            return
+        result = None
+        if job.outcome.done() and job.outcome.exception() is None:
+            result = job.outcome.result()
+        try:
+            self.store.put(job.id, dict(job.describe(), meta=job.meta), result)
+        except Exception as e:
+            print(f"⚠️ Could not publish job {job.id} to the job store: {e}")
+
+    def start(self) -> Dict[str, float]:
+        """
+        Spawn and warm up every worker; returns the first worker's warm-up
+        timings per modality-prefixed component
+        """
+        self._listener.start()
+        timings = {}
+        for modality, pool in self.pools.items():
+            timings.update({f"{modality} worker: {name}": seconds for name, seconds in pool.warm_up().items()})
+        return timings
+
+    def submit(self, modality: str, fn: Callable, args: tuple, finish: Optional[Callable] = None,
+               meta: Optional[Dict] = None) -> Job:
+        job = self.pools[modality].submit(Job(modality, meta), fn, args, finish)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.keep:
+                self._jobs.popitem(last=False)
+        if self.store is not None:
+            self._events.put(("submitted", job.id))
+            job.outcome.add_done_callback(lambda _: self._events.put(("finished", job.id)))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stored(self, job_id: str) -> Optional[Tuple[Dict, object]]:
+        """
+        (description, result or None) of a job from the shared store, for jobs
+        another server worker submitted; None if unknown or without a store
+        """
+        return self.store.get(job_id) if self.store is not None else None
+
+    def describe(self, job: Job) -> Dict:
+        return dict(job.describe(), queue_position=self.pools[job.modality].queue_position(job))
+
+    def stats(self) -> Dict:
+        return {modality: pool.stats() for modality, pool in self.pools.items()}
+
+    def shutdown(self) -> None:
+        for pool in self.pools.values():
+            pool.shutdown()
+        self._events.put(None)
+
+
+# Everything below runs in the worker processes
+
+_events = None
+_current_job: Optional[str] = None
+
+
+def _init_worker(modality: str, events) -> None:
+    # One process per core; keep numeric libraries from spawning threads on top
+    for name in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMBA_NUM_THREADS"):
+        os.environ.setdefault(name, "1")
+    global _events
+    _events = events
+    from modules import metrics, warmup
+    metrics.set_sink(lambda kind, values: events.put(("metrics", kind, values)))
+    warmup.warm_up((modality,))
+
+
+def _ping() -> Dict[str, float]:
+    from modules import warmup
+    return dict(warmup.startup_timings)
+
+
+def _run(job_id: str, fn: Callable, args: tuple):
+    global _current_job
+    _current_job = job_id
+    started = time.time()
+    _events.put(("started", job_id))
+    try:
+        return started, fn(*args)
+    finally:
+        _current_job = None
+
+
+def report_progress(fraction: float) -> None:
+    """
+    Progress of the current job, from 0 to 1; does nothing outside a worker
+    """
+    if _events is not None and _current_job is not None:
+        _events.put(("progress", _current_job, float(fraction)))
+
+
+def voice_job(path: str, report: bool = False, contours: Optional[str] = None, precision: int = 16,
+              timeline: bool = False, timeline_window: float = 10.0, timeline_hop: float = 1.0,
+              extended: bool = False, transcribe: bool = True, tiles: bool = False) -> Dict:
+    """
+    Analyze an audio file and prepare the requested outputs derived from its
+    features, which stay in the worker: tiles, report data, contours, the
+    timeline and the extended metrics of the full profile. Files long enough
+    to be streamed keep no features, and asking for any of these raises
+    ValueError.
+    """
+    from main import process_audio_file, format_report, whole_signal_error, whole_signal_outputs, PITCH_ENGINE
+    from modules.report import report_data
+
+    timings = {}
+    results, features = process_audio_file(path, timings=timings, transcribe=transcribe)
+    report_progress(0.8)
+    if features is None:
+        outputs = whole_signal_outputs(report, contours, timeline, extended, tiles)
+        if outputs:
+            # Normally refused before the upload is queued; this catches files
+            # whose duration was unknown until decoded
+            from modules.streaming import file_duration
+            raise ValueError(whole_signal_error(outputs, file_duration(path) or 0))
+        return {"results": results, "timings": timings, "streamed": True}
+    out = {"results": results, "timings": timings}
+    if report:
+        out["report"] = report_data(format_report(results), features)
+    if tiles:
+        # Needs the full-band spectrogram, so only built when asked for
+        from modules.tiles import TilePyramid
+        out["tiles"] = TilePyramid(features)
+    if timeline:
+        from modules.timeline import voice_timeline
+        start = time.perf_counter()
+        out["timeline"] = voice_timeline(features, PITCH_ENGINE, timeline_window, timeline_hop)
+        timings["timeline"] = time.perf_counter() - start
+    if contours:
+        from modules.contours import pack_contours
+        out["contours"] = pack_contours(features, PITCH_ENGINE, contours, precision)
+    if extended:
+        from modules.profiles import extended_metrics
+        start = time.perf_counter()
+        out["extended"] = extended_metrics(features, PITCH_ENGINE)
+        timings["extended"] = time.perf_counter() - start
+    return out
+
+
+def sign_job(path: str, settings: Optional[Dict] = None) -> Dict:
+    """
+    Analyze a video, with settings overriding the worker's TrackingSettings
+    """
+    from modules.sign_language import TrackingSettings
+    from modules.warmup import sign_processor
+
+    tracking = TrackingSettings()._replace(**(settings or {}))
+    results = sign_processor()._analyze_video(path, progress=report_progress, settings=tracking)
+    return {"status": "success", "gestures": results["gestures"], "confidence": results["confidence"],
+            "timestamps": results["timestamps"], "throughput": results["throughput"]}
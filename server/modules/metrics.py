@@ -0,0 +1,195 @@
+"""
+Pipeline instrumentation in the Prometheus text exposition format.
+
+A StageTimer wraps each stage of a pipeline run ("decode", "pitch", ...),
+accumulates the seconds spent per stage and, when the run finishes, records
+them together with the frames and media seconds processed and the real-time
+factor (processing seconds per second of media). The registry is per process;
+with several server workers, each exposes its own /metrics.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RTF_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: observations per bucket (last one is +Inf), sum
+        self._values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            counts, total = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key][1] = total + value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _number(bound)
+                    labels = _labels(self.labelnames, key, f'le="{le}"')
+                    yield f"{self.name}_bucket{labels} {cumulative}"
+                yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}"
+                yield f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "pipeline_stage_seconds", "Seconds spent in each pipeline stage per run", ("pipeline", "stage")))
+STAGE_ERRORS = registry.register(Counter(
+    "pipeline_stage_errors_total", "Pipeline stages that raised", ("pipeline", "stage")))
+RUNS = registry.register(Counter(
+    "pipeline_runs_total", "Completed pipeline runs", ("pipeline",)))
+FRAMES = registry.register(Counter(
+    "pipeline_frames_processed_total", "Analysis frames (audio) or video frames processed", ("pipeline",)))
+MEDIA_SECONDS = registry.register(Counter(
+    "pipeline_media_seconds_processed_total", "Seconds of audio or video processed", ("pipeline",)))
+REAL_TIME_FACTOR = registry.register(Histogram(
+    "pipeline_real_time_factor", "Processing seconds per second of media", ("pipeline",), buckets=RTF_BUCKETS))
+PROFILE_SECONDS = registry.register(Histogram(
+    "analysis_profile_seconds", "Latency of voice analysis requests per profile", ("profile",)))
+PROFILE_OVER_BUDGET = registry.register(Counter(
+    "analysis_profile_over_budget_total", "Voice analysis requests slower than their profile's budget", ("profile",)))
+
+
+# Where finished runs and stage errors go, as (kind, values); worker processes
+# forward them to the server (modules/jobs.py)
+_sink: Optional[Callable[[str, Tuple], None]] = None
+
+
+def set_sink(sink: Optional[Callable[[str, Tuple], None]]) -> None:
+    global _sink
+    _sink = sink
+
+
+def record_run(pipeline: str, timings: Dict[str, float], frames: int, media_seconds: float,
+               elapsed: float) -> None:
+    for name, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, pipeline=pipeline, stage=name)
+    RUNS.inc(pipeline=pipeline)
+    FRAMES.inc(frames, pipeline=pipeline)
+    MEDIA_SECONDS.inc(media_seconds, pipeline=pipeline)
+    if media_seconds > 0:
+        REAL_TIME_FACTOR.observe(elapsed / media_seconds, pipeline=pipeline)
+
+
+def record_stage_error(pipeline: str, stage: str) -> None:
+    STAGE_ERRORS.inc(pipeline=pipeline, stage=stage)
+
+
+RECORDERS = {"run": record_run, "stage_error": record_stage_error}
+
+
+def record(kind: str, values: Tuple) -> None:
+    """
+    Apply a run or stage error to this process's registry
+    """
+    RECORDERS[kind](*values)
+
+
+def _emit(kind: str, values: Tuple) -> None:
+    if _sink is not None:
+        _sink(kind, values)
+    else:
+        record(kind, values)
+
+
+def record_profile(profile: str, seconds: float, budget_seconds: float) -> None:
+    PROFILE_SECONDS.observe(seconds, profile=profile)
+    if seconds > budget_seconds:
+        PROFILE_OVER_BUDGET.inc(profile=profile)
+
+
+class StageTimer:
+    """
+    Times the stages of one pipeline run. Stages may repeat (their seconds add
+    up) or nest; timings, if given, receives the per-stage totals.
+    """
+
+    def __init__(self, pipeline: str, timings: Optional[Dict[str, float]] = None):
+        self.pipeline = pipeline
+        self.timings = {} if timings is None else timings
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            _emit("stage_error", (self.pipeline, name))
+            raise
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def finish(self, frames: int = 0, media_seconds: float = 0.0) -> None:
+        """
+        Record the stage totals and the throughput of the run
+        """
+        _emit("run", (self.pipeline, dict(self.timings), frames, media_seconds, time.perf_counter() - self._start))
@@ -0,0 +1,151 @@
+import numpy as np
+import librosa
+from scipy.ndimage import median_filter
+from typing import Callable, Dict, Tuple
+
+# Voice band searched by every engine
+FMIN = 80
+FMAX = 600
+# Frames below this are treated as unvoiced when summarizing
+VOICED_MIN_HZ = 50
+
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+# Frames per block; bounds the size of the intermediate matrices
+BLOCK_FRAMES = 1024
+
+
+def piptrack_pitch(features, fmin: float = FMIN, fmax: float = FMAX) -> np.ndarray:
+    """
+    Per-frame pitch from librosa.piptrack on the shared magnitude spectrogram,
+    keeping the strongest bin of each frame
+    """
+    S = features.active_magnitude
+    f0 = np.zeros(S.shape[1], dtype=np.float32)
+
+    # piptrack is run on slices of frames so its own pitch and magnitude
+    # matrices never cover the whole recording at once
+    for start in range(0, S.shape[1], BLOCK_FRAMES):
+        pitches, magnitudes = librosa.piptrack(
+            S=S[:, start:start + BLOCK_FRAMES], sr=features.sr, fmin=fmin, fmax=fmax
+        )
+        strongest = magnitudes.argmax(axis=0)
+        f0[start:start + pitches.shape[1]] = pitches[strongest, np.arange(pitches.shape[1])]
+
+    return features.expand(f0)
+
+
+def yin_pitch(features, fmin: float = FMIN, fmax: float = FMAX,
+              trough_threshold: float = 0.1, voicing_threshold: float = 0.25) -> np.ndarray:
+    """
+    Per-frame pitch from a YIN-style difference function restricted to [fmin, fmax],
+    on the same frame grid as the shared spectrogram. Unvoiced frames are returned as 0.
+    """
+    y, sr = features.y, features.sr
+    frame_length, hop_length = features.frame_length, features.hop_length
+    n_frames = features.n_frames
+
+    # The voice band needs nowhere near the analysis rate; averaging blocks of
+    # samples keeps the signal periodic and shrinks every lag axis below
+    factor = max(int(sr // (8 * fmax)), 1)
+    while hop_length % factor:
+        factor -= 1
+    if factor > 1:
+        y = y[:len(y) // factor * factor].reshape(-1, factor).mean(axis=1)
+        sr = sr / factor
+        frame_length //= factor
+        hop_length //= factor
+
+    min_lag = max(int(np.floor(sr / fmax)), 1)
+    max_lag = int(np.ceil(sr / fmin))
+    # Integration window; half of the frame is enough to cover two periods at fmin
+    win = frame_length // 2
+    span = win + max_lag + 1
+    n_fft = 1 << int(np.ceil(np.log2(span)))
+
+    # Offset of each integration window from its frame's start, so the window
+    # sits in the middle of the frame whether or not the context is centered
+    lead = win // 2 - (0 if features.center else frame_length // 2)
+    padded = np.pad(y[max(-lead, 0):].astype(np.float32, copy=False), (max(lead, 0), span))
+    frames = librosa.util.frame(padded, frame_length=span, hop_length=hop_length)[:, :n_frames]
+    f0 = np.zeros(n_frames, dtype=np.float32)
+    lags = np.arange(max_lag + 1)
+
+    for block in features.frame_blocks():
+        x = frames[:, block]
+        cols = np.arange(x.shape[1])
+
+        # Cross-correlation of the window against every lag, via one FFT pair
+        a = np.fft.rfft(x, n=n_fft, axis=0)
+        b = np.fft.rfft(x[win - 1::-1], n=n_fft, axis=0)
+        acf = np.fft.irfft(a * b, n=n_fft, axis=0)[win - 1:win + max_lag]
+
+        energy = np.cumsum(np.square(x, dtype=np.float64), axis=0)
+        energy = np.vstack([np.zeros((1, x.shape[1])), energy])
+        shifted = energy[lags + win] - energy[lags]
+        diff = np.maximum(shifted[:1] + shifted - 2 * acf, 0)
+
+        # Cumulative mean normalized difference
+        diff[0] = 1
+        running = np.cumsum(diff[1:], axis=0) / lags[1:, None]
+        diff[1:] /= np.maximum(running, 1e-10)
+        band = diff[min_lag:]
+
+        # First trough under the threshold, walked forward to its local minimum;
+        # frames without one fall back to the global minimum
+        below = band < trough_threshold
+        has_trough = below.any(axis=0)
+        first = np.where(has_trough, below.argmax(axis=0), band.argmin(axis=0))
+        rising = np.diff(band, axis=0, append=np.inf) > 0
+        rising &= np.arange(band.shape[0])[:, None] >= first
+        lag = rising.argmax(axis=0)
+
+        # Parabolic interpolation around the chosen lag
+        left = band[np.maximum(lag - 1, 0), cols]
+        centre = band[lag, cols]
+        right = band[np.minimum(lag + 1, band.shape[0] - 1), cols]
+        curvature = left - 2 * centre + right
+        shift = np.divide(0.5 * (left - right), curvature, out=np.zeros_like(curvature),
+                          where=np.abs(curvature) > 1e-10)
+        period = min_lag + lag + np.clip(shift, -1, 1)
+
+        voiced = (centre < voicing_threshold) & (shifted[0] > 1e-6 * win)
+        f0[block] = np.where(voiced, sr / period, 0)
+
+    return f0
+
+
+PITCH_ENGINES: Dict[str, Callable[..., np.ndarray]] = {
+    "piptrack": piptrack_pitch,
+    "yin": yin_pitch,
+}
+
+
+def track_pitch(features, engine: str = "piptrack", **kwargs) -> np.ndarray:
+    """
+    Run the named pitch engine over a VoiceFeatures context and return one
+    f0 value per frame (0 when unvoiced)
+    """
+    if engine not in PITCH_ENGINES:
+        raise ValueError(f"Unknown pitch engine '{engine}', expected one of {sorted(PITCH_ENGINES)}")
+    return PITCH_ENGINES[engine](features, **kwargs)
+
+
+def voiced_pitch(f0: np.ndarray) -> np.ndarray:
+    """
+    Voiced frames of a pitch track, median smoothed as analyze_voice always did
+    """
+    values = f0[f0 > VOICED_MIN_HZ]
+    if len(values) > 5:
+        values = median_filter(values, size=5)
+    return values
+
+
+def pitch_stats(f0: np.ndarray) -> Tuple[float, float]:
+    """
+    (pitch_mean, pitch_std) over the voiced frames of a pitch track
+    """
+    values = voiced_pitch(f0)
+    if len(values) == 0:
+        return 0.0, 0.0
+    return float(np.mean(values)), float(np.std(values))
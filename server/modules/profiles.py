@@ -0,0 +1,89 @@
+"""
+Analysis profiles: how much of the voice pipeline a request runs, and the
+latency it is budgeted.
+
+  quick     The standard analysis of the signal decimated by QUICK_DECIMATION,
+            with frame and hop lengths divided alike so every frame spans the
+            same time, and no transcription. It runs in the server process
+            rather than on the job queue, for a preview the UI can show at
+            once. Scores on the bundled recordings equal the standard ones;
+            filler and pause counts near their thresholds may differ by one.
+  standard  The full analysis with transcription and use-case suggestions.
+  full      standard plus extended_metrics and the confidence timeline.
+
+Budgets are the latency from the upload having arrived (it is decoded while
+it arrives, see modules/uploads.py) to the response, for a
+BUDGET_REFERENCE_SECONDS recording, growing linearly for longer ones:
+  quick     100 ms
+  standard  3 s (mostly transcription)
+  full      5 s
+Each response reports its budget and elapsed time, and /metrics counts the
+requests over budget per profile.
+"""
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+
+QUICK_DECIMATION = 2
+BUDGET_REFERENCE_SECONDS = 20.0
+
+
+class Profile(NamedTuple):
+    name: str
+    budget_ms: float
+    transcribe: bool
+    extended: bool
+
+    def budget_for(self, seconds: Optional[float]) -> float:
+        """
+        Budget in ms for a recording of seconds (the reference length if unknown)
+        """
+        return self.budget_ms * max(1.0, (seconds or 0) / BUDGET_REFERENCE_SECONDS)
+
+
+PROFILES = {profile.name: profile for profile in (
+    Profile("quick", 100, transcribe=False, extended=False),
+    Profile("standard", 3000, transcribe=True, extended=False),
+    Profile("full", 5000, transcribe=True, extended=True),
+)}
+
+
+def get_profile(name: str) -> Profile:
+    if name not in PROFILES:
+        raise ValueError(f"Unknown analysis profile '{name}', expected one of {list(PROFILES)}")
+    return PROFILES[name]
+
+
+def extended_metrics(features, pitch_engine: str) -> Dict:
+    """
+    Speech time, pause lengths, pitch range, filler rate and loudness range of
+    a VoiceFeatures context the standard analysis has run on
+    """
+    # Imported here so the server can read the profiles without loading librosa
+    from modules.pitch import voiced_pitch
+    from modules.vad import VoiceActivity
+
+    activity = VoiceActivity(features)
+    speech_seconds = activity.speech_seconds
+    metrics = {
+        "speech_seconds": speech_seconds,
+        "speech_ratio": speech_seconds / features.duration if features.duration else 0.0,
+        "pause_mean_seconds": float(activity.pauses.mean()) if activity.pause_count else 0.0,
+        "pause_max_seconds": float(activity.pauses.max()) if activity.pause_count else 0.0,
+        "fillers_per_minute": len(features.fillers()) * 60 / speech_seconds if speech_seconds else 0.0,
+        "pitch_p10": 0.0,
+        "pitch_p90": 0.0,
+        "pitch_range_semitones": 0.0,
+        "loudness_range_db": 0.0,
+    }
+    pitch = voiced_pitch(features.pitch(pitch_engine))
+    if len(pitch):
+        low, high = np.percentile(pitch, [10, 90])
+        metrics.update(pitch_p10=float(low), pitch_p90=float(high),
+                       pitch_range_semitones=float(12 * np.log2(high / low)))
+    speech_rms = features.rms[activity.speech]
+    if len(speech_rms):
+        quiet, loud = np.percentile(speech_rms, [10, 95])
+        if quiet > 0:
+            metrics["loudness_range_db"] = float(20 * np.log10(loud / quiet))
+    return metrics
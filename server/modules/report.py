@@ -0,0 +1,195 @@
+"""
+PDF voice reports rendered entirely in memory.
+
+Figures are drawn with the object-oriented Figure API on the Agg canvas, so
+no pyplot global state is shared between threads and no GUI backend is
+needed. Each plot is saved into a PNG buffer that goes straight into the
+reportlab canvas; nothing is written to the working directory.
+
+Rendering runs on a dedicated thread pool (ReportRenderer), so PDF
+generation never occupies the workers that run the analysis. Before it is
+handed to the pool, the audio is reduced to a min/max waveform envelope and a
+max-pooled spectrogram at the resolution the page can show.
+
+Configuration (environment):
+    VOICE_REPORT_WORKERS  threads rendering reports (default: 2)
+    VOICE_REPORT_KEEP     finished reports kept for download (default: 64)
+"""
+import io
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from modules.metrics import StageTimer
+
+REPORT_WORKERS = int(os.environ.get("VOICE_REPORT_WORKERS", 2))
+REPORT_KEEP = int(os.environ.get("VOICE_REPORT_KEEP", 64))
+
+# Columns kept for plotting; an A4 page cannot show more
+WAVEFORM_POINTS = 4000
+SPECTROGRAM_COLUMNS = 2000
+FIGURE_DPI = 100
+
+
+def waveform_envelope(y: np.ndarray, points: int = WAVEFORM_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-bucket minimum and maximum of the signal, at most `points` buckets
+    """
+    if len(y) == 0:
+        return np.zeros(1, dtype=np.float32), np.zeros(1, dtype=np.float32)
+    bucket = int(np.ceil(len(y) / points))
+    padded = np.pad(y, (0, -len(y) % bucket), mode="edge").reshape(-1, bucket)
+    return padded.min(axis=1), padded.max(axis=1)
+
+
+def pool_columns(S: np.ndarray, columns: int = SPECTROGRAM_COLUMNS) -> Tuple[np.ndarray, int]:
+    """
+    Max-pool the time axis of a spectrogram down to at most `columns`; returns
+    the pooled spectrogram and the pooling factor
+    """
+    factor = max(int(np.ceil(S.shape[1] / columns)), 1)
+    if factor == 1:
+        return S, 1
+    padded = np.pad(S, ((0, 0), (0, -S.shape[1] % factor)), mode="edge")
+    return padded.reshape(S.shape[0], -1, factor).max(axis=2), factor
+
+
+def report_data(report_str: str, features=None) -> Dict:
+    """
+    Everything a report needs, reduced to plotting resolution; cheap to build
+    on the analysis side and safe to hand to another thread
+    """
+    data = {"text": report_str}
+    if features is not None:
+        low, high = waveform_envelope(features.y)
+        spectrogram, factor = pool_columns(features.spectrogram_db)
+        data.update(sr=features.sr, duration=features.duration, envelope=(low, high),
+                    spectrogram=spectrogram, hop_length=features.hop_length * factor)
+    return data
+
+
+# matplotlib and reportlab are imported on first render, not with the server
+
+def _figure_png(fig) -> bytes:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    buffer = io.BytesIO()
+    FigureCanvasAgg(fig).print_png(buffer)
+    return buffer.getvalue()
+
+
+def render_waveform(data: Dict) -> bytes:
+    from matplotlib.figure import Figure
+    low, high = data["envelope"]
+    fig = Figure(figsize=(12, 3), dpi=FIGURE_DPI)
+    ax = fig.add_subplot()
+    times = np.linspace(0, data["duration"], len(low))
+    ax.fill_between(times, low, high, color="mediumpurple", alpha=0.7, linewidth=0)
+    ax.set_xlim(0, data["duration"])
+    ax.set_title("Waveform")
+    ax.set_ylabel("Amplitude")
+    fig.tight_layout()
+    return _figure_png(fig)
+
+
+def render_spectrogram(data: Dict) -> bytes:
+    from matplotlib.figure import Figure
+    from matplotlib.ticker import ScalarFormatter
+    S = data["spectrogram"]
+    fig = Figure(figsize=(12, 4), dpi=FIGURE_DPI)
+    ax = fig.add_subplot()
+    times = np.arange(S.shape[1]) * data["hop_length"] / data["sr"]
+    freqs = np.linspace(0, data["sr"] / 2, S.shape[0])
+    image = ax.pcolormesh(times, freqs, S, shading="auto", cmap="magma", rasterized=True)
+    # Linear below 64 Hz and logarithmic above, like librosa's "log" frequency axis
+    ax.set_yscale("symlog", linthresh=64, base=2)
+    ax.yaxis.set_major_formatter(ScalarFormatter())
+    ax.set_ylim(0, data["sr"] / 2)
+    fig.colorbar(image, ax=ax, format="%+2.0f dB")
+    ax.set_title("Spectrogram (Log Frequency Scale)")
+    ax.set_ylabel("Frequency (Hz)")
+    ax.set_xlabel("Time (s)")
+    fig.tight_layout()
+    return _figure_png(fig)
+
+
+def render_pdf(data: Dict) -> bytes:
+    """
+    The PDF report as bytes
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+    timer = StageTimer("report")
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    x_margin, y_margin = 50, 800
+
+    c.setFont("Helvetica-Bold", 18)
+    c.drawString(x_margin, y_margin, "🧠 VocalEdge AI - Voice Health Report")
+    c.setFont("Helvetica", 12)
+    y_margin -= 30
+
+    for line in data["text"].split('\n'):
+        c.drawString(x_margin, y_margin, line)
+        y_margin -= 15
+        if y_margin < 100:
+            c.showPage()
+            y_margin = 800
+
+    if "spectrogram" in data:
+        c.showPage()
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(50, 800, "📊 Spectrogram Visualization")
+        with timer.stage("waveform"):
+            waveform = render_waveform(data)
+        with timer.stage("spectrogram"):
+            spectrogram = render_spectrogram(data)
+        c.drawImage(ImageReader(io.BytesIO(waveform)), 50, 620, width=500, height=125)
+        c.drawImage(ImageReader(io.BytesIO(spectrogram)), 50, 380, width=500, height=167)
+    with timer.stage("pdf"):
+        c.save()
+    timer.finish(media_seconds=data.get("duration", 0.0))
+    return buffer.getvalue()
+
+
+class ReportRenderer:
+    """
+    Renders reports on its own thread pool and keeps the most recent ones,
+    by id, until they are downloaded or pushed out
+    """
+
+    def __init__(self, workers: int = REPORT_WORKERS, keep: int = REPORT_KEEP):
+        self.keep = keep
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report")
+        self._reports: "OrderedDict[str, Future]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, report_str: str, features=None) -> str:
+        """
+        Queue a report and return its id
+        """
+        return self.submit_data(report_data(report_str, features))
+
+    def submit_data(self, data: Dict) -> str:
+        """
+        Queue a report whose report_data was prepared elsewhere, e.g. by an analysis job
+        """
+        future = self._pool.submit(render_pdf, data)
+        report_id = uuid.uuid4().hex
+        with self._lock:
+            self._reports[report_id] = future
+            while len(self._reports) > self.keep:
+                self._reports.popitem(last=False)
+        return report_id
+
+    def get(self, report_id: str) -> Optional[Future]:
+        with self._lock:
+            return self._reports.get(report_id)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,43 @@
+from typing import Dict, List
+
+# Order of the values in an analysis result
+RESULT_FIELDS = ("confidence_level", "confidence_score", "suggestions", "pitch_mean", "pitch_std",
+                 "energy_mean", "energy_std", "pause_count", "filler_count")
+
+
+class VoiceAnalysisResult:
+    """
+    Scalar outcome of one voice analysis. Iterating yields the values in
+    RESULT_FIELDS order, so tuple-style unpacking keeps working.
+    """
+    __slots__ = RESULT_FIELDS
+
+    def __init__(self, confidence_level: str, confidence_score: float, suggestions: List[str],
+                 pitch_mean: float, pitch_std: float, energy_mean: float, energy_std: float,
+                 pause_count: int, filler_count: int):
+        self.confidence_level = confidence_level
+        self.confidence_score = float(confidence_score)
+        self.suggestions = list(suggestions)
+        self.pitch_mean = float(pitch_mean)
+        self.pitch_std = float(pitch_std)
+        self.energy_mean = float(energy_mean)
+        self.energy_std = float(energy_std)
+        self.pause_count = int(pause_count)
+        self.filler_count = int(filler_count)
+
+    @classmethod
+    def no_voice(cls) -> "VoiceAnalysisResult":
+        return cls("No Voice", 0, ["Please speak clearly and close to the mic."], 0, 0, 0, 0, 0, 0)
+
+    def __iter__(self):
+        return (getattr(self, name) for name in RESULT_FIELDS)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, VoiceAnalysisResult) and tuple(self) == tuple(other)
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in RESULT_FIELDS)
+        return f"VoiceAnalysisResult({values})"
+
+    def as_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in RESULT_FIELDS}
@@ -0,0 +1,139 @@
+"""
+Content-addressed cache of voice analysis results.
+
+Results are keyed by a hash of the uploaded bytes plus the analysis
+parameters, so a re-upload or client retry of the same take is answered
+without running the pipeline. An in-process LRU sits in front of a SQLite
+file shared by every worker on the machine. Entries expire after a TTL, and
+the SQLite tier evicts least recently used rows once it exceeds its size budget.
+
+Configuration (environment):
+    VOICE_CACHE_PATH         SQLite file (default: cache/analysis_results.db)
+    VOICE_CACHE_TTL          seconds an entry stays valid (default: 7 days)
+    VOICE_CACHE_MAX_BYTES    size budget of the SQLite tier (default: 256 MB)
+    VOICE_CACHE_MEMORY_SIZE  entries kept in the in-process LRU (default: 512)
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+CACHE_PATH = os.environ.get("VOICE_CACHE_PATH", os.path.join("cache", "analysis_results.db"))
+CACHE_TTL = float(os.environ.get("VOICE_CACHE_TTL", 7 * 24 * 3600))
+CACHE_MAX_BYTES = int(os.environ.get("VOICE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+CACHE_MEMORY_SIZE = int(os.environ.get("VOICE_CACHE_MEMORY_SIZE", 512))
+
+
+def cache_key(content, params: Dict) -> str:
+    """
+    Hash of the uploaded bytes and the parameters that affect the result.
+    content is the bytes or a sha256 already fed with them, as from a streamed upload.
+    """
+    digest = hashlib.sha256(content) if isinstance(content, (bytes, bytearray, memoryview)) else content.copy()
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    In-process LRU in front of a persistent SQLite tier, with TTL and size eviction
+    """
+
+    def __init__(self, path: str = CACHE_PATH, ttl: float = CACHE_TTL,
+                 max_bytes: int = CACHE_MAX_BYTES, memory_size: int = CACHE_MEMORY_SIZE):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+            self._db.commit()
+        return self._db
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            db = self._connect()
+            row = db.execute("SELECT value, created FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.counters["misses"] += 1
+                return None
+            db.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            db.commit()
+            value = json.loads(row[0])
+            self._remember(key, row[1], value)
+            self.counters["disk_hits"] += 1
+            return value
+
+    def put(self, key: str, value: Dict) -> None:
+        now = time.time()
+        encoded = json.dumps(value)
+        with self._lock:
+            self._remember(key, now, value)
+            db = self._connect()
+            db.execute("INSERT OR REPLACE INTO results (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                       (key, encoded, len(encoded), now, now))
+            self._evict(db, now)
+            db.commit()
+            self.counters["stores"] += 1
+
+    def _remember(self, key: str, created: float, value: Dict) -> None:
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        evicted = db.execute("DELETE FROM results WHERE created < ?", (now - self.ttl,)).rowcount
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total > self.max_bytes:
+            # Drop least recently used rows until the tier is back under budget
+            rows = db.execute("SELECT key, size FROM results ORDER BY accessed").fetchall()
+            stale = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                stale.append((key,))
+                total -= size
+            db.executemany("DELETE FROM results WHERE key = ?", stale)
+            evicted += len(stale)
+        self.counters["evictions"] += evicted
+
+    def stats(self) -> Dict:
+        with self._lock:
+            db = self._connect()
+            entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+            lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            hits = lookups - self.counters["misses"]
+            return dict(self.counters, memory_entries=len(self._memory), disk_entries=entries,
+                        disk_bytes=size, hit_rate=hits / lookups if lookups else 0.0)
@@ -0,0 +1,49 @@
+import numpy as np
+from typing import List, Tuple
+
+
+def confidence_score(pitch_std, energy_mean, pause_count, filler_count):
+    """
+    Confidence score in [0, 100]; accepts scalars or equally shaped arrays
+    """
+    normalized_pitch_std = np.clip(np.asarray(pitch_std) / 50.0, 0, 1)
+    normalized_energy = np.clip(np.asarray(energy_mean) * 50, 0, 1)
+    normalized_fillers = np.clip(np.asarray(filler_count) / 10, 0, 1)
+    normalized_pauses = np.clip(np.asarray(pause_count) / 5, 0, 1)
+
+    score = 100.0
+    score -= normalized_pitch_std * 20
+    score -= (1 - normalized_energy) * 25
+    score -= normalized_fillers * 30
+    score -= normalized_pauses * 25
+    return np.maximum(score, 0)
+
+
+def confidence_level(score: float) -> str:
+    if score >= 75:
+        return "Confident"
+    elif score >= 50:
+        return "Moderate"
+    return "Needs Improvement"
+
+
+def voice_suggestions(pitch_std: float, energy_mean: float, pause_count: int, filler_count: int) -> List[str]:
+    suggestions = []
+    if pitch_std < 20:
+        suggestions.append("Increase pitch variation to sound more engaging.")
+    if energy_mean < 0.02:
+        suggestions.append("Speak with more volume and energy.")
+    if filler_count >= 3:
+        suggestions.append("Practice reducing filler words like 'um' and 'uh'.")
+    if pause_count >= 3:
+        suggestions.append("Minimize long pauses for smoother delivery.")
+    return suggestions
+
+
+def score_voice(pitch_std: float, energy_mean: float, pause_count: int,
+                filler_count: int) -> Tuple[str, float, List[str]]:
+    """
+    (confidence_level, confidence_score, suggestions) for one set of voice metrics
+    """
+    score = float(confidence_score(pitch_std, energy_mean, pause_count, filler_count))
+    return confidence_level(score), score, voice_suggestions(pitch_std, energy_mean, pause_count, filler_count)
@@ -0,0 +1,183 @@
+"""
+Per-client session state shared by every worker process.
+
+Each client session is a small JSON state under a session id, kept on a
+SessionStore:
+  memory  a dict in this process; one worker only
+  sqlite  a SQLite file in WAL mode, so every worker on the machine sees the
+          same state (put it on /dev/shm to keep it in shared memory)
+Updates are read-modify-write transactions (a lock, or BEGIN IMMEDIATE), so two
+workers starting the same recording cannot both succeed. Sessions expire
+SESSION_TTL seconds after their last update.
+
+RecordingSessions keeps the recording state of the voice endpoints on a store,
+with start times as wall-clock time so every worker computes the same elapsed
+time.
+
+Configuration (environment):
+    VOICE_SESSION_STORE  memory | sqlite (default)
+    VOICE_SESSION_PATH   SQLite file (default: state/sessions.db)
+    VOICE_SESSION_TTL    seconds a session is kept after its last update (default: 1 day)
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+SESSION_STORE = os.environ.get("VOICE_SESSION_STORE", "sqlite")
+SESSION_PATH = os.environ.get("VOICE_SESSION_PATH", os.path.join("state", "sessions.db"))
+SESSION_TTL = float(os.environ.get("VOICE_SESSION_TTL", 24 * 3600))
+MAX_RECORDING_SECONDS = 20
+
+Update = Callable[[Optional[Dict]], Optional[Dict]]
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+class MemorySessionStore:
+    """
+    Session states in a dict of this process
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL):
+        self.ttl = ttl
+        self._sessions: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return entry[0] if entry and entry[1] > time.time() else None
+
+    def update(self, session_id: str, fn: Update) -> Optional[Dict]:
+        """
+        Replace a session's state (None if absent) with fn(state); None deletes it
+        """
+        with self._lock:
+            now = time.time()
+            entry = self._sessions.get(session_id)
+            state = fn(entry[0] if entry and entry[1] > now else None)
+            if state is None:
+                self._sessions.pop(session_id, None)
+            else:
+                self._sessions[session_id] = (state, now + self.ttl)
+            return state
+
+
+class SQLiteSessionStore:
+    """
+    Session states in a SQLite file shared by the workers on one machine
+    """
+
+    def __init__(self, path: str = SESSION_PATH, ttl: float = SESSION_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit mode; update() opens its own write transaction
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS sessions "
+                             "(id TEXT PRIMARY KEY, state TEXT NOT NULL, expires REAL NOT NULL) WITHOUT ROWID")
+        return self._db
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._connect().execute("SELECT state FROM sessions WHERE id = ? AND expires > ?",
+                                          (session_id, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, session_id: str, fn: Update) -> Optional[Dict]:
+        """
+        Replace a session's state (None if absent) with fn(state); None deletes it
+        """
+        with self._lock:
+            db = self._connect()
+            now = time.time()
+            # Takes the write lock up front, so no other worker changes the row in between
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute("SELECT state FROM sessions WHERE id = ? AND expires > ?",
+                                 (session_id, now)).fetchone()
+                state = fn(json.loads(row[0]) if row else None)
+                if state is None:
+                    db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                else:
+                    db.execute("INSERT INTO sessions VALUES (?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                               "state = excluded.state, expires = excluded.expires",
+                               (session_id, json.dumps(state), now + self.ttl))
+                db.execute("DELETE FROM sessions WHERE expires <= ?", (now,))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            return state
+
+
+def open_store(backend: str = SESSION_STORE):
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    raise ValueError(f"Unknown session store '{backend}', expected memory or sqlite")
+
+
+class RecordingSessions:
+    """
+    Whether each session is recording, and since when
+    """
+
+    def __init__(self, store, max_seconds: float = MAX_RECORDING_SECONDS):
+        self.store = store
+        self.max_seconds = max_seconds
+
+    def start(self, session_id: str, restart: bool = False) -> bool:
+        """
+        Start recording; False if the session was already recording (unless restart)
+        """
+        started = []
+
+        def begin(state):
+            state = dict(state or {})
+            if restart or "recording_started" not in state:
+                state["recording_started"] = time.time()
+                started.append(True)
+            return state
+
+        self.store.update(session_id, begin)
+        return bool(started)
+
+    def stop(self, session_id: str) -> bool:
+        """
+        Stop recording; False if the session was not recording
+        """
+        stopped = []
+
+        def end(state):
+            if state and "recording_started" in state:
+                stopped.append(True)
+                state = {name: value for name, value in state.items() if name != "recording_started"}
+            return state or None
+
+        self.store.update(session_id, end)
+        return bool(stopped)
+
+    def status(self, session_id: Optional[str]) -> Dict:
+        state = self.store.get(session_id) if session_id else None
+        if not state or "recording_started" not in state:
+            return {"is_recording": False, "remaining_time": 0}
+        elapsed = max(0.0, time.time() - state["recording_started"])
+        return {"is_recording": True, "elapsed_time": elapsed,
+                "remaining_time": max(0, self.max_seconds - elapsed)}
@@ -1,14 +1,162 @@
-import cv2
+"""
+Sign language gestures from hand landmarks in uploaded videos.
+
+Videos are analyzed in tracking mode by default (TrackingSettings):
+  - Only every stride-th frame is analyzed, the stride following from the
+    target analysis rate and the video's fps; the frames in between are
+    grabbed but not converted.
+  - Frames are downscaled to at most max_side pixels before inference.
+  - Full-frame palm detection finds the hands; after that MediaPipe's
+    tracking mode follows them within a region around them, cropped from the
+    frame, which skips palm detection. The region stays fixed until the next
+    detection, so the tracking graph's last landmarks always refer to the
+    crop it is given, and each new region gets a fresh tracking graph of the
+    video's own HandTracker. Detection on the full frame runs again when
+    tracking loses a hand (e.g. one leaves the region) and every
+    redetect_frames analyzed frames, to pick up hands that came into view.
+Landmarks found in a region are mapped back to full-frame coordinates, so
+gesture prediction sees the same features in every mode. tracking=False
+detects on every analyzed (downscaled) frame, as the static image mode always
+did. Each analysis reports its throughput in frames per second.
+
+Configuration (environment):
+    SIGN_TRACKING         on (default) | off, for palm detection on every analyzed frame
+    SIGN_TARGET_FPS       frames analyzed per second of video (default: 15; 0 for every frame)
+    SIGN_FRAME_STRIDE     analyze every n-th frame, overriding SIGN_TARGET_FPS (default: 0)
+    SIGN_MAX_SIDE         longest side frames are downscaled to (default: 640; 0 to keep)
+    SIGN_REDETECT_FRAMES  analyzed frames between full-frame detections while tracking (default: 30)
+"""
 import numpy as np
-import mediapipe as mp
-import tensorflow as tf
 from fastapi import UploadFile
 import tempfile
 import os
-from typing import Tuple, List, Dict
+import time
+from typing import Callable, Tuple, List, Dict, NamedTuple, Optional
+
+from modules.metrics import StageTimer
+
+# Frames between progress callbacks
+PROGRESS_FRAMES = 15
+# Margin around the hands' bounding box of the tracked region, relative to its size
+ROI_MARGIN = 0.5
+ROI_MIN_SIDE = 96
+
+
+class TrackingSettings(NamedTuple):
+    tracking: bool = os.environ.get("SIGN_TRACKING", "on") != "off"
+    target_fps: float = float(os.environ.get("SIGN_TARGET_FPS", 15))
+    stride: int = int(os.environ.get("SIGN_FRAME_STRIDE", 0))
+    max_side: int = int(os.environ.get("SIGN_MAX_SIDE", 640))
+    redetect_frames: int = int(os.environ.get("SIGN_REDETECT_FRAMES", 30))
+
+    def stride_for(self, fps: float) -> int:
+        """
+        Frames per analyzed frame of a video at fps
+        """
+        if self.stride > 0:
+            return self.stride
+        if self.target_fps > 0 and fps > self.target_fps:
+            return max(1, int(round(fps / self.target_fps)))
+        return 1
+
+
+# Every frame at full resolution, detection on each: the original behavior
+STATIC_SETTINGS = TrackingSettings(tracking=False, target_fps=0, stride=1, max_side=0)
+
+
+def _downscale(image: np.ndarray, max_side: int) -> np.ndarray:
+    import cv2
+    height, width = image.shape[:2]
+    if max_side <= 0 or max(height, width) <= max_side:
+        return image
+    scale = max_side / max(height, width)
+    return cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                      interpolation=cv2.INTER_AREA)
+
+
+class HandTracker:
+    """
+    The hands of one video: full-frame detection until hands are found, then
+    MediaPipe tracking within the region around them until one is lost.
+    close() releases the tracking graph.
+    """
+
+    def __init__(self, processor: "SignLanguageProcessor", settings: TrackingSettings):
+        self.processor = processor
+        self.settings = settings
+        # (x0, y0, x1, y1) in pixels of the full frame
+        self.roi: Optional[Tuple[int, int, int, int]] = None
+        self.expected = 0
+        self.since_detection = 0
+        self.detections = 0
+        # Tracking-mode Hands for the current region and hand count
+        self._tracking = None
+
+    def process(self, frame: np.ndarray) -> List[List[float]]:
+        if self.roi is not None and self.since_detection < self.settings.redetect_frames:
+            hands = self._track(frame)
+            if len(hands) >= self.expected:
+                self.since_detection += 1
+                return hands
+        # No hands yet, tracking lost or time to look for new hands
+        return self._detect(frame)
+
+    def _detect(self, frame: np.ndarray) -> List[List[float]]:
+        self.detections += 1
+        hands = self.processor._landmarks(self.processor.hands, frame, self.settings.max_side)
+        roi = self._region(hands, frame.shape) if hands else None
+        if roi != self.roi or len(hands) != self.expected:
+            # The graph's last landmarks are in the old region's coordinates
+            self._close_tracking()
+        self.roi, self.expected, self.since_detection = roi, len(hands), 0
+        return hands
+
+    def _track(self, frame: np.ndarray) -> List[List[float]]:
+        if self._tracking is None:
+            self._tracking = self.processor.new_tracker(self.expected)
+        x0, y0, x1, y1 = self.roi
+        crop = frame[y0:y1, x0:x1]
+        hands = self.processor._landmarks(self._tracking, crop, self.settings.max_side)
+        height, width = frame.shape[:2]
+        mapped = []
+        for landmarks in hands:
+            points = np.asarray(landmarks).reshape(-1, 3)
+            # Region-relative to full-frame coordinates; z is scaled like x
+            points[:, 0] = (x0 + points[:, 0] * (x1 - x0)) / width
+            points[:, 1] = (y0 + points[:, 1] * (y1 - y0)) / height
+            points[:, 2] *= (x1 - x0) / width
+            mapped.append(points.ravel().tolist())
+        return mapped
+
+    def _close_tracking(self) -> None:
+        if self._tracking is not None:
+            self._tracking.close()
+            self._tracking = None
+
+    def close(self) -> None:
+        self._close_tracking()
+
+    @staticmethod
+    def _region(hands: List[List[float]], shape) -> Tuple[int, int, int, int]:
+        """
+        Square pixel region around every hand's landmarks, with ROI_MARGIN each side
+        """
+        height, width = shape[:2]
+        points = np.concatenate([np.asarray(landmarks).reshape(-1, 3)[:, :2] for landmarks in hands])
+        (left, top), (right, bottom) = points.min(axis=0) * (width, height), points.max(axis=0) * (width, height)
+        side = max(right - left, bottom - top) * (1 + 2 * ROI_MARGIN)
+        side = min(max(side, ROI_MIN_SIDE), width, height)
+        centre_x, centre_y = (left + right) / 2, (top + bottom) / 2
+        x0 = int(np.clip(centre_x - side / 2, 0, width - side))
+        y0 = int(np.clip(centre_y - side / 2, 0, height - side))
+        return x0, y0, x0 + int(side), y0 + int(side)
+
 
 class SignLanguageProcessor:
     def __init__(self):
+        # MediaPipe (and TensorFlow, once a model is loaded) are imported here
+        # rather than at module import, so voice-only servers never load them
+        import mediapipe as mp
         self.mp_hands = mp.solutions.hands
         self.hands = self.mp_hands.Hands(
             static_image_mode=True,
@@ -17,11 +165,38 @@ class SignLanguageProcessor:
         )
         self.mp_drawing = mp.solutions.drawing_utils
         self.model = self._load_model()
+
+    def new_tracker(self, hands: int):
+        """
+        A tracking-mode Hands for hands hands. Tracking graphs keep the last
+        frame's landmarks, so each is used for one region of one video only;
+        MediaPipe runs palm detection on every frame while it tracks fewer
+        than max_num_hands, hence exactly the hands found
+        """
+        return self.mp_hands.Hands(
+            static_image_mode=False,
+            max_num_hands=hands,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
         
-    def _load_model(self) -> tf.keras.Model:
-        # Load your trained model here
+    def _load_model(self) -> Optional["tf.keras.Model"]:
+        # Load your trained model here (import tensorflow as tf first)
         # For now, returning a dummy model
         return None
+
+    def warm_up(self) -> None:
+        """
+        Run one blank frame through the hand tracker (and the model, when one
+        is loaded) so the first request does not pay for graph initialization
+        """
+        self.hands.process(np.zeros((256, 256, 3), dtype=np.uint8))
+        # Loads the landmark model the tracking graphs share
+        tracker = self.new_tracker(2)
+        tracker.process(np.zeros((256, 256, 3), dtype=np.uint8))
+        tracker.close()
+        if self.model is not None:
+            self.model.predict(np.zeros((1, 63), dtype=np.float32), verbose=0)
         
     async def process_video(self, video_file: UploadFile) -> Dict:
         """
@@ -42,7 +217,8 @@ class SignLanguageProcessor:
                 "status": "success",
                 "gestures": results["gestures"],
                 "confidence": results["confidence"],
-                "timestamps": results["timestamps"]
+                "timestamps": results["timestamps"],
+                "throughput": results["throughput"]
             }
             
         except Exception as e:
@@ -54,43 +230,95 @@ class SignLanguageProcessor:
             if temp_file_path and os.path.exists(temp_file_path):
                 os.unlink(temp_file_path)
                 
-    def _analyze_video(self, video_path: str) -> Dict:
+    def _analyze_video(self, video_path: str, progress: Optional[Callable[[float], None]] = None,
+                       settings: Optional[TrackingSettings] = None) -> Dict:
         """
-        Analyze video frames for sign language gestures
+        Analyze video frames for sign language gestures; progress, if given,
+        is called with the fraction of frames done
         """
+        import cv2
+        settings = settings or TrackingSettings()
+        timer = StageTimer("sign")
         cap = cv2.VideoCapture(video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        stride = settings.stride_for(fps)
+        tracker = HandTracker(self, settings) if settings.tracking else None
         gestures = []
         confidence_scores = []
         timestamps = []
+        frame_count = 0
+        analyzed_frames = 0
+        hand_frames = 0
+        start = time.perf_counter()
         
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-                
-            # Process frame
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = self.hands.process(frame_rgb)
-            
-            if results.multi_hand_landmarks:
-                for hand_landmarks in results.multi_hand_landmarks:
-                    # Extract hand landmarks
-                    landmarks = self._extract_landmarks(hand_landmarks)
-                    
-                    # Predict gesture (placeholder for actual model prediction)
-                    gesture, confidence = self._predict_gesture(landmarks)
-                    
-                    gestures.append(gesture)
-                    confidence_scores.append(confidence)
-                    timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+        try:
+            while cap.isOpened():
+                with timer.stage("decode"):
+                    if frame_count % stride:
+                        # Skipped frames are decoded (later frames depend on them) but not converted
+                        ret, frame = cap.grab(), None
+                    else:
+                        ret, frame = cap.read()
+                if not ret:
+                    break
+                frame_count += 1
+                if progress is not None and total_frames and frame_count % PROGRESS_FRAMES == 0:
+                    progress(min(frame_count / total_frames, 1.0))
+                if frame is None:
+                    continue
+                analyzed_frames += 1
                     
-        cap.release()
+                # Process frame
+                with timer.stage("hand_tracking"):
+                    if tracker is not None:
+                        hands = tracker.process(frame)
+                    else:
+                        hands = self._landmarks(self.hands, frame, settings.max_side)
+                
+                if hands:
+                    hand_frames += 1
+                    with timer.stage("gesture_prediction"):
+                        for landmarks in hands:
+                            # Predict gesture (placeholder for actual model prediction)
+                            gesture, confidence = self._predict_gesture(landmarks)
+                            
+                            gestures.append(gesture)
+                            confidence_scores.append(confidence)
+                            timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+        finally:
+            cap.release()
+            if tracker is not None:
+                tracker.close()
+        elapsed = time.perf_counter() - start
+        timer.finish(frame_count, frame_count / fps if fps else 0.0)
         
         return {
             "gestures": gestures,
             "confidence": confidence_scores,
-            "timestamps": timestamps
+            "timestamps": timestamps,
+            "throughput": {
+                "frames": frame_count,
+                "analyzed_frames": analyzed_frames,
+                "stride": stride,
+                "detections": tracker.detections if tracker is not None else analyzed_frames,
+                "hand_frames": hand_frames,
+                "seconds": elapsed,
+                # Video frames consumed, and frames run through the hand model, per second
+                "fps": frame_count / elapsed if elapsed else 0.0,
+                "analyzed_fps": analyzed_frames / elapsed if elapsed else 0.0,
+            },
         }
+
+    def _landmarks(self, hands, image: np.ndarray, max_side: int = 0) -> List[List[float]]:
+        """
+        Landmarks of each hand a MediaPipe Hands finds in a BGR image, in
+        coordinates normalized to the image
+        """
+        import cv2
+        image_rgb = cv2.cvtColor(_downscale(image, max_side), cv2.COLOR_BGR2RGB)
+        results = hands.process(image_rgb)
+        return [self._extract_landmarks(hand_landmarks) for hand_landmarks in results.multi_hand_landmarks or []]
         
     def _extract_landmarks(self, hand_landmarks) -> List[float]:
         """
@@ -0,0 +1,159 @@
+"""
+Zoomable waveform and spectrogram views.
+
+After an analysis asked for tiles, TilePyramid keeps two multi-resolution
+summaries of the recording:
+- waveform: per-column minimum and maximum amplitude, WAVEFORM_BASE_SAMPLES
+  samples per column at level 0;
+- spectrogram: dB magnitude in up to SPECTROGRAM_BANDS log-spaced frequency bands,
+  one column per STFT frame at level 0.
+Each higher level halves the number of columns, keeping the extremes of every
+pair so peaks survive zooming out. A view of any time range at any zoom level
+is then a slice of one level, quantized to bytes, rather than the raw audio.
+"""
+import base64
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+WAVEFORM_BASE_SAMPLES = 64
+SPECTROGRAM_BANDS = 64
+# amplitude_to_db(ref=np.max) output lies within this range
+DB_RANGE = (-80.0, 0.0)
+# Largest number of columns a single view may return
+MAX_COLUMNS = 4096
+TILES_KEEP = int(os.environ.get("VOICE_TILES_KEEP", 32))
+TILE_KINDS = ("waveform", "spectrogram")
+
+
+def _halve(levels: List[np.ndarray], reduce) -> None:
+    """
+    Append coarser levels, each pooling pairs of columns of the previous one
+    along the last axis, until a level has a single column
+    """
+    while levels[-1].shape[-1] > 1:
+        level = levels[-1]
+        if level.shape[-1] % 2:
+            level = np.concatenate([level, level[..., -1:]], axis=-1)
+        levels.append(reduce(level[..., 0::2], level[..., 1::2]))
+
+
+def _b64(values: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(values).tobytes()).decode("ascii")
+
+
+class TilePyramid:
+    """
+    Min/max waveform and dB spectrogram pyramids of one recording
+    """
+
+    def __init__(self, features, base_samples: int = WAVEFORM_BASE_SAMPLES,
+                 bands: int = SPECTROGRAM_BANDS):
+        self.sr = features.sr
+        self.duration = features.duration
+        self.base_samples = base_samples
+        self.hop_length = features.hop_length
+
+        y = features.y
+        padded = np.pad(y, (0, -len(y) % base_samples)).reshape(-1, base_samples)
+        self.wave_min = [padded.min(axis=1)]
+        self.wave_max = [padded.max(axis=1)]
+        _halve(self.wave_min, np.minimum)
+        _halve(self.wave_max, np.maximum)
+
+        # Log-spaced band edges over the FFT bins; the lowest bands hold one bin each
+        S_db = features.spectrogram_db
+        n_bins = S_db.shape[0]
+        edges = np.unique(np.geomspace(1, n_bins, bands + 1).astype(int) - 1)
+        edges[-1] = n_bins
+        self.band_edges_hz = (edges * self.sr / features.frame_length).tolist()
+        self.spectrogram = [np.maximum.reduceat(S_db, edges[:-1], axis=0)]
+        _halve(self.spectrogram, np.maximum)
+
+    def levels(self, kind: str) -> int:
+        return len(self.wave_min if kind == "waveform" else self.spectrogram)
+
+    def seconds_per_column(self, kind: str, level: int) -> float:
+        base = self.base_samples if kind == "waveform" else self.hop_length
+        return base * 2 ** level / self.sr
+
+    def describe(self) -> Dict:
+        return {
+            "duration": self.duration,
+            "max_columns": MAX_COLUMNS,
+            "waveform": {"levels": self.levels("waveform"),
+                         "seconds_per_column": [self.seconds_per_column("waveform", level)
+                                                for level in range(self.levels("waveform"))]},
+            "spectrogram": {"levels": self.levels("spectrogram"), "band_edges_hz": self.band_edges_hz,
+                            "db_range": DB_RANGE,
+                            "seconds_per_column": [self.seconds_per_column("spectrogram", level)
+                                                   for level in range(self.levels("spectrogram"))]},
+        }
+
+    def level_for(self, kind: str, start: float, end: float, width: int) -> int:
+        """
+        Finest level that covers [start, end) in at most `width` columns
+        """
+        for level in range(self.levels(kind)):
+            if (end - start) / self.seconds_per_column(kind, level) <= width:
+                return level
+        return self.levels(kind) - 1
+
+    def view(self, kind: str, level: int, start: float, end: float) -> Dict:
+        """
+        Columns of one level covering [start, end) seconds. Waveform values are
+        int8 amplitudes scaled by 127; spectrogram values are uint8 dB levels
+        across DB_RANGE, one row of bands per column. Both are base64 encoded.
+        """
+        if kind not in TILE_KINDS:
+            raise ValueError(f"Unknown tile kind '{kind}', expected one of {list(TILE_KINDS)}")
+        if not 0 <= level < self.levels(kind):
+            raise ValueError(f"Level must be between 0 and {self.levels(kind) - 1}")
+        step = self.seconds_per_column(kind, level)
+        first = max(int(np.floor(start / step)), 0)
+        last = int(np.ceil(end / step))
+        if last - first > MAX_COLUMNS:
+            raise ValueError(f"View spans {last - first} columns, more than {MAX_COLUMNS}; use a coarser level")
+
+        view = {"kind": kind, "level": level, "start": first * step, "seconds_per_column": step}
+        if kind == "waveform":
+            low = self.wave_min[level][first:last]
+            high = self.wave_max[level][first:last]
+            view.update(columns=len(low), scale=1 / 127,
+                        min=_b64(np.clip(np.floor(low * 127), -127, 127).astype(np.int8)),
+                        max=_b64(np.clip(np.ceil(high * 127), -127, 127).astype(np.int8)))
+        else:
+            columns = self.spectrogram[level][:, first:last]
+            lo, hi = DB_RANGE
+            quantized = np.round((np.clip(columns, lo, hi) - lo) / (hi - lo) * 255).astype(np.uint8)
+            view.update(columns=columns.shape[1], bands=columns.shape[0], db_range=DB_RANGE,
+                        values=_b64(quantized.T))
+        return view
+
+
+class TileStore:
+    """
+    The pyramids of the most recent analyses, by analysis id
+    """
+
+    def __init__(self, keep: int = TILES_KEEP):
+        self.keep = keep
+        self._pyramids: "OrderedDict[str, TilePyramid]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, analysis_id: str, pyramid: TilePyramid) -> None:
+        with self._lock:
+            self._pyramids[analysis_id] = pyramid
+            self._pyramids.move_to_end(analysis_id)
+            while len(self._pyramids) > self.keep:
+                self._pyramids.popitem(last=False)
+
+    def get(self, analysis_id: str) -> Optional[TilePyramid]:
+        with self._lock:
+            pyramid = self._pyramids.get(analysis_id)
+            if pyramid is not None:
+                self._pyramids.move_to_end(analysis_id)
+            return pyramid
@@ -0,0 +1,94 @@
+"""
+Confidence over time: the analyze_voice metrics and score per sliding window.
+
+Windows are strided views (sliding_window_view) over the per-frame arrays of
+a VoiceFeatures context, so the pitch track, RMS, silence mask and filler
+segments are computed once for the whole clip and every window is reduced in
+the same vectorized pass. Per window:
+  pitch_std     spread of the voiced, median-smoothed pitch in the window
+  energy_mean   mean RMS of the peak-normalized signal
+  pause_count   silent gaps longer than PAUSE_MIN_SECONDS centred in the window
+  filler_count  filler segments centred in the window
+The score is confidence_score on those metrics, with pause and filler counts
+scaled to SCORE_REFERENCE_SECONDS (the recording length the score was tuned
+on), so scores are comparable across window lengths. Silence is judged
+against the loudest frame of the whole clip, as in the full analysis.
+"""
+from typing import Dict
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from modules.pitch import VOICED_MIN_HZ, voiced_pitch
+from modules.scoring import confidence_score
+from modules.vad import PAUSE_MIN_SECONDS
+
+WINDOW_SECONDS = 10.0
+HOP_SECONDS = 1.0
+SCORE_REFERENCE_SECONDS = 20.0
+
+
+def _pause_frames(features, top_db: float = 30) -> np.ndarray:
+    """
+    Centre frame of each pause
+    """
+    intervals = features.nonsilent_intervals(top_db)
+    gap_starts, gap_ends = intervals[:-1, 1], intervals[1:, 0]
+    pauses = (gap_ends - gap_starts) / features.sr > PAUSE_MIN_SECONDS
+    return ((gap_starts[pauses] + gap_ends[pauses]) // 2) // features.hop_length
+
+
+def _counts(centres, n_frames: int) -> np.ndarray:
+    counts = np.zeros(n_frames)
+    np.add.at(counts, np.minimum(np.asarray(centres, dtype=int), n_frames - 1), 1)
+    return counts
+
+
+def voice_timeline(features, pitch_engine: str, window_seconds: float = WINDOW_SECONDS,
+                   hop_seconds: float = HOP_SECONDS) -> Dict:
+    """
+    Per-window metrics and confidence score of a VoiceFeatures context; a
+    clip shorter than one window gives a single window over all of it
+    """
+    if window_seconds <= 0 or hop_seconds <= 0:
+        raise ValueError("Timeline window and hop must be positive")
+    frame_seconds = features.hop_length / features.sr
+    n_frames = features.n_frames
+    window = min(max(1, int(round(window_seconds / frame_seconds))), n_frames)
+    hop = max(1, int(round(hop_seconds / frame_seconds)))
+
+    # Voiced pitch smoothed as in the full analysis, put back on the frame axis
+    f0 = features.pitch(pitch_engine)
+    voiced = f0 > VOICED_MIN_HZ
+    pitch = np.zeros(n_frames)
+    pitch[voiced] = voiced_pitch(f0)
+
+    fillers = features.fillers()
+    filler_centres = [(start + end) // 2 for start, end in fillers]
+
+    def windows(values):
+        return sliding_window_view(values, window)[::hop]
+
+    pitch_windows = windows(pitch)
+    voiced_windows = windows(voiced)
+    voiced_count = voiced_windows.sum(axis=1)
+    pitch_mean = pitch_windows.sum(axis=1) / np.maximum(voiced_count, 1)
+    pitch_std = np.sqrt((np.square(pitch_windows - pitch_mean[:, None]) * voiced_windows).sum(axis=1)
+                        / np.maximum(voiced_count, 1))
+    energy_mean = windows(features.rms).mean(axis=1, dtype=np.float64)
+    pause_count = windows(_counts(_pause_frames(features), n_frames)).sum(axis=1)
+    filler_count = windows(_counts(filler_centres, n_frames)).sum(axis=1)
+
+    scale = SCORE_REFERENCE_SECONDS / (window * frame_seconds)
+    scores = confidence_score(pitch_std, energy_mean, pause_count * scale, filler_count * scale)
+    starts = np.arange(len(scores)) * hop * frame_seconds
+    return {
+        "window_seconds": window * frame_seconds,
+        "hop_seconds": hop * frame_seconds,
+        "start": starts.round(3).tolist(),
+        "confidence_score": scores.round(2).tolist(),
+        "pitch_std": pitch_std.round(2).tolist(),
+        "energy_mean": energy_mean.round(5).tolist(),
+        "pause_count": pause_count.astype(int).tolist(),
+        "filler_count": filler_count.astype(int).tolist(),
+    }
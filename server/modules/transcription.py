@@ -0,0 +1,165 @@
+"""
+Speech-to-text backends for the use-case suggestions.
+
+The default backend runs Whisper locally on the CPU. Its model is loaded once
+per worker process and kept warm, and transcripts are cached by a hash of the
+audio, so repeated audio costs nothing and nothing leaves the machine.
+"google" keeps the previous recognize_google behaviour.
+
+Configuration (environment):
+    VOICE_ASR_BACKEND   whisper (default) | google
+    VOICE_ASR_TIER      fast | balanced (default) | accurate, or a Whisper model name
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+from modules.audio import to_audio_data, to_pcm16
+
+ASR_BACKEND = os.environ.get("VOICE_ASR_BACKEND", "whisper")
+ASR_TIER = os.environ.get("VOICE_ASR_TIER", "balanced")
+
+# Size/latency tiers, smallest and fastest first
+WHISPER_TIERS = {
+    "fast": "tiny.en",
+    "balanced": "base.en",
+    "accurate": "small.en",
+}
+WHISPER_RATE = 16000
+CACHE_SIZE = 256
+
+
+class GoogleBackend:
+    """
+    Google Web Speech API through speech_recognition; needs network access
+    """
+    name = "google"
+
+    def __init__(self, tier: str = ASR_TIER):
+        import speech_recognition as sr
+        self.recognizer = sr.Recognizer()
+        self.tier = tier
+
+    def transcribe(self, y: np.ndarray, rate: int, pcm: np.ndarray) -> str:
+        import speech_recognition as sr
+        try:
+            return self.recognizer.recognize_google(to_audio_data(y, rate, pcm))
+        except sr.UnknownValueError:
+            return ""
+
+
+class WhisperBackend:
+    """
+    Local Whisper model on the CPU, loaded once and reused for every request
+    """
+    name = "whisper"
+
+    def __init__(self, tier: str = ASR_TIER):
+        import whisper
+        self.tier = tier
+        self.model_name = WHISPER_TIERS.get(tier, tier)
+        self.model = whisper.load_model(self.model_name, device="cpu")
+        # torch modules are not safe to run from several threads at once
+        self._lock = threading.Lock()
+
+    def transcribe(self, y: np.ndarray, rate: int, pcm: np.ndarray) -> str:
+        from modules.decode import resample
+        audio = resample(y, rate, WHISPER_RATE)
+        with self._lock:
+            # Greedy decoding at temperature 0 with no fallback keeps latency predictable
+            result = self.model.transcribe(audio, language="en", fp16=False, temperature=0.0,
+                                           condition_on_previous_text=False, without_timestamps=True)
+        return result["text"].strip()
+
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "whisper": WhisperBackend,
+}
+
+_backends: Dict[tuple, object] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: str = ASR_BACKEND, tier: str = ASR_TIER):
+    """
+    The process-wide instance of a backend, created on first use
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown transcription backend '{name}', expected one of {sorted(BACKENDS)}")
+    key = (name, tier)
+    with _backends_lock:
+        if key not in _backends:
+            start = time.perf_counter()
+            _backends[key] = BACKENDS[name](tier)
+            print(f"🗣️ Loaded {name} transcription backend ({tier}) in {time.perf_counter() - start:.2f}s")
+        return _backends[key]
+
+
+class TranscriptCache:
+    """
+    Thread-safe LRU of transcripts keyed by an audio content hash
+    """
+
+    def __init__(self, max_entries: int = CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+transcript_cache = TranscriptCache()
+
+
+def audio_hash(pcm: np.ndarray, rate: int) -> str:
+    return hashlib.sha1(pcm.tobytes() + int(rate).to_bytes(4, "little")).hexdigest()
+
+
+def transcribe(y: np.ndarray, rate: int, backend: str = ASR_BACKEND, tier: str = ASR_TIER) -> Optional[str]:
+    """
+    Transcript of a float signal in [-1, 1], or None if transcription failed
+    """
+    pcm = to_pcm16(y)
+    key = f"{backend}:{tier}:{audio_hash(pcm, rate)}"
+    cached = transcript_cache.get(key)
+    if cached is not None:
+        return cached
+    try:
+        text = get_backend(backend, tier).transcribe(y, rate, pcm)
+    except Exception as e:
+        print(f"⚠️ Transcription with {backend} failed: {e}")
+        return None
+    transcript_cache.put(key, text)
+    return text
+
+
+def warm_up(backend: str = ASR_BACKEND, tier: str = ASR_TIER) -> None:
+    """
+    Load the backend and run one inference so the first request pays no setup cost
+    """
+    instance = get_backend(backend, tier)
+    if backend != "google":
+        silence = np.zeros(WHISPER_RATE, dtype=np.float32)
+        instance.transcribe(silence, WHISPER_RATE, to_pcm16(silence))
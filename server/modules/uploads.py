@@ -0,0 +1,312 @@
+"""
+Streamed, size-limited uploads.
+
+The request body is read as it arrives and written to a temp file in
+CHUNK_BYTES pieces, so an upload never sits in memory whole. multipart/form-data
+bodies are parsed incrementally (python-multipart) and only the named file
+field is kept; any other body is taken as the file itself.
+
+Limits are checked as early as they can be: Content-Length before the body is
+read, the size on every chunk, and the file type from the magic bytes of the
+first chunk (the client's content type is not trusted). Voice uploads are also
+decoded while they arrive, by an ffmpeg pipe writing mono float32 at the
+analysis rate to a second temp file: the duration limit applies as samples come
+out, and the analysis reads the decoded file instead of decoding again. When
+ffmpeg gets no audio out of a stream (e.g. an MP4 whose index is at the end),
+fails on it, or stops taking input for DECODE_TIMEOUT seconds, decoding is
+abandoned: the original file is analyzed and its duration read from the
+header.
+
+Configuration (environment):
+    VOICE_UPLOAD_MAX_MB       largest voice upload (default: 100)
+    VOICE_UPLOAD_MAX_SECONDS  longest voice recording (default: 7200; past
+                              main.STREAMING_MIN_SECONDS it is analyzed in blocks)
+    SIGN_UPLOAD_MAX_MB        largest sign video (default: 500)
+    SIGN_UPLOAD_MAX_SECONDS   longest sign video (default: 600)
+    VOICE_UPLOAD_DECODE_TIMEOUT  seconds ffmpeg may take over a chunk or the end of the stream (default: 15)
+"""
+import hashlib
+import os
+import tempfile
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+from modules.decode import StreamDecoder, probe_duration
+
+MB = 1024 * 1024
+CHUNK_BYTES = MB
+# Allowance for the multipart boundaries and headers around the file
+FORM_OVERHEAD_BYTES = 64 * 1024
+SNIFF_BYTES = 12
+DECODE_TIMEOUT = float(os.environ.get("VOICE_UPLOAD_DECODE_TIMEOUT", 15))
+
+
+class UploadLimits(NamedTuple):
+    max_bytes: int
+    max_seconds: float
+    formats: Tuple[str, ...]
+
+
+LIMITS = {
+    "voice": UploadLimits(int(float(os.environ.get("VOICE_UPLOAD_MAX_MB", 100)) * MB),
+                          float(os.environ.get("VOICE_UPLOAD_MAX_SECONDS", 7200)),
+                          ("wav", "flac", "ogg", "mp3", "aac", "webm", "mp4")),
+    "sign": UploadLimits(int(float(os.environ.get("SIGN_UPLOAD_MAX_MB", 500)) * MB),
+                         float(os.environ.get("SIGN_UPLOAD_MAX_SECONDS", 600)),
+                         ("mp4", "mov", "avi", "mpeg", "webm")),
+}
+
+
+class UploadRejected(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def sniff(head: bytes) -> Optional[Tuple[str, str]]:
+    """
+    (format, file extension) of a file from its first bytes, or None if unrecognized
+    """
+    if head[:4] == b"RIFF":
+        return {b"WAVE": ("wav", ".wav"), b"AVI ": ("avi", ".avi")}.get(head[8:12])
+    if head[:4] == b"fLaC":
+        return "flac", ".flac"
+    if head[:4] == b"OggS":
+        return "ogg", ".ogg"
+    if head[:4] == b"\x1aE\xdf\xa3":
+        # EBML header of WebM and Matroska
+        return "webm", ".webm"
+    if head[4:8] == b"ftyp":
+        return ("mov", ".mov") if head[8:12] == b"qt  " else ("mp4", ".mp4")
+    if head[4:8] in (b"moov", b"mdat", b"wide", b"free"):
+        # QuickTime files from before the ftyp box
+        return "mov", ".mov"
+    if head[:4] in (b"\x00\x00\x01\xba", b"\x00\x00\x01\xb3"):
+        return "mpeg", ".mpg"
+    if head[:3] == b"ID3":
+        return "mp3", ".mp3"
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        # MPEG audio frame sync; layer bits 00 mean AAC in an ADTS stream
+        return ("aac", ".aac") if head[1] & 0x06 == 0 else ("mp3", ".mp3")
+    return None
+
+
+class Upload:
+    """
+    One upload spooled to a temp file, with its SHA-256 and, when decode_rate is
+    given, its audio decoded to a float32 WAV at that rate
+    """
+
+    def __init__(self, limits: UploadLimits, decode_rate: Optional[int] = None):
+        self.limits = limits
+        self.decode_rate = decode_rate
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.format: Optional[str] = None
+        self.path: Optional[str] = None
+        self.decoded_path: Optional[str] = None
+        self.seconds: Optional[float] = None
+        self._head = b""
+        self._file = None
+        self._decoder: Optional[StreamDecoder] = None
+        self._wav = None
+        self._samples = 0
+
+    @property
+    def analysis_path(self) -> str:
+        """
+        The decoded audio if decoding succeeded, otherwise the file as uploaded
+        """
+        return self.decoded_path or self.path
+
+    def _open(self, head: bytes) -> None:
+        kind = sniff(head)
+        if kind is None or kind[0] not in self.limits.formats:
+            raise UploadRejected(415, f"Unsupported file type, expected one of {list(self.limits.formats)}")
+        self.format = kind[0]
+        self._file = tempfile.NamedTemporaryFile(delete=False, suffix=kind[1])
+        self.path = self._file.name
+        if self.decode_rate:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as decoded:
+                self.decoded_path = decoded.name
+            self._wav = sf.SoundFile(self.decoded_path, "w", samplerate=self.decode_rate, channels=1,
+                                     subtype="FLOAT")
+            self._decoder = StreamDecoder(self.decode_rate, low_latency=False)
+
+    def write(self, data: bytes) -> None:
+        if self._file is None:
+            self._head += data
+            if len(self._head) < SNIFF_BYTES:
+                return
+            data, self._head = self._head, b""
+            self._open(data)
+        self.size += len(data)
+        if self.size > self.limits.max_bytes:
+            raise UploadRejected(413, f"Upload exceeds the {self.limits.max_bytes / MB:g} MB limit")
+        self.digest.update(data)
+        self._file.write(data)
+        if self._decoder is not None:
+            try:
+                samples = self._decoder.write(data, timeout=DECODE_TIMEOUT)
+            except (OSError, ValueError) as e:
+                # ffmpeg gave up on the stream or stalled (TimeoutError); the
+                # worker decodes the file instead
+                print(f"⚠️ Stopped decoding the upload as it arrives: {str(e) or type(e).__name__}")
+                self._stop_decoding()
+            else:
+                self._decoded(samples)
+
+    def _decoded(self, samples: np.ndarray) -> None:
+        self._samples += len(samples)
+        if self._samples > self.limits.max_seconds * self.decode_rate:
+            raise UploadRejected(413, f"Recording exceeds the {self.limits.max_seconds:g}s limit")
+        self._wav.write(samples)
+
+    def _stop_decoding(self) -> None:
+        self._decoder.kill()
+        self._decoder = None
+        self._wav.close()
+        os.unlink(self.decoded_path)
+        self.decoded_path = None
+
+    def finish(self) -> "Upload":
+        """
+        Complete the spooled and decoded files and apply the duration limit
+        """
+        if self._file is None:
+            if not self._head:
+                raise UploadRejected(400, "Empty upload")
+            head, self._head = self._head, b""
+            self._open(head)
+            self.write(head)
+        self._file.close()
+        if self._decoder is not None:
+            try:
+                self._decoded(self._decoder.close(timeout=DECODE_TIMEOUT))
+                if not self._samples:
+                    # e.g. an MP4 with its index at the end, which a pipe cannot seek to
+                    raise RuntimeError("no audio came out of the stream")
+            except (RuntimeError, OSError, ValueError) as e:
+                print(f"⚠️ Could not decode the upload as it arrived, analyzing the file instead: {e}")
+                self._stop_decoding()
+            else:
+                self._decoder = None
+                self._wav.close()
+                self.seconds = self._samples / self.decode_rate
+        if self.seconds is None:
+            self.seconds = probe_duration(self.path)
+        if self.seconds is not None and self.seconds > self.limits.max_seconds:
+            raise UploadRejected(413, f"Recording exceeds the {self.limits.max_seconds:g}s limit")
+        return self
+
+    def discard(self) -> None:
+        """
+        Stop decoding and remove both temp files
+        """
+        if self._decoder is not None:
+            self._decoder.kill()
+            self._decoder = None
+        for handle in (self._file, self._wav):
+            if handle is not None and not handle.closed:
+                handle.close()
+        for path in (self.path, self.decoded_path):
+            if path:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+
+class _FormFile:
+    """
+    Incremental multipart/form-data parser keeping the data of one file field
+    """
+
+    def __init__(self, boundary: bytes, field: str):
+        self.field = field.encode()
+        self.found = False
+        self._keep = False
+        self._header_field = b""
+        self._header_value = b""
+        self._pieces: List[bytes] = []
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._header_end,
+            "on_part_data": self._part_data,
+        })
+
+    def _part_begin(self) -> None:
+        self._keep = False
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _header_end(self) -> None:
+        if self._header_field.lower() == b"content-disposition" and not self.found:
+            _, options = parse_options_header(self._header_value)
+            if options.get(b"name") == self.field:
+                self.found = self._keep = True
+        self._header_field = self._header_value = b""
+
+    def _part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._keep:
+            self._pieces.append(data[start:end])
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """
+        Parse a chunk of the body; returns the file data it contained
+        """
+        self._parser.write(chunk)
+        pieces, self._pieces = self._pieces, []
+        return pieces
+
+    def close(self) -> None:
+        self._parser.finalize()
+        if not self.found:
+            raise UploadRejected(400, f"No '{self.field.decode()}' file in the form")
+
+
+async def receive_upload(request, modality: str, field: str = "file",
+                         decode_rate: Optional[int] = None) -> Upload:
+    """
+    Stream a request's upload to disk under the modality's limits; raises
+    UploadRejected as soon as a limit is broken
+    """
+    limits = LIMITS[modality]
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > limits.max_bytes + FORM_OVERHEAD_BYTES:
+        raise UploadRejected(413, f"Upload exceeds the {limits.max_bytes / MB:g} MB limit")
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    form = None
+    if content_type == b"multipart/form-data":
+        if b"boundary" not in options:
+            raise UploadRejected(400, "Multipart body without a boundary")
+        form = _FormFile(options[b"boundary"], field)
+
+    upload = Upload(limits, decode_rate)
+    try:
+        buffered = bytearray()
+        async for chunk in request.stream():
+            buffered += b"".join(form.feed(chunk)) if form else chunk
+            if len(buffered) >= CHUNK_BYTES:
+                # Disk and ffmpeg writes may block, so they stay off the event loop
+                await run_in_threadpool(upload.write, bytes(buffered))
+                buffered.clear()
+        if form:
+            form.close()
+        if buffered:
+            await run_in_threadpool(upload.write, bytes(buffered))
+        return await run_in_threadpool(upload.finish)
+    except BaseException:
+        upload.discard()
+        raise
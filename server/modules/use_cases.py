@@ -0,0 +1,209 @@
+"""
+Use-case detection from transcripts, driven by a rule file.
+
+Every phrase of every use case is compiled into one Aho-Corasick automaton, so
+a transcript is scanned once however many phrases there are. Each occurrence
+of a phrase adds its weight (default 1) to its use case; the best-scoring use
+case at or above min_score wins, ties going to the one listed first.
+
+Text and phrases are lowercased and reduced to words separated by single
+spaces, and phrases match whole words only: "talk" matches "give a talk" but
+not "talking". A trailing "*" makes the last word a prefix ("talk*").
+
+The rule file is JSON:
+
+    {"min_score": 1,
+     "use_cases": {"interview": {"phrases": ["interview", {"phrase": "tell me about yourself", "weight": 2}],
+                                 "suggestions": ["Keep answers concise and confident."]}}}
+
+It is reloaded when its modification time changes (checked at most once per
+second), so edits take effect without restarting workers. A file that fails
+to load is reported and the previous rules stay in force.
+
+Configuration (environment):
+    VOICE_USE_CASES_PATH  rule file (default: data/use_cases.json next to the server)
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+USE_CASES_PATH = os.environ.get(
+    "VOICE_USE_CASES_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "use_cases.json"))
+RELOAD_CHECK_SECONDS = 1.0
+
+_NON_WORD = re.compile(r"[^\w']+")
+
+
+def normalize(text: str) -> str:
+    """
+    Lowercase words separated and surrounded by single spaces
+    """
+    return " " + " ".join(_NON_WORD.sub(" ", text.lower()).split()) + " "
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over the characters of normalized phrases.
+    patterns are (pattern, use case index, weight).
+    """
+
+    def __init__(self, patterns: List[Tuple[str, int, float]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, int, float]]] = [[]]
+        for pattern in patterns:
+            state = 0
+            for char in pattern[0]:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._out[state].append(pattern)
+
+        # Breadth-first: each state's failure link points to its longest proper
+        # suffix in the trie, whose matches it inherits
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    @property
+    def states(self) -> int:
+        return len(self._goto)
+
+    def scan(self, text: str):
+        """
+        Every (pattern, use case index, weight) occurring in text
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            yield from out[state]
+
+
+class UseCaseRules:
+    """
+    One loaded rule file: use cases in file order, their suggestions and the matcher
+    """
+
+    def __init__(self, rules: Dict, digest: str = ""):
+        self.digest = digest
+        self.min_score = float(rules.get("min_score", 1))
+        self.names: List[str] = []
+        self.suggestions: Dict[str, List[str]] = {}
+        patterns = []
+        for index, (name, spec) in enumerate(rules["use_cases"].items()):
+            self.names.append(name)
+            self.suggestions[name] = list(spec.get("suggestions", []))
+            for entry in spec.get("phrases", []):
+                phrase, weight = (entry, 1.0) if isinstance(entry, str) else (entry["phrase"], float(entry.get("weight", 1)))
+                prefix = phrase.rstrip().endswith("*")
+                pattern = normalize(phrase.rstrip().rstrip("*"))
+                if pattern.strip():
+                    patterns.append((pattern[:-1] if prefix else pattern, index, weight))
+        self.matcher = PhraseMatcher(patterns)
+
+    @classmethod
+    def load(cls, path: str) -> "UseCaseRules":
+        with open(path, "rb") as f:
+            raw = f.read()
+        return cls(json.loads(raw), hashlib.sha256(raw).hexdigest()[:16])
+
+    def score(self, text: str) -> List[Dict]:
+        """
+        Every use case with a match, best first, with its score and matched phrases
+        """
+        scores: Dict[int, float] = {}
+        matches: Dict[int, Dict[str, int]] = {}
+        for pattern, index, weight in self.matcher.scan(normalize(text)):
+            scores[index] = scores.get(index, 0.0) + weight
+            counts = matches.setdefault(index, {})
+            counts[pattern.strip()] = counts.get(pattern.strip(), 0) + 1
+        ranked = sorted(scores, key=lambda index: (-scores[index], index))
+        return [{"use_case": self.names[index], "score": scores[index], "matches": matches[index]}
+                for index in ranked]
+
+    def detect(self, text: str) -> Optional[str]:
+        ranked = self.score(text)
+        if ranked and ranked[0]["score"] >= self.min_score:
+            return ranked[0]["use_case"]
+        return None
+
+
+class RuleEngine:
+    """
+    The rules of a file, reloaded when the file changes
+    """
+
+    def __init__(self, path: str = USE_CASES_PATH):
+        self.path = path
+        self._rules: Optional[UseCaseRules] = None
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def rules(self) -> UseCaseRules:
+        now = time.monotonic()
+        if self._rules is not None and now - self._checked < RELOAD_CHECK_SECONDS:
+            return self._rules
+        with self._lock:
+            self._checked = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError as e:
+                if self._rules is None:
+                    raise
+                print(f"⚠️ Use-case rules unavailable, keeping the loaded ones: {e}")
+                return self._rules
+            if mtime != self._mtime:
+                try:
+                    rules = UseCaseRules.load(self.path)
+                except Exception as e:
+                    if self._rules is None:
+                        raise
+                    print(f"⚠️ Failed to reload use-case rules from {self.path}, keeping the loaded ones: {e}")
+                else:
+                    self._rules = rules
+                    print(f"📚 Loaded {len(rules.names)} use cases ({rules.matcher.states} matcher states) "
+                          f"from {self.path}")
+                self._mtime = mtime
+            return self._rules
+
+
+engine = RuleEngine()
+
+
+def detect_use_case(text: str) -> Optional[str]:
+    return engine.rules().detect(text)
+
+
+def score_use_cases(text: str) -> List[Dict]:
+    return engine.rules().score(text)
+
+
+def suggestions_for(use_case: Optional[str]) -> List[str]:
+    return list(engine.rules().suggestions.get(use_case, []))
+
+
+def rules_version() -> str:
+    """
+    Digest of the rule file in force, part of the analysis parameters
+    """
+    return engine.rules().digest
@@ -0,0 +1,98 @@
+"""
+Voice activity detection ahead of the voice analysis.
+
+Speech frames are those within VAD_TOP_DB of the loudest frame, judged on the
+per-frame RMS, which needs no spectrogram. The speech intervals give the
+pause statistics directly (gaps longer than PAUSE_MIN_SECONDS), and the gate
+(speech widened by VAD_PAD_SECONDS) restricts the STFT, pitch tracking and
+filler detection to speech, so their cost follows the amount of speech rather
+than the file length. The envelope filler count sees the samples of the gated
+frames joined together (active_audio). Transcription gets the speech intervals, with
+ASR_PAD_SECONDS of context each side, joined together.
+
+Frames outside the gate count as unvoiced. Filler segments are unchanged by
+gating; pitch statistics no longer include the pitch trackers' guesses on
+silence and room noise. StreamingVoiceAnalyzer gates each block by the same
+rule, see modules/streaming.py.
+
+Configuration (environment):
+    VOICE_VAD  on (default) | off, to analyze every frame
+"""
+import os
+
+import numpy as np
+from scipy.ndimage import binary_dilation
+
+VAD_ENABLED = os.environ.get("VOICE_VAD", "on") != "off"
+VAD_TOP_DB = 30
+VAD_PAD_SECONDS = 0.05
+ASR_PAD_SECONDS = 0.2
+PAUSE_MIN_SECONDS = 0.25
+
+
+def pad_frames(sr: int, hop_length: int, pad_seconds: float = VAD_PAD_SECONDS) -> int:
+    """
+    Frames the gate extends speech by on each side; at least one keeps a
+    silent frame at each edge of the gate
+    """
+    return max(1, int(np.ceil(pad_seconds * sr / hop_length)))
+
+
+def speech_gate(speech: np.ndarray, pad: int) -> np.ndarray:
+    """
+    Frames within pad frames of a speech frame
+    """
+    return binary_dilation(speech, iterations=pad) if speech.any() else speech
+
+
+class VoiceActivity:
+    """
+    Speech frames, intervals, pauses and the analysis gate of a VoiceFeatures context
+    """
+
+    def __init__(self, features, top_db: float = VAD_TOP_DB, pad_seconds: float = VAD_PAD_SECONDS):
+        self.sr = features.sr
+        self.hop_length = features.hop_length
+        self.speech = features.nonsilent_frames(top_db)
+        # (n, 2) sample intervals of speech
+        self.intervals = features.nonsilent_intervals(top_db)
+        self.active = speech_gate(self.speech, pad_frames(self.sr, self.hop_length, pad_seconds))
+        gaps = (self.intervals[1:, 0] - self.intervals[:-1, 1]) / self.sr
+        self.pauses = gaps[gaps > PAUSE_MIN_SECONDS]
+
+    @property
+    def pause_count(self) -> int:
+        return len(self.pauses)
+
+    @property
+    def total_silence(self) -> float:
+        return float(self.pauses.sum())
+
+    @property
+    def speech_seconds(self) -> float:
+        return float(self.speech.sum()) * self.hop_length / self.sr
+
+    @property
+    def active_fraction(self) -> float:
+        return float(self.active.mean()) if len(self.active) else 0.0
+
+    def active_audio(self, y: np.ndarray) -> np.ndarray:
+        """
+        The samples of the gated frames of y, joined end to end
+        """
+        return y[np.repeat(self.active, self.hop_length)[:len(y)]]
+
+    def speech_audio(self, y: np.ndarray, pad_seconds: float = ASR_PAD_SECONDS) -> np.ndarray:
+        """
+        The speech of y, each interval padded and overlapping ones merged, joined end to end
+        """
+        if len(self.intervals) == 0:
+            return y[:0]
+        pad = int(pad_seconds * self.sr)
+        starts = np.maximum(self.intervals[:, 0] - pad, 0)
+        ends = np.minimum(self.intervals[:, 1] + pad, len(y))
+        # Merge intervals whose padding overlaps
+        breaks = np.flatnonzero(starts[1:] > ends[:-1]) + 1
+        merged_starts = starts[np.concatenate([[0], breaks])]
+        merged_ends = ends[np.concatenate([breaks - 1, [len(ends) - 1]])]
+        return np.concatenate([y[start:end] for start, end in zip(merged_starts, merged_ends)])
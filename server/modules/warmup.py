@@ -0,0 +1,152 @@
+"""
+Capability-scoped loading and warm-up for the API server.
+
+Heavy dependencies are imported only for the capabilities a deployment
+serves: "voice" (librosa/numba analysis, reports, transcription) and "sign"
+(MediaPipe hand tracking). warm_up() then runs each enabled component once on
+synthetic input, so numba kernels are compiled and every model has done one
+inference before the worker reports ready. Each step is timed and logged.
+
+Configuration (environment):
+    VOICE_CAPABILITIES  comma-separated capabilities to serve (default: voice,sign)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+
+ALL_CAPABILITIES = ("voice", "sign")
+CAPABILITIES = tuple(name.strip() for name in os.environ.get("VOICE_CAPABILITIES", ",".join(ALL_CAPABILITIES)).split(",")
+                     if name.strip())
+
+# Seconds spent per component, in the order they were loaded
+startup_timings: "OrderedDict[str, float]" = OrderedDict()
+# Components whose warm-up failed, with the error
+startup_errors: Dict[str, str] = {}
+
+_sign_processor = None
+_sign_lock = threading.Lock()
+
+
+def enabled(capability: str) -> bool:
+    return capability in CAPABILITIES
+
+
+@contextmanager
+def timed(component: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[component] = time.perf_counter() - start
+        print(f"⏱️ {component}: {startup_timings[component]:.2f}s")
+
+
+def sign_processor():
+    """
+    The process-wide SignLanguageProcessor, created on first use
+    """
+    global _sign_processor
+    with _sign_lock:
+        if _sign_processor is None:
+            with timed("sign: load"):
+                from modules.sign_language import SignLanguageProcessor
+                _sign_processor = SignLanguageProcessor()
+        return _sign_processor
+
+
+def synthetic_voice(sr: int, seconds: float = 2.0) -> np.ndarray:
+    """
+    A vowel-like tone with syllable-rate amplitude modulation and a pause,
+    enough to exercise pitch, pause and filler detection
+    """
+    t = np.arange(int(sr * seconds)) / sr
+    f0 = 140 + 20 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    y = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)
+    envelope[(t > seconds * 0.45) & (t < seconds * 0.65)] = 0
+    noise = np.random.default_rng(0).normal(scale=1e-3, size=len(t))
+    return (0.5 * y * envelope + noise).astype(np.float32)
+
+
+def _step(component: str, action) -> None:
+    try:
+        with timed(component):
+            action()
+    except Exception as e:
+        startup_errors[component] = str(e)
+        print(f"⚠️ Warm-up of {component} failed: {e}")
+
+
+def _warm_voice(with_transcription: bool = True) -> None:
+    import tempfile
+    import soundfile as sf
+
+    def load():
+        import main  # noqa: F401
+
+    _step("voice: import", load)
+
+    def analysis():
+        from main import RATE, analyze_voice, quick_analysis
+        from modules.decode import decode_file
+        from modules.features import VoiceFeatures
+
+        y = synthetic_voice(RATE)
+        # Decoding and resampling, as an upload goes through them
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "warm-up.wav")
+            sf.write(path, y, 16000)
+            decode_file(path, RATE)
+            # The quick profile's frame sizes, too
+            quick_analysis(path)
+        analyze_voice(y, RATE, transcribe=False, features=VoiceFeatures(y, RATE))
+
+    _step("voice: analysis kernels", analysis)
+
+    def report():
+        from main import RATE
+        from modules.features import VoiceFeatures
+        from modules.report import render_pdf, report_data
+        render_pdf(report_data("warm-up", VoiceFeatures(synthetic_voice(RATE), RATE)))
+
+    _step("voice: report rendering", report)
+
+    def transcription():
+        from modules.transcription import warm_up as warm_transcription
+        warm_transcription()
+
+    if with_transcription:
+        _step("voice: transcription", transcription)
+
+    def use_cases():
+        from modules.use_cases import engine
+        engine.rules()
+
+    _step("voice: use-case rules", use_cases)
+
+
+def _warm_sign() -> None:
+    _step("sign: inference", lambda: sign_processor().warm_up())
+
+
+def warm_up(capabilities: Optional[tuple] = None, in_server: bool = False) -> Dict[str, float]:
+    """
+    Load and exercise every component of the enabled capabilities, returning
+    the seconds each step took. in_server warms only what the API process
+    runs itself while job workers do the analyses: live analysis and reports.
+    """
+    capabilities = CAPABILITIES if capabilities is None else capabilities
+    start = time.perf_counter()
+    if "voice" in capabilities:
+        _warm_voice(with_transcription=not in_server)
+    if "sign" in capabilities and not in_server:
+        _warm_sign()
+    total = time.perf_counter() - start
+    print(f"✅ Warm-up of {', '.join(capabilities) or 'nothing'} finished in {total:.2f}s")
+    return dict(startup_timings)
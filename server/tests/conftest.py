@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESOURCES_DIR = os.path.join(SERVER_DIR, "resources")
+
+# The server modules are imported as top-level packages, as the server runs them
+sys.path.insert(0, SERVER_DIR)
+
+
+@pytest.fixture
+def resource():
+    return lambda name: os.path.join(RESOURCES_DIR, name)
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from batch import ResultWriter
+
+
+def rows(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv"])
+def test_resume_drops_a_truncated_last_row(tmp_path, fmt):
+    path = str(tmp_path / f"results.{fmt}")
+    writer = ResultWriter(path, fmt)
+    writer.write({"file": "a.mp3", "status": "ok", "suggestions": []})
+    writer.write({"file": "b.mp3", "status": "error", "error": "bad"})
+    writer.close()
+    # An interrupted run leaves half a row behind
+    with open(path, "a") as f:
+        f.write('{"file": "c.mp3", "sta' if fmt == "jsonl" else "c.mp3,o")
+
+    writer = ResultWriter(path, fmt)
+    assert writer.done == {"a.mp3": "ok", "b.mp3": "error"}
+    writer.write({"file": "c.mp3", "status": "ok", "suggestions": []})
+    writer.close()
+    assert ResultWriter(path, fmt).done == {"a.mp3": "ok", "b.mp3": "error", "c.mp3": "ok"}
+    if fmt == "jsonl":
+        assert [row["file"] for row in rows(path)] == ["a.mp3", "b.mp3", "c.mp3"]
+
+
+def test_resume_skips_malformed_rows(tmp_path, capsys):
+    path = str(tmp_path / "results.jsonl")
+    with open(path, "w") as f:
+        f.write('{"file": "a.mp3", "status": "ok"}\n{"file": \n\n{"file": "b.mp3", "status": "ok"}\n')
+    assert ResultWriter(path, "jsonl").done == {"a.mp3": "ok", "b.mp3": "ok"}
+    assert "malformed" in capsys.readouterr().err
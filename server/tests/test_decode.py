@@ -0,0 +1,77 @@
+import os
+import signal
+import threading
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from modules.decode import STDERR_TAIL_BYTES, StreamDecoder
+
+RATE = 22050
+CHUNK = 1 << 20
+
+
+def corrupted_mp3(resource, copies=8):
+    """
+    An MP3 with one byte in 20 overwritten: ffmpeg decodes what it can and
+    logs an error for most frames, hundreds of KB in all
+    """
+    with open(resource("kushal.mp3"), "rb") as f:
+        data = bytearray(f.read())
+    rng = np.random.default_rng(0)
+    for index in rng.integers(4096, len(data), len(data) // 20):
+        data[index] = rng.integers(0, 256)
+    return bytes(data) * copies
+
+
+def feed(decoder, data, timeout=None):
+    samples = 0
+    for start in range(0, len(data), CHUNK):
+        samples += len(decoder.write(data[start:start + CHUNK], timeout=timeout))
+    return samples + len(decoder.close(timeout=timeout))
+
+
+def test_stream_decoder_matches_file(resource):
+    with open(resource("kushal.mp3"), "rb") as f:
+        data = f.read()
+    decoder = StreamDecoder(RATE, low_latency=False)
+    assert abs(feed(decoder, data) / RATE - sf.info(resource("kushal.mp3")).duration) < 0.1
+
+
+def test_error_output_does_not_block_writes(resource):
+    # Regression: ffmpeg's stderr was only read in close(), so a stream logging
+    # more than a pipe buffer of errors blocked ffmpeg and with it write()
+    data = corrupted_mp3(resource)
+    decoder = StreamDecoder(RATE, low_latency=False)
+    outcome = []
+    worker = threading.Thread(target=lambda: outcome.append(feed(decoder, data)), daemon=True)
+    worker.start()
+    worker.join(30)
+    if worker.is_alive():
+        decoder.kill()
+        pytest.fail("StreamDecoder blocked on a stream with a long error log")
+    assert outcome[0] > 0
+    assert 0 < len(decoder.errors.encode()) <= STDERR_TAIL_BYTES
+
+
+def test_failure_reports_error_tail():
+    decoder = StreamDecoder(RATE, low_latency=False)
+    with pytest.raises(RuntimeError, match="ffmpeg failed to decode"):
+        try:
+            decoder.write(os.urandom(4096))
+        except OSError:
+            # ffmpeg may already have given up on the input
+            pass
+        decoder.close()
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGSTOP"), reason="needs SIGSTOP")
+def test_write_times_out_when_ffmpeg_stalls(resource):
+    decoder = StreamDecoder(RATE, low_latency=False)
+    os.kill(decoder._process.pid, signal.SIGSTOP)
+    with pytest.raises(TimeoutError):
+        # More than the pipe buffer, so the write has to wait for ffmpeg
+        decoder.write(corrupted_mp3(resource, copies=2), timeout=0.5)
+    # Killed by the watchdog
+    assert decoder._process.wait(5) == -signal.SIGKILL
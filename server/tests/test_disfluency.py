@@ -0,0 +1,48 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+import main
+from modules.decode import decode_file
+from modules.disfluency import EnvelopeFillerTracker, envelope_filler_count, find_peaks, moving_average
+
+RATE = 22050
+
+
+@pytest.mark.parametrize("block_seconds", [30, 1.3])
+def test_envelope_tracker_matches_whole_signal(resource, block_seconds):
+    y = decode_file(resource("kushal.mp3"), RATE)
+    y = y / np.max(np.abs(y))
+    tracker = EnvelopeFillerTracker()
+    block = int(block_seconds * RATE)
+    for start in range(0, len(y), block):
+        tracker.update(y[start:start + block], 1.0)
+    assert tracker.finalize(1.0) == envelope_filler_count(y)
+    assert tracker.peaks == len(find_peaks(moving_average(np.abs(y), 1000), height=0.01, distance=1000)[0])
+
+
+def test_envelope_tracker_handles_short_input():
+    tracker = EnvelopeFillerTracker()
+    tracker.update(np.ones(10, dtype=np.float32), 1.0)
+    assert tracker.finalize(1.0) == 0
+
+
+def test_envelope_is_the_default_filler_count(resource):
+    # Regression: switching filler_count to the spectral detector moved this
+    # recording from 10 fillers / 50 to 4 / 68 without a labeled comparison
+    assert main.FILLER_METHOD == "envelope"
+    with contextlib.redirect_stdout(io.StringIO()):
+        results, _ = main.process_audio_file(resource("kushal.mp3"), streaming=False, transcribe=False)
+    assert (results.filler_count, results.confidence_score) == (10, 50)
+
+
+def test_envelope_counts_only_gated_speech(resource, monkeypatch):
+    # Regression: the envelope count ran on the whole signal, silence included
+    lengths = []
+    monkeypatch.setattr(main, "envelope_filler_count", lambda y: lengths.append(len(y)) or 0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        main.process_audio_file(resource("Kushalconfidence.mp3"), streaming=False, transcribe=False)
+    total = len(decode_file(resource("Kushalconfidence.mp3"), RATE))
+    assert 0 < lengths[0] < 0.9 * total
@@ -0,0 +1,63 @@
+import pytest
+
+from modules.history import HistoryStore
+
+DAY = 24 * 3600
+# 2026-01-05, a Monday
+MONDAY = 1767571200.0
+
+
+def result(score, pauses=0, fillers=0):
+    return {"confidence_level": "Medium", "confidence_score": score, "pitch_mean": 200.0, "pitch_std": 30.0,
+            "energy_mean": 0.1, "energy_std": 0.05, "pause_count": pauses, "filler_count": fillers,
+            "suggestions": []}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path / "history.db"))
+
+
+def test_same_analysis_is_recorded_once_per_user(store):
+    # Regression: cache hits and retries of the same upload were counted again
+    first = store.record("ana", result(60), analysis_id="take", created=MONDAY)
+    assert store.record("ana", result(60), analysis_id="take", created=MONDAY + 60) == first
+    other = store.record("ben", result(60), analysis_id="take", created=MONDAY)
+    assert other != first
+    assert len(store.history("ana")["sessions"]) == 1
+    assert store.trends("ana")["points"][0]["sessions"] == 1
+
+
+def test_sessions_without_analysis_id_always_count(store):
+    store.record("ana", result(60), created=MONDAY)
+    store.record("ana", result(60), created=MONDAY + 60)
+    assert store.trends("ana")["points"][0]["sessions"] == 2
+
+
+def test_history_pages(store):
+    for index in range(5):
+        store.record("ana", result(50 + index), analysis_id=f"take{index}", created=MONDAY + index)
+    page = store.history("ana", limit=2)
+    assert [session["confidence_score"] for session in page["sessions"]] == [54, 53]
+    page = store.history("ana", limit=2, cursor=page["next_cursor"])
+    assert [session["confidence_score"] for session in page["sessions"]] == [52, 51]
+    page = store.history("ana", limit=2, cursor=page["next_cursor"])
+    assert [session["confidence_score"] for session in page["sessions"]] == [50]
+    assert page["next_cursor"] is None
+    with pytest.raises(ValueError):
+        store.history("ana", cursor="garbage")
+
+
+def test_trends_by_day_and_week(store):
+    store.record("ana", result(40, pauses=2), created=MONDAY)
+    store.record("ana", result(60, pauses=0), created=MONDAY + 3600)
+    store.record("ana", result(80, fillers=1), created=MONDAY + DAY)
+    days = store.trends("ana", "day")
+    assert [point["period"] for point in days["points"]] == ["2026-01-05", "2026-01-06"]
+    assert days["points"][0]["mean_confidence_score"] == 50
+    assert days["points"][0]["best_confidence_score"] == 60
+    assert days["change"]["mean_confidence_score"] == 30
+    weeks = store.trends("ana", "week")
+    assert [(point["period"], point["sessions"]) for point in weeks["points"]] == [("2026-W02", 3)]
+    with pytest.raises(ValueError):
+        store.trends("ana", "month")
@@ -0,0 +1,143 @@
+import contextlib
+import io
+import threading
+import time
+
+import pytest
+
+import main
+from modules import jobs
+from modules.metrics import STAGE_ERRORS
+
+
+def run_voice_job(path, **options):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return jobs.voice_job(path, **options)
+
+
+@pytest.fixture
+def no_transcription(monkeypatch):
+    monkeypatch.setattr(main, "transcribe_audio", lambda y, sr: "")
+
+
+def test_voice_job_keeps_whole_signal_outputs(resource, no_transcription):
+    out = run_voice_job(resource("tanmay.mp3"), timeline=True, contours="base64", extended=True, tiles=True)
+    assert {"results", "tiles", "timeline", "contours", "extended"} <= set(out)
+    assert "streamed" not in out
+
+
+def test_voice_job_builds_tiles_only_when_asked(resource, no_transcription):
+    # Regression: every analysis built a tile pyramid, computing the full-band
+    # spectrogram and shipping it from the worker
+    out = run_voice_job(resource("tanmay.mp3"))
+    assert set(out) == {"results", "timings"}
+
+
+def test_streamed_voice_job_says_so(resource, no_transcription, monkeypatch):
+    monkeypatch.setattr(main, "STREAMING_MIN_SECONDS", 5)
+    out = run_voice_job(resource("tanmay.mp3"))
+    assert out["streamed"] is True
+    assert "tiles" not in out
+
+
+@pytest.mark.parametrize("options", [{"report": True}, {"contours": "base64"}, {"timeline": True},
+                                     {"extended": True}, {"tiles": True}])
+def test_streamed_voice_job_refuses_whole_signal_outputs(resource, no_transcription, monkeypatch, options):
+    # Regression: files streamed for their length silently lost these outputs
+    monkeypatch.setattr(main, "STREAMING_MIN_SECONDS", 5)
+    with pytest.raises(ValueError, match="only available for recordings up to 5s"):
+        run_voice_job(resource("tanmay.mp3"), **options)
+
+
+# Job functions run in spawned workers, which import them from this module
+
+def slow_job(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def failing_stage_job():
+    from modules.metrics import StageTimer
+    with StageTimer("test_jobs").stage("boom"):
+        raise RuntimeError("stage failed")
+
+
+@pytest.fixture
+def job_store(tmp_path):
+    return jobs.JobStore(str(tmp_path / "jobs.db"))
+
+
+@pytest.fixture
+def job_manager(monkeypatch, job_store):
+    # The sign modality's warm-up is cheap (it fails without MediaPipe); one
+    # worker and no queue, so a second job is refused at once
+    monkeypatch.setitem(jobs.POOL_SIZES, "sign", (1, 0))
+    manager = jobs.JobManager(("sign",), store=job_store)
+    manager.start()
+    yield manager
+    manager.shutdown()
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_job_runs_and_reports_status(job_manager):
+    job = job_manager.submit("sign", slow_job, (0.1,), finish=lambda value: {"slept": value})
+    assert job.outcome.result(timeout=30) == {"slept": 0.1}
+    status = job_manager.describe(job_manager.get(job.id))
+    assert status["status"] == "done" and status["progress"] == 1.0
+    assert status["run_seconds"] is not None
+
+
+def test_finish_runs_off_the_result_thread(job_manager):
+    # Regression: finish ran on the executor's thread that collects results
+    job = job_manager.submit("sign", slow_job, (0.0,), finish=lambda value: threading.current_thread().name)
+    assert job.outcome.result(timeout=30).startswith("sign-finish")
+
+
+def test_full_queue_is_refused_with_retry_after(job_manager):
+    job = job_manager.submit("sign", slow_job, (1.0,))
+    with pytest.raises(jobs.QueueFull) as full:
+        job_manager.submit("sign", slow_job, (0.0,))
+    assert full.value.retry_after >= 1
+    job.outcome.result(timeout=30)
+    # Capacity is released once the job is done
+    job_manager.submit("sign", slow_job, (0.0,)).outcome.result(timeout=30)
+
+
+def test_worker_stage_errors_reach_server_metrics(job_manager):
+    # Regression: only finished runs were forwarded from the workers, so the
+    # stage error counter never saw failures in the pools
+    job = job_manager.submit("sign", failing_stage_job, ())
+    with pytest.raises(RuntimeError, match="stage failed"):
+        job.outcome.result(timeout=30)
+    assert job_manager.describe(job)["status"] == "error"
+    assert wait_for(lambda: STAGE_ERRORS._values.get(("test_jobs", "boom"), 0) >= 1)
+
+
+def test_other_server_workers_see_jobs_through_the_store(job_manager, job_store):
+    # Regression: jobs lived in the submitting process only, so /jobs/{id}
+    # answered 404 on every other server worker
+    other = jobs.JobManager((), store=jobs.JobStore(job_store.path))
+    job = job_manager.submit("sign", slow_job, (0.5,), finish=lambda value: {"slept": value, "raw": b"\x01"},
+                             meta={"msgpack": True})
+    assert other.get(job.id) is None
+    assert wait_for(lambda: (other.stored(job.id) or ({},))[0].get("status") == "running")
+    job.outcome.result(timeout=30)
+    assert wait_for(lambda: other.stored(job.id)[0]["status"] == "done")
+    description, result = other.stored(job.id)
+    assert description["meta"] == {"msgpack": True}
+    assert result == {"slept": 0.5, "raw": b"\x01"}
+    assert other.stored("unknown") is None
+
+
+def test_job_store_expires_entries(job_store):
+    store = jobs.JobStore(job_store.path, ttl=-1)
+    store.put("gone", {"status": "done"}, {"value": 1})
+    assert store.get("gone") is None
@@ -0,0 +1,82 @@
+import contextlib
+import io
+
+import pytest
+
+import main
+from modules import jobs
+from modules.profiles import BUDGET_REFERENCE_SECONDS, PROFILES, get_profile
+
+
+@pytest.fixture
+def transcriptions(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, "transcribe_audio", lambda y, sr: calls.append(len(y)) or "")
+    return calls
+
+
+def test_get_profile():
+    assert get_profile("quick").budget_ms == 100
+    with pytest.raises(ValueError, match="Unknown analysis profile"):
+        get_profile("instant")
+
+
+def test_budget_grows_past_reference_length():
+    standard = PROFILES["standard"]
+    assert standard.budget_for(None) == standard.budget_ms
+    assert standard.budget_for(BUDGET_REFERENCE_SECONDS / 2) == standard.budget_ms
+    assert standard.budget_for(BUDGET_REFERENCE_SECONDS * 3) == standard.budget_ms * 3
+
+
+@pytest.mark.parametrize("name", ["standard", "full"])
+def test_job_transcribes_as_profile_says(resource, transcriptions, name):
+    profile = get_profile(name)
+    with contextlib.redirect_stdout(io.StringIO()):
+        jobs.voice_job(resource("tanmay.mp3"), extended=profile.extended, transcribe=profile.transcribe)
+    assert len(transcriptions) == 1
+
+
+def test_quick_profile_does_not_transcribe(resource, transcriptions):
+    with contextlib.redirect_stdout(io.StringIO()):
+        quick = main.quick_analysis(resource("tanmay.mp3"), transcribe=get_profile("quick").transcribe)
+        jobs.voice_job(resource("tanmay.mp3"), transcribe=False)
+    assert transcriptions == []
+    assert quick.confidence_score > 0
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    from starlette.testclient import TestClient
+    import fastapi_server
+    from modules.result_cache import ResultCache
+    monkeypatch.setattr(fastapi_server, "result_cache", ResultCache(str(tmp_path / "results.db")))
+    # Without the context manager the startup warm-up and worker pools never start
+    return TestClient(fastapi_server.app)
+
+
+def post_quick(client, resource, name="tanmay.mp3"):
+    with open(resource(name), "rb") as f:
+        return client.post("/analyze-voice?profile=quick", files={"file": (name, f, "audio/mpeg")})
+
+
+def test_quick_refuses_long_recordings(client, resource, monkeypatch):
+    # Regression: quick decoded any length whole in the server process
+    monkeypatch.setattr(main, "STREAMING_MIN_SECONDS", 5)
+    response = post_quick(client, resource)
+    assert response.status_code == 422
+    assert "standard profile" in response.json()["detail"]
+
+
+def test_quick_is_bounded(client, resource, monkeypatch):
+    # Regression: quick ran outside the pool's admission and never answered 429
+    import fastapi_server
+    slots = jobs.InlineSlots("quick", 1)
+    monkeypatch.setattr(fastapi_server, "quick_slots", slots)
+    acquired = slots.acquire()
+    response = post_quick(client, resource)
+    assert response.status_code == 429 and int(response.headers["retry-after"]) >= 1
+    slots.release(acquired)
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = post_quick(client, resource)
+    assert response.status_code == 200 and response.json()["profile"]["name"] == "quick"
+    assert slots.running == 0
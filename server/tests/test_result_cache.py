@@ -0,0 +1,86 @@
+import hashlib
+import json
+import time
+
+import pytest
+
+from modules.result_cache import ResultCache, cache_key
+
+PARAMS = {"rate": 22050, "pitch_engine": "piptrack", "filler_method": "envelope"}
+
+
+def response(score, padding=0):
+    return {"confidence_score": score, "suggestions": ["x" * padding]}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(str(tmp_path / "results.db"), ttl=60, max_bytes=1 << 20, memory_size=4)
+
+
+def test_key_of_streamed_digest_matches_bytes():
+    data = b"RIFF" + bytes(1000)
+    digest = hashlib.sha256()
+    for start in range(0, len(data), 128):
+        digest.update(data[start:start + 128])
+    assert cache_key(digest, PARAMS) == cache_key(data, PARAMS)
+    # The upload's digest is left as it was
+    assert digest.hexdigest() == hashlib.sha256(data).hexdigest()
+
+
+def test_key_follows_params():
+    assert cache_key(b"take", PARAMS) == cache_key(b"take", dict(reversed(list(PARAMS.items()))))
+    assert cache_key(b"take", PARAMS) != cache_key(b"take", dict(PARAMS, filler_method="spectral"))
+    assert cache_key(b"take", PARAMS) != cache_key(b"other", PARAMS)
+
+
+def test_memory_then_disk_hits(cache):
+    cache.put("a", response(60))
+    assert cache.get("a") == response(60)
+    assert cache.counters["memory_hits"] == 1
+    # Another worker shares the SQLite tier only
+    other = ResultCache(cache.path, ttl=60)
+    assert other.get("a") == response(60)
+    assert other.get("a") == response(60)
+    assert (other.counters["disk_hits"], other.counters["memory_hits"]) == (1, 1)
+    assert other.get("missing") is None
+    assert other.stats()["hit_rate"] == pytest.approx(2 / 3)
+
+
+def test_memory_tier_is_bounded(cache):
+    for index in range(6):
+        cache.put(str(index), response(index))
+    assert list(cache._memory) == ["2", "3", "4", "5"]
+    # Evicted from memory, still on disk
+    assert cache.get("0") == response(0)
+    assert cache.counters["disk_hits"] == 1
+
+
+def test_entries_expire(cache, monkeypatch):
+    cache.put("a", response(60))
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get("a") is None
+    assert cache.counters["misses"] == 1
+    # A later put also drops expired rows from disk
+    cache.put("b", response(70))
+    assert cache.stats()["disk_entries"] == 1
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path, monkeypatch):
+    size = len(json.dumps(response(0, padding=1000)))
+    cache = ResultCache(str(tmp_path / "results.db"), ttl=3600, max_bytes=3 * size, memory_size=0)
+    clock = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+    for key in "abc":
+        clock[0] += 1
+        cache.put(key, response(0, padding=1000))
+    clock[0] += 1
+    # "a" is used again, so "b" is the least recently used
+    assert cache.get("a") is not None
+    clock[0] += 1
+    cache.put("d", response(0, padding=1000))
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["disk_bytes"] <= 3 * size
@@ -0,0 +1,91 @@
+import multiprocessing
+import time
+
+import pytest
+
+from modules import sessions
+from modules.sessions import MemorySessionStore, RecordingSessions, SQLiteSessionStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionStore(ttl=60)
+    return SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl=60)
+
+
+def start_in_worker(path, session_id, ready):
+    ready.wait()
+    return RecordingSessions(SQLiteSessionStore(path)).start(session_id)
+
+
+def test_update_replaces_and_deletes(store):
+    assert store.update("a", lambda state: {"n": 1}) == {"n": 1}
+    assert store.update("a", lambda state: {"n": state["n"] + 1}) == {"n": 2}
+    assert store.get("a") == {"n": 2}
+    assert store.update("a", lambda state: None) is None
+    assert store.get("a") is None
+
+
+def test_sessions_expire(store, monkeypatch):
+    store.update("a", lambda state: {"n": 1})
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert store.get("a") is None
+    # An expired session is absent to an update too
+    assert store.update("a", lambda state: state) is None
+
+
+def test_recording_lifecycle(store, monkeypatch):
+    recordings = RecordingSessions(store, max_seconds=20)
+    assert recordings.status("a") == {"is_recording": False, "remaining_time": 0}
+    assert recordings.status(None) == {"is_recording": False, "remaining_time": 0}
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    assert recordings.start("a")
+    assert not recordings.start("a")
+    monkeypatch.setattr(time, "time", lambda: now + 5)
+    status = recordings.status("a")
+    assert status["is_recording"] and status["elapsed_time"] == pytest.approx(5)
+    assert status["remaining_time"] == pytest.approx(15)
+    assert recordings.start("a", restart=True)
+    assert recordings.status("a")["elapsed_time"] == 0
+    # Other sessions are independent
+    assert not recordings.status("b")["is_recording"]
+    assert recordings.stop("a")
+    assert not recordings.stop("a")
+    assert store.get("a") is None
+
+
+def test_stop_keeps_other_state(store):
+    store.update("a", lambda state: {"user": "ana"})
+    recordings = RecordingSessions(store)
+    recordings.start("a")
+    recordings.stop("a")
+    assert store.get("a") == {"user": "ana"}
+
+
+def test_workers_share_state(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    RecordingSessions(SQLiteSessionStore(path)).start("a")
+    assert RecordingSessions(SQLiteSessionStore(path)).status("a")["is_recording"]
+
+
+def test_only_one_worker_starts_a_recording(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        ready = manager.Event()
+        with context.Pool(4) as pool:
+            results = [pool.apply_async(start_in_worker, (path, "a", ready)) for _ in range(8)]
+            ready.set()
+            started = [result.get(timeout=30) for result in results]
+    assert started.count(True) == 1
+
+
+def test_open_store():
+    # The SQLite file is only opened on first use
+    assert isinstance(sessions.open_store("sqlite"), SQLiteSessionStore)
+    assert isinstance(sessions.open_store("memory"), MemorySessionStore)
+    with pytest.raises(ValueError):
+        sessions.open_store("redis")
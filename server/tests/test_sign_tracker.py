@@ -0,0 +1,147 @@
+import numpy as np
+import pytest
+
+from modules.sign_language import ROI_MIN_SIDE, HandTracker, TrackingSettings
+
+WIDTH, HEIGHT = 640, 480
+# Landmark offsets of a stand-in hand around its centre, in pixels
+SPREAD = np.linspace(-10, 10, 21)
+
+
+class StandInSolver:
+    """
+    A MediaPipe Hands stand-in; closed records close()
+    """
+
+    def __init__(self, max_num_hands):
+        self.max_num_hands = max_num_hands
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class StandInProcessor:
+    """
+    The parts of SignLanguageProcessor HandTracker uses. Frames hold their own
+    pixel coordinates, so a crop is located from its first pixel; the hands
+    are at self.centres, in pixels of the full frame.
+    """
+
+    def __init__(self, centres):
+        self.centres = centres
+        self.hands = StandInSolver(2)
+        self.trackers = []
+        self.calls = []
+
+    def new_tracker(self, hands):
+        self.trackers.append(StandInSolver(hands))
+        return self.trackers[-1]
+
+    def _landmarks(self, solver, image, max_side=0):
+        assert not solver.closed
+        self.calls.append("detect" if solver is self.hands else "track")
+        x0, y0 = image[0, 0]
+        height, width = image.shape[:2]
+        found = []
+        for cx, cy in self.centres:
+            if x0 <= cx < x0 + width and y0 <= cy < y0 + height:
+                points = np.zeros((21, 3))
+                points[:, 0] = (cx + SPREAD - x0) / width
+                points[:, 1] = (cy + SPREAD - y0) / height
+                points[:, 2] = -10 / width
+                found.append(points.ravel().tolist())
+        return found[:solver.max_num_hands]
+
+
+def frame():
+    ys, xs = np.mgrid[0:HEIGHT, 0:WIDTH]
+    return np.stack([xs, ys], axis=-1)
+
+
+def centres_of(hands):
+    return [tuple(np.round(np.asarray(landmarks).reshape(-1, 3)[:, :2].mean(axis=0) * (WIDTH, HEIGHT)))
+            for landmarks in hands]
+
+
+def test_tracks_within_region_in_full_frame_coordinates():
+    processor = StandInProcessor([(200, 150)])
+    tracker = HandTracker(processor, TrackingSettings(redetect_frames=30))
+    detected = tracker.process(frame())
+    tracked = tracker.process(frame())
+    assert processor.calls == ["detect", "track"]
+    assert centres_of(tracked) == centres_of(detected) == [(200, 150)]
+    # z is scaled back like x
+    assert np.asarray(tracked[0]).reshape(-1, 3)[0, 2] == pytest.approx(-10 / WIDTH)
+    x0, y0, x1, y1 = tracker.roi
+    assert x1 - x0 == y1 - y0 >= ROI_MIN_SIDE
+    assert x0 <= 200 < x1 and y0 <= 150 < y1
+
+
+def test_redetects_on_the_same_frame_when_a_hand_is_lost():
+    processor = StandInProcessor([(200, 150)])
+    tracker = HandTracker(processor, TrackingSettings(redetect_frames=30))
+    tracker.process(frame())
+    # The hand leaves the region
+    processor.centres = [(500, 400)]
+    assert centres_of(tracker.process(frame())) == [(500, 400)]
+    assert processor.calls == ["detect", "track", "detect"]
+    assert tracker.detections == 2
+
+
+def test_redetects_every_redetect_frames():
+    processor = StandInProcessor([(200, 150)])
+    tracker = HandTracker(processor, TrackingSettings(redetect_frames=3))
+    for _ in range(9):
+        tracker.process(frame())
+    assert processor.calls == ["detect", "track", "track", "track"] * 2 + ["detect"]
+
+
+def test_region_stays_fixed_between_detections():
+    processor = StandInProcessor([(200, 150)])
+    tracker = HandTracker(processor, TrackingSettings(redetect_frames=30))
+    tracker.process(frame())
+    roi = tracker.roi
+    for step in range(1, 6):
+        processor.centres = [(200 + 4 * step, 150 + 2 * step)]
+        assert centres_of(tracker.process(frame())) == processor.centres
+        assert tracker.roi == roi
+
+
+def test_new_tracking_graph_per_region_and_closed_at_the_end():
+    # Regression: tracking graphs were shared across videos and regions, so
+    # their last landmarks referred to another crop
+    processor = StandInProcessor([(200, 150)])
+    tracker = HandTracker(processor, TrackingSettings(redetect_frames=2))
+    for _ in range(4):
+        tracker.process(frame())
+    # Re-detection finds the hand where it was: same region, same graph
+    assert len(processor.trackers) == 1 and not processor.trackers[0].closed
+    processor.centres = [(400, 300)]
+    for _ in range(2):
+        tracker.process(frame())
+    assert len(processor.trackers) == 2 and processor.trackers[0].closed
+    # A second hand, found at the next detection, changes the count tracked
+    processor.centres = [(400, 300), (420, 310)]
+    for _ in range(3):
+        tracker.process(frame())
+    assert [solver.max_num_hands for solver in processor.trackers] == [1, 1, 2]
+    tracker.close()
+    assert all(solver.closed for solver in processor.trackers)
+    assert not processor.hands.closed
+
+    other = HandTracker(processor, TrackingSettings(redetect_frames=2))
+    other.process(frame())
+    other.process(frame())
+    # The next video starts with a graph of its own
+    assert len(processor.trackers) == 4 and not processor.trackers[-1].closed
+
+
+@pytest.mark.parametrize("settings, fps, stride", [
+    (TrackingSettings(target_fps=15, stride=0), 30.0, 2),
+    (TrackingSettings(target_fps=15, stride=0), 10.0, 1),
+    (TrackingSettings(target_fps=0, stride=0), 60.0, 1),
+    (TrackingSettings(target_fps=15, stride=3), 30.0, 3),
+])
+def test_stride_for(settings, fps, stride):
+    assert settings.stride_for(fps) == stride
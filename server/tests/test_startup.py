@@ -0,0 +1,21 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import SERVER_DIR
+
+# Loaded by the analysis on first use or in the warm-up, never at import
+HEAVY_MODULES = ["librosa", "scipy.signal", "scipy.ndimage", "speech_recognition", "numba", "main"]
+
+
+def test_server_import_stays_light(tmp_path):
+    # Regression: importing modules.profiles at the top of the server pulled
+    # librosa, scipy and speech_recognition back into start-up
+    env = dict(os.environ, VOICE_SESSION_PATH=str(tmp_path / "sessions.db"),
+               VOICE_HISTORY_PATH=str(tmp_path / "history.db"), VOICE_CACHE_PATH=str(tmp_path / "cache.db"))
+    code = ("import json, sys; import fastapi_server; "
+            f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=SERVER_DIR, env=env, capture_output=True,
+                         text=True, check=True).stdout
+    assert json.loads(out.splitlines()[-1]) == []
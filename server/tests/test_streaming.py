@@ -0,0 +1,120 @@
+import contextlib
+import io
+import subprocess
+
+import numpy as np
+import pytest
+
+import main
+from main import PITCH_ENGINE, RATE, process_audio_file
+from modules.streaming import (RunningStats, StreamingVoiceAnalyzer, analyze_file_streaming, file_duration,
+                              stream_audio_file)
+
+RECORDINGS = ["Kushalconfidence.mp3", "kushal.mp3", "tanmay.mp3", "tanmayconfidence.mp3"]
+
+
+def whole_file(path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        results, _ = process_audio_file(path, streaming=False, transcribe=False)
+    return results
+
+
+def streamed(path, block_seconds, vad=True):
+    analyzer = StreamingVoiceAnalyzer(RATE, pitch_engine=PITCH_ENGINE, vad=vad)
+    for block in stream_audio_file(path, RATE, block_seconds):
+        analyzer.feed(block)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return analyzer.finalize()
+
+
+def test_running_stats_match_numpy():
+    values = np.random.default_rng(0).normal(3, 2, 1000)
+    stats = RunningStats()
+    for part in np.array_split(values, 7):
+        stats.update(part)
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.std == pytest.approx(values.std())
+
+
+@pytest.mark.parametrize("name", RECORDINGS)
+def test_streaming_matches_whole_file(resource, name):
+    # Regression: the streaming path (long files, the live WebSocket) was not
+    # gated on voice activity, so its pitch statistics differed from analyze_voice
+    expected = whole_file(resource(name))
+    with contextlib.redirect_stdout(io.StringIO()):
+        actual = analyze_file_streaming(resource(name), RATE, pitch_engine=PITCH_ENGINE)
+    assert actual.pitch_mean == pytest.approx(expected.pitch_mean, rel=1e-4)
+    assert actual.pitch_std == pytest.approx(expected.pitch_std, rel=1e-4)
+    assert actual.energy_mean == pytest.approx(expected.energy_mean, rel=1e-4)
+    assert actual.energy_std == pytest.approx(expected.energy_std, rel=1e-4)
+    assert actual.pause_count == expected.pause_count
+    assert actual.filler_count == expected.filler_count
+
+
+@pytest.mark.parametrize("name", RECORDINGS)
+def test_short_blocks_stay_within_documented_tolerance(resource, name):
+    expected = whole_file(resource(name))
+    actual = streamed(resource(name), 5.0)
+    assert actual.pitch_mean == pytest.approx(expected.pitch_mean, rel=0.025)
+    assert actual.pitch_std == pytest.approx(expected.pitch_std, rel=0.065)
+    assert actual.energy_mean == pytest.approx(expected.energy_mean, rel=1e-4)
+
+
+@pytest.mark.parametrize("name", RECORDINGS)
+def test_ungated_streaming_matches_at_any_block_size(resource, name, monkeypatch):
+    monkeypatch.setattr(main, "VAD_ENABLED", False)
+    expected = whole_file(resource(name))
+    actual = streamed(resource(name), 1.3, vad=False)
+    assert actual.pitch_mean == pytest.approx(expected.pitch_mean, rel=1e-4)
+    assert actual.pitch_std == pytest.approx(expected.pitch_std, rel=1e-4)
+    assert actual.pause_count == expected.pause_count
+
+
+@pytest.mark.parametrize("name", RECORDINGS)
+def test_spectral_fillers_match_whole_file(resource, name, monkeypatch):
+    monkeypatch.setattr(main, "FILLER_METHOD", "spectral")
+    expected = whole_file(resource(name))
+    with contextlib.redirect_stdout(io.StringIO()):
+        actual = analyze_file_streaming(resource(name), RATE, pitch_engine=PITCH_ENGINE, filler_method="spectral")
+    assert actual.filler_count == expected.filler_count
+
+
+@pytest.mark.parametrize("name", RECORDINGS)
+def test_envelope_fillers_within_one_at_short_blocks(resource, name):
+    expected = whole_file(resource(name))
+    analyzer = StreamingVoiceAnalyzer(RATE, pitch_engine=PITCH_ENGINE, filler_method="envelope")
+    for block in stream_audio_file(resource(name), RATE, 1.3):
+        analyzer.feed(block)
+    with contextlib.redirect_stdout(io.StringIO()):
+        actual = analyzer.finalize()
+    assert abs(actual.filler_count - expected.filler_count) <= 1
+
+
+@pytest.fixture
+def m4a(resource, tmp_path):
+    from modules.decode import ffmpeg_exe
+    path = str(tmp_path / "tanmay.m4a")
+    subprocess.run([ffmpeg_exe(), "-loglevel", "error", "-i", resource("tanmay.mp3"), "-c:a", "aac", path],
+                   check=True)
+    return path
+
+
+def test_containers_soundfile_cannot_read_are_streamed(m4a, monkeypatch):
+    # Regression: sf.info failed on them, so their duration read as 0 and
+    # long recordings were decoded whole
+    assert file_duration(m4a) == pytest.approx(18.8, abs=0.2)
+    monkeypatch.setattr(main, "STREAMING_MIN_SECONDS", 5)
+    with contextlib.redirect_stdout(io.StringIO()):
+        streamed_result, features = process_audio_file(m4a, transcribe=False)
+    assert features is None
+    expected = whole_file(m4a)
+    assert streamed_result.energy_mean == pytest.approx(expected.energy_mean, rel=1e-4)
+    assert streamed_result.pitch_mean == pytest.approx(expected.pitch_mean, rel=1e-4)
+
+
+def test_ffmpeg_stream_reports_errors(tmp_path):
+    from modules.decode import stream_ffmpeg
+    path = tmp_path / "broken.webm"
+    path.write_bytes(b"\x1aE\xdf\xa3" + bytes(100))
+    with pytest.raises(RuntimeError, match="ffmpeg failed"):
+        list(stream_ffmpeg(str(path), RATE, RATE))
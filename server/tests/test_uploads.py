@@ -0,0 +1,162 @@
+import asyncio
+import io
+import os
+import signal
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from modules import uploads
+from modules.uploads import MB, Upload, UploadLimits, UploadRejected, receive_upload, sniff
+
+RATE = 22050
+VOICE = UploadLimits(2 * MB, 30.0, uploads.LIMITS["voice"].formats)
+
+
+def wav_bytes(seconds, rate=RATE):
+    buffer = io.BytesIO()
+    t = np.arange(int(seconds * rate)) / rate
+    sf.write(buffer, 0.3 * np.sin(2 * np.pi * 220 * t), rate, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def spool(upload, data, chunk=64 * 1024):
+    try:
+        for start in range(0, len(data), chunk):
+            upload.write(data[start:start + chunk])
+        return upload.finish()
+    except BaseException:
+        upload.discard()
+        raise
+
+
+class StreamedRequest:
+    """
+    The headers and body stream receive_upload reads from a request
+    """
+
+    def __init__(self, body, content_type, chunk=256 * 1024):
+        self.headers = {"content-type": content_type, "content-length": str(len(body))}
+        self._body = body
+        self._chunk = chunk
+
+    async def stream(self):
+        for start in range(0, len(self._body), self._chunk):
+            yield self._body[start:start + self._chunk]
+
+
+def multipart(field, data, boundary="testboundary"):
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nhello\r\n"
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"a.wav\"\r\n"
+            f"Content-Type: audio/wav\r\n\r\n").encode()
+    return head + data + f"\r\n--{boundary}--\r\n".encode(), f"multipart/form-data; boundary={boundary}"
+
+
+@pytest.mark.parametrize("head, kind", [
+    (b"RIFF\0\0\0\0WAVEfmt ", "wav"),
+    (b"fLaC\0\0\0\0\0\0\0\0", "flac"),
+    (b"ID3\4\0\0\0\0\0\0\0\0", "mp3"),
+    (b"\x1aE\xdf\xa3\0\0\0\0\0\0\0\0", "webm"),
+    (b"\0\0\0\x20ftypisom", "mp4"),
+    (b"<html><body>", None),
+])
+def test_sniff(head, kind):
+    assert (sniff(head) or (None,))[0] == kind
+
+
+def test_decodes_while_spooling():
+    data = wav_bytes(3.0)
+    upload = spool(Upload(VOICE, decode_rate=RATE), data)
+    try:
+        assert upload.format == "wav"
+        assert upload.analysis_path == upload.decoded_path
+        assert upload.seconds == pytest.approx(3.0, abs=0.05)
+        assert upload.size == len(data)
+        with open(upload.path, "rb") as f:
+            assert f.read() == data
+    finally:
+        upload.discard()
+    assert not os.path.exists(upload.path) and not os.path.exists(upload.decoded_path)
+
+
+def test_rejects_unknown_type():
+    with pytest.raises(UploadRejected) as rejected:
+        spool(Upload(VOICE), b"<html><body>" * 100)
+    assert rejected.value.status_code == 415
+
+
+def test_rejects_oversized_upload():
+    with pytest.raises(UploadRejected) as rejected:
+        spool(Upload(VOICE._replace(max_bytes=MB // 2)), wav_bytes(20.0))
+    assert rejected.value.status_code == 413
+
+
+def test_rejects_long_recording_while_decoding():
+    with pytest.raises(UploadRejected) as rejected:
+        spool(Upload(VOICE._replace(max_seconds=2.0), decode_rate=RATE), wav_bytes(10.0))
+    assert rejected.value.status_code == 413
+
+
+def test_falls_back_to_file_when_ffmpeg_stalls(monkeypatch):
+    # Regression: a stalled ffmpeg blocked write() (and the request) for good
+    monkeypatch.setattr(uploads, "DECODE_TIMEOUT", 0.5)
+    data = wav_bytes(20.0)
+    upload = Upload(VOICE, decode_rate=RATE)
+    try:
+        upload.write(data[:64 * 1024])
+        os.kill(upload._decoder._process.pid, signal.SIGSTOP)
+        # More than a pipe buffer, so ffmpeg has to read for the write to finish
+        upload.write(data[64 * 1024:])
+        upload.finish()
+        assert upload.decoded_path is None
+        assert upload.analysis_path == upload.path
+        assert upload.seconds == pytest.approx(20.0, abs=0.05)
+    finally:
+        upload.discard()
+
+
+def test_falls_back_to_file_when_flushing_fails(monkeypatch):
+    # Regression: a ValueError from the decoder's close escaped finish()
+    upload = Upload(VOICE, decode_rate=RATE)
+    try:
+        upload.write(wav_bytes(3.0))
+        decoder = upload._decoder
+
+        def close(timeout=None):
+            decoder.close(timeout)
+            raise ValueError("I/O operation on closed file")
+
+        monkeypatch.setattr(decoder, "close", close)
+        upload.finish()
+        assert upload.analysis_path == upload.path
+        assert upload.seconds == pytest.approx(3.0, abs=0.05)
+    finally:
+        upload.discard()
+
+
+def test_receive_multipart_upload():
+    data = wav_bytes(2.0)
+    body, content_type = multipart("file", data)
+    upload = asyncio.run(receive_upload(StreamedRequest(body, content_type), "voice", "file", RATE))
+    try:
+        with open(upload.path, "rb") as f:
+            assert f.read() == data
+        assert upload.seconds == pytest.approx(2.0, abs=0.05)
+    finally:
+        upload.discard()
+
+
+def test_receive_rejects_missing_field():
+    body, content_type = multipart("other", wav_bytes(1.0))
+    with pytest.raises(UploadRejected) as rejected:
+        asyncio.run(receive_upload(StreamedRequest(body, content_type), "voice", "file", RATE))
+    assert rejected.value.status_code == 400
+
+
+def test_receive_rejects_content_length_up_front():
+    request = StreamedRequest(b"", "audio/wav")
+    request.headers["content-length"] = str(uploads.LIMITS["voice"].max_bytes * 2)
+    with pytest.raises(UploadRejected) as rejected:
+        asyncio.run(receive_upload(request, "voice", "file", RATE))
+    assert rejected.value.status_code == 413
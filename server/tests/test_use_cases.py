@@ -0,0 +1,105 @@
+import json
+import os
+import random
+
+import pytest
+
+from modules import use_cases
+from modules.use_cases import PhraseMatcher, RuleEngine, UseCaseRules, normalize
+
+RULES = {
+    "min_score": 2,
+    "use_cases": {
+        "interview": {"phrases": ["interview*", {"phrase": "tell me about yourself", "weight": 2}],
+                      "suggestions": ["Keep answers concise."]},
+        "public_speaking": {"phrases": ["talk", "give a talk", "speech"]},
+    },
+}
+
+
+def write_rules(path, rules):
+    with open(path, "w") as f:
+        json.dump(rules, f)
+
+
+def naive_counts(patterns, text):
+    counts = {}
+    for pattern, _, _ in patterns:
+        start = text.find(pattern)
+        while start != -1:
+            counts[pattern] = counts.get(pattern, 0) + 1
+            start = text.find(pattern, start + 1)
+    return counts
+
+
+def test_normalize():
+    assert normalize("  Tell ME,  about-yourself! ") == " tell me about yourself "
+    assert normalize("don't") == " don't "
+
+
+def test_matcher_finds_every_occurrence():
+    # Overlapping patterns and patterns that are suffixes of others, against str.find
+    rng = random.Random(0)
+    patterns = [(" " + "".join(rng.choice("ab ") for _ in range(rng.randint(1, 4))), 0, 1.0) for _ in range(30)]
+    patterns = list({pattern[0]: pattern for pattern in patterns}.values())
+    matcher = PhraseMatcher(patterns)
+    for _ in range(50):
+        text = "".join(rng.choice("ab ") for _ in range(60))
+        counts = {}
+        for pattern, _, _ in matcher.scan(text):
+            counts[pattern] = counts.get(pattern, 0) + 1
+        assert counts == naive_counts(patterns, text)
+
+
+def test_whole_words_prefixes_and_weights():
+    rules = UseCaseRules(RULES)
+    ranked = rules.score("I will give a talk, not talking. Tell me about yourself before the interviews.")
+    assert ranked[0] == {"use_case": "interview", "score": 3.0,
+                         "matches": {"interview": 1, "tell me about yourself": 1}}
+    assert ranked[1] == {"use_case": "public_speaking", "score": 2.0, "matches": {"talk": 1, "give a talk": 1}}
+    assert rules.detect("tell me about yourself") == "interview"
+
+
+def test_min_score_and_ties():
+    rules = UseCaseRules(RULES)
+    assert rules.detect("an interview") is None
+    assert rules.score("nothing relevant") == []
+    # Equal scores go to the use case listed first
+    assert rules.detect("interview interview, a speech and a talk") == "interview"
+
+
+def test_engine_reloads_changed_file(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(use_cases, "RELOAD_CHECK_SECONDS", 0)
+    path = str(tmp_path / "rules.json")
+    write_rules(path, RULES)
+    engine = RuleEngine(path)
+    first = engine.rules()
+    assert engine.rules() is first
+    assert first.detect("give a talk") == "public_speaking"
+
+    changed = dict(RULES, min_score=1)
+    write_rules(path, changed)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    second = engine.rules()
+    assert second is not first and second.digest != first.digest
+    assert second.detect("a talk") == "public_speaking"
+
+    # A broken file keeps the rules in force
+    with open(path, "w") as f:
+        f.write("{")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 2 * 10 ** 9))
+    assert engine.rules() is second
+    assert "Failed to reload" in capsys.readouterr().out
+
+
+def test_engine_without_rules_raises(tmp_path):
+    with pytest.raises(OSError):
+        RuleEngine(str(tmp_path / "missing.json")).rules()
+
+
+def test_bundled_rules():
+    rules = UseCaseRules.load(use_cases.USE_CASES_PATH)
+    assert rules.detect("Tell me about yourself, this is my interview") == "interview"
+    assert rules.detect("I practice singing songs") == "singing"
+    assert rules.detect("my presentation") == "public_speaking"
+    assert rules.suggestions["interview"]